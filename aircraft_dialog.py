@@ -48,20 +48,15 @@ class AircraftDialog(QDialog):
 
 	def load_aircraft_data(self):
 		"""Загружает данные воздушного судна для редактирования"""
-		import sqlite3
+		from reference_data import get_reference_data
 		try:
-			conn = sqlite3.connect('fdp_data.db')
-			cursor = conn.cursor()
-			cursor.execute("SELECT registration, type, rest_facility_class FROM aircrafts WHERE id = ?",
-			               (self.aircraft_id,))
-			aircraft_data = cursor.fetchone()
-			conn.close()
+			aircraft_data = get_reference_data().aircraft(self.aircraft_id)
 
 			if aircraft_data:
-				self.registration_edit.setText(aircraft_data[0])
-				self.type_edit.setText(aircraft_data[1])
-				if aircraft_data[2] is not None:
-					self.rest_facility_combo.setCurrentIndex(aircraft_data[2])
+				self.registration_edit.setText(aircraft_data[1])
+				self.type_edit.setText(aircraft_data[2])
+				if aircraft_data[3] is not None:
+					self.rest_facility_combo.setCurrentIndex(aircraft_data[3])
 
 		except Exception as e:
 			QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить данные: {str(e)}")
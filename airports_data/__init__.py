@@ -3,7 +3,8 @@
 """
 
 from .data.airports import get_airports_data
-from .widgets.airport_search import AirportSearchWidget
+from .data.airport_index import AirportIndex, get_airport_index
+from .widgets.airport_search import AirportSearchWidget, get_airport_completion_model
 from .widgets.validation_widget import ValidationWidget
 from .widgets.segment_widget import SegmentWidget
 from .utils.styles import *
@@ -12,7 +13,10 @@ from .utils.validators import *
 
 __all__ = [
     'get_airports_data',
+    'AirportIndex',
+    'get_airport_index',
     'AirportSearchWidget', 
+    'get_airport_completion_model',
     'ValidationWidget',
     'SegmentWidget',
     # Стили
@@ -0,0 +1,68 @@
+"""
+Поисковый индекс аэропортов для автокомплита
+"""
+
+from .airports import get_airports_data
+
+
+class AirportIndex:
+    """
+    Строки автокомплита и соответствие текста поиска ICAO коду.
+    Индекс по стандартной базе один на процесс (get_airport_index) и только читается полями поиска.
+    """
+
+    def __init__(self, airports_data):
+        self.airports_data = airports_data
+        self.search_strings = []  # Строки автокомплита "ICAO/IATA - Город, Аэропорт"
+        self.search_to_icao = {}  # Текст поиска (в нижнем регистре) -> ICAO код
+        self.icao_to_display = {}  # ICAO код -> строка автокомплита
+
+        for icao, data in airports_data.items():
+            # Основной формат отображения
+            display_format = f"{icao}/{data['iata']} - {data['city']}, {data['name']}"
+            self.icao_to_display[icao] = display_format
+            self.search_strings.append(display_format)
+            self.search_to_icao[display_format.lower()] = icao
+
+            # Отдельные термины поиска: ICAO, IATA, город, аэропорт
+            search_terms = [
+                icao.lower(),
+                data['iata'].lower(),
+                data['city'].lower(),
+                data['name'].lower(),
+            ]
+            for term in search_terms:
+                if term not in self.search_to_icao:
+                    self.search_to_icao[term] = icao
+
+    def find(self, text):
+        """ICAO код по точному тексту поиска (без учета регистра) или None"""
+        return self.search_to_icao.get(text.lower())
+
+    def find_partial(self, text):
+        """ICAO код первого текста поиска, содержащего text, или None"""
+        text = text.lower()
+        for search_text, icao in self.search_to_icao.items():
+            if text in search_text:
+                return icao
+        return None
+
+    def codes_display(self, icao):
+        """Текст поля после выбора аэропорта: только ICAO/IATA коды"""
+        return f"{icao}/{self.airports_data[icao]['iata']}"
+
+
+_airport_index = None
+
+
+def get_airport_index(airports_data=None):
+    """
+    Индекс аэропортов: для стандартной базы - общий на процесс (строится при первом обращении),
+    для переданной другой базы - отдельный.
+    """
+    global _airport_index
+    if airports_data is not None and airports_data is not get_airports_data():
+        return AirportIndex(airports_data)
+    if _airport_index is None:
+        _airport_index = AirportIndex(get_airports_data())
+    return _airport_index
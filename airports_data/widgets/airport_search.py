@@ -3,9 +3,25 @@
 """
 
 from PyQt6.QtWidgets import QLineEdit, QCompleter
-from PyQt6.QtCore import Qt, pyqtSignal, QSize
+from PyQt6.QtCore import Qt, pyqtSignal, QSize, QStringListModel, QCoreApplication
 from PyQt6.QtGui import QFont
 from ..data.airports import get_airports_data
+from ..data.airport_index import get_airport_index
+
+
+_completion_model = None
+
+
+def get_airport_completion_model():
+    """
+    Общая для всех полей поиска модель строк автокомплита по стандартной базе аэропортов.
+    Создается при первом обращении и живет до завершения приложения: новые поля поиска
+    (сегменты маршрута) не копируют список аэропортов.
+    """
+    global _completion_model
+    if _completion_model is None:
+        _completion_model = QStringListModel(get_airport_index().search_strings, QCoreApplication.instance())
+    return _completion_model
 
 
 class AirportSearchWidget(QLineEdit):
@@ -16,8 +32,8 @@ class AirportSearchWidget(QLineEdit):
     def __init__(self, airports_data=None, parent=None):
         super().__init__(parent)
         self.airports_data = airports_data or get_airports_data()
+        self.airport_index = get_airport_index(self.airports_data)
         self.current_icao = None
-        self.search_to_icao = {}  # Словарь для поиска ICAO кода по тексту
         
         self.setup_ui()
         self.setup_autocomplete()
@@ -73,30 +89,14 @@ class AirportSearchWidget(QLineEdit):
     
     def setup_autocomplete(self):
         """Настройка автокомплита"""
-        # Создаем список для автокомплита
-        search_strings = []
-        
-        for icao, data in self.airports_data.items():
-            # Создаем основной формат отображения
-            display_format = f"{icao}/{data['iata']} - {data['city']}, {data['name']}"
-            search_strings.append(display_format)
-            self.search_to_icao[display_format.lower()] = icao
-            
-            # Add individual search terms for matching
-            search_terms = [
-                icao.lower(),  # ICAO code
-                data['iata'].lower(),  # IATA code
-                data['city'].lower(),  # City name
-                data['name'].lower(),  # Airport name
-            ]
-            
-            # Добавляем индивидуальные термины поиска
-            for term in search_terms:
-                if term not in self.search_to_icao:
-                    self.search_to_icao[term] = icao
+        # Строки автокомплита - общая модель (для нестандартной базы - своя)
+        if self.airport_index is get_airport_index():
+            model = get_airport_completion_model()
+        else:
+            model = QStringListModel(self.airport_index.search_strings, self)
         
         # Создаем completer
-        self.completer = QCompleter(search_strings, self)
+        self.completer = QCompleter(model, self)
         self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
         self.completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
         self.setCompleter(self.completer)
@@ -117,28 +117,18 @@ class AirportSearchWidget(QLineEdit):
     def on_completer_activated(self, text):
         """Handle selection from completer"""
         # Extract ICAO code from selected text
-        icao = self.search_to_icao.get(text.lower())
+        icao = self.airport_index.find(text)
         if icao:
-            self.current_icao = icao
-            # Set only ICAO/IATA codes in the field
-            data = self.airports_data[icao]
-            codes_display = f"{icao}/{data['iata']}"
-            self.setText(codes_display)
-            self.airport_selected.emit(icao)
+            self.select_airport(icao)
     
     def on_return_pressed(self):
         """Обработка нажатия Enter"""
         text = self.text().strip()
         if text:
             # Ищем точное совпадение
-            for search_text, icao in self.search_to_icao.items():
-                if text.lower() == search_text.lower():
-                    self.current_icao = icao
-                    data = self.airports_data[icao]
-                    codes_display = f"{icao}/{data['iata']}"
-                    self.setText(codes_display)
-                    self.airport_selected.emit(icao)
-                    break
+            icao = self.airport_index.find(text)
+            if icao:
+                self.select_airport(icao)
     
     def on_popup_selection_changed(self):
         """Handle selection change in popup (for mouse clicks)"""
@@ -148,14 +138,9 @@ class AirportSearchWidget(QLineEdit):
             text = self.completer.completionModel().data(index)
             if text:
                 # Extract ICAO code from selected text
-                icao = self.search_to_icao.get(text.lower())
+                icao = self.airport_index.find(text)
                 if icao:
-                    self.current_icao = icao
-                    # Set only ICAO/IATA codes in the field immediately
-                    data = self.airports_data[icao]
-                    codes_display = f"{icao}/{data['iata']}"
-                    self.setText(codes_display)
-                    self.airport_selected.emit(icao)
+                    self.select_airport(icao)
                     # Hide popup immediately after selection
                     self.completer.popup().hide()
     
@@ -165,18 +150,19 @@ class AirportSearchWidget(QLineEdit):
         current_text = self.text()
         if current_text and " - " in current_text:
             # Extract ICAO code from full format text
-            icao = self.search_to_icao.get(current_text.lower())
+            icao = self.airport_index.find(current_text)
             if icao:
-                # Set only ICAO/IATA codes in the field
-                data = self.airports_data[icao]
-                codes_display = f"{icao}/{data['iata']}"
-                self.setText(codes_display)
-                self.current_icao = icao
-                self.airport_selected.emit(icao)
+                self.select_airport(icao)
         
         # Call the original focusOutEvent
         super().focusOutEvent(event)
     
+    def select_airport(self, icao):
+        """Выбирает аэропорт: в поле остаются только ICAO/IATA коды"""
+        self.current_icao = icao
+        self.setText(self.airport_index.codes_display(icao))
+        self.airport_selected.emit(icao)
+    
     def on_key_press(self, event):
         """Handle key press events to prevent automatic text insertion"""
         # Handle Enter key
@@ -194,8 +180,4 @@ class AirportSearchWidget(QLineEdit):
     def set_airport(self, icao_code):
         """Устанавливает аэропорт по ICAO коду"""
         if icao_code in self.airports_data:
-            self.current_icao = icao_code
-            data = self.airports_data[icao_code]
-            codes_display = f"{icao_code}/{data['iata']}"
-            self.setText(codes_display)
-            self.airport_selected.emit(icao_code)
+            self.select_airport(icao_code)
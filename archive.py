@@ -0,0 +1,272 @@
+# archive.py
+"""
+Перенос закрытых заданий и их полетов старше горизонта в архивную базу.
+
+Активная база (fdp_data.db) хранит только то, что нужно планированию и проверке лимитов;
+закрытые (ARCHIVE_STATUSES) задания, начавшиеся раньше горизонта, вместе с полетами
+переносятся в fdp_data_archive.db. Сводные таблицы налета по дням и месяцам остаются
+в активной базе без изменений (см. ARCHIVE_GUARD в migrations.py), поэтому лимиты и месячные
+отчеты архив не читают. Исторические запросы Database (период раньше archive_cutoff_epoch)
+подключают архив сами.
+
+Перенос идет пачками, каждая в две транзакции: сначала копия пишется в архив
+(synchronous = FULL), затем из активной базы удаляются только строки, копия которых совпадает
+с оригиналом. Прерванный перенос безопасно повторить. Освободившиеся страницы возвращаются
+по частям через PRAGMA incremental_vacuum (база без auto_vacuum переводится один раз, --convert).
+
+Запуск:
+    python archive.py --db fdp_data.db --months 13
+    python archive.py --db fdp_data.db --convert
+"""
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from database import (ARCHIVE_CUTOFF_SETTING, ARCHIVE_SCHEMA, ARCHIVE_TABLES, Database, archive_path)
+
+
+# Задания старше горизонта (в месяцах до начала текущего месяца) переносятся в архив.
+# Горизонт не короче окна лимитов налета (календарный год), иначе их проверка увидела бы не все задания.
+ARCHIVE_HORIZON_MONTHS = 13
+MIN_ARCHIVE_HORIZON_MONTHS = 12
+
+# Закрытые задания: их больше не меняют при планировании
+ARCHIVE_STATUSES = ('completed', 'cancelled')
+
+# Заданий в одной пачке переноса и страниц в одном шаге incremental_vacuum
+ARCHIVE_BATCH_SIZE = 500
+VACUUM_PAGES_PER_STEP = 256
+
+# Задания пачки, копия которых в архиве не совпадает с активной базой
+# (задание или его полеты изменили между фиксациями)
+REJECTED_BATCH_QUERY = f'''
+	INSERT INTO temp.archive_rejected (id)
+	SELECT b.id FROM temp.archive_batch b
+	WHERE NOT EXISTS (
+	        SELECT 1 FROM main.duties d JOIN {ARCHIVE_SCHEMA}.duties a ON a.id = d.id
+	        WHERE d.id = b.id AND a.updated_at IS d.updated_at AND a.status IS d.status
+	          AND d.status IN ({{statuses}}))
+	   OR EXISTS (
+	        SELECT 1 FROM main.flights f
+	        WHERE f.duty_id = b.id AND NOT EXISTS (
+	            SELECT 1 FROM {ARCHIVE_SCHEMA}.flights a WHERE a.id = f.id AND a.updated_at IS f.updated_at))
+	   OR EXISTS (
+	        SELECT 1 FROM {ARCHIVE_SCHEMA}.flights a
+	        WHERE a.duty_id = b.id AND NOT EXISTS (SELECT 1 FROM main.flights f WHERE f.id = a.id))
+'''
+
+
+def horizon_start(months=ARCHIVE_HORIZON_MONTHS, now=None):
+	"""Начало месяца, отстоящего на months месяцев от текущего (UTC): граница переноса"""
+	now = now or datetime.now(timezone.utc)
+	month_index = now.year * 12 + now.month - 1 - months
+	return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def attach_archive(conn, path):
+	"""Подключает (и при необходимости создает) архив и приводит его схему к активной базе"""
+	attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+	if ARCHIVE_SCHEMA not in attached:
+		conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+	conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode = WAL")
+	# Строки удаляются из активной базы только после надежной фиксации копии
+	conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.synchronous = FULL")
+
+	for table in ARCHIVE_TABLES:
+		conn.execute(f"CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{table} AS SELECT * FROM main.{table} WHERE 0")
+		# Столбцы, добавленные миграциями после создания архива
+		archive_columns = {row[1] for row in conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.table_info({table})")}
+		for _, column, column_type, *_ in conn.execute(f"PRAGMA main.table_info({table})").fetchall():
+			if column not in archive_columns:
+				conn.execute(f"ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN {column} {column_type}")
+		conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_{table}_id ON {table} (id)")
+
+	# Те же индексы, что и в активной базе: исторические запросы идут по тем же планам
+	placeholders = ", ".join("?" * len(ARCHIVE_TABLES))
+	indexes = conn.execute(
+		f"SELECT sql FROM main.sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+		ARCHIVE_TABLES
+	).fetchall()
+	for (sql,) in indexes:
+		conn.execute(re.sub(r"^\s*CREATE\s+(UNIQUE\s+)?INDEX\s+(IF\s+NOT\s+EXISTS\s+)?",
+		                    lambda match: f"CREATE {match.group(1) or ''}INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.",
+		                    sql, flags=re.IGNORECASE))
+	conn.commit()
+
+
+def _columns(conn, table):
+	return ", ".join(row[1] for row in conn.execute(f"PRAGMA main.table_info({table})"))
+
+
+def archive_closed_duties(db, months=ARCHIVE_HORIZON_MONTHS, statuses=ARCHIVE_STATUSES,
+                          batch_size=ARCHIVE_BATCH_SIZE, now=None, log=print):
+	"""
+	Переносит в архив закрытые задания, начавшиеся раньше horizon_start(months), вместе с полетами.
+	Возвращает (перенесено заданий, перенесено полетов, пропущено заданий - изменены во время переноса).
+	"""
+	if months < MIN_ARCHIVE_HORIZON_MONTHS:
+		raise ValueError(f"Горизонт архива не может быть короче {MIN_ARCHIVE_HORIZON_MONTHS} месяцев")
+	if batch_size < 1:
+		raise ValueError("batch_size должен быть положительным")
+	if not db.pooled:
+		# Архив подключается к соединению потока, в котором идут и транзакции переноса
+		raise ValueError("Перенос в архив выполняется через Database с пулом соединений")
+	statuses = tuple(statuses)
+	status_placeholders = ", ".join("?" * len(statuses))
+	cutoff = horizon_start(months, now)
+	cutoff_epoch = int(cutoff.replace(tzinfo=timezone.utc).timestamp())
+
+	conn = db.get_connection()
+	if conn is None:
+		raise sqlite3.OperationalError("Не удалось создать соединение с базой данных")
+	try:
+		attach_archive(conn, archive_path(db.db_name))
+		conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)")
+		conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_rejected (id INTEGER PRIMARY KEY)")
+		duty_columns = _columns(conn, "duties")
+		flight_columns = _columns(conn, "flights")
+		rejected_query = REJECTED_BATCH_QUERY.format(statuses=status_placeholders)
+
+		moved_duties = moved_flights = skipped = 0
+		last_id = 0
+		log(f"Перенос в архив заданий ({', '.join(statuses)}) раньше {cutoff:%Y-%m-%d}")
+		while True:
+			started = time.perf_counter()
+			# 1. Копия пачки в архив: транзакция пишет только файл архива
+			with db.transaction():
+				conn.execute("DELETE FROM temp.archive_batch")
+				conn.execute("DELETE FROM temp.archive_rejected")
+				conn.execute(f'''
+					INSERT INTO temp.archive_batch (id)
+					SELECT id FROM main.duties
+					WHERE id > ? AND start_epoch < ? AND status IN ({status_placeholders})
+					ORDER BY id LIMIT ?
+				''', (last_id, cutoff_epoch, *statuses, batch_size))
+				batch_ids = conn.execute("SELECT MIN(id), MAX(id), COUNT(*) FROM temp.archive_batch").fetchone()
+				if not batch_ids[2]:
+					break
+				last_id = batch_ids[1]
+				conn.execute(f'''
+					INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.duties ({duty_columns})
+					SELECT {duty_columns} FROM main.duties WHERE id IN (SELECT id FROM temp.archive_batch)
+				''')
+				conn.execute(f'''
+					INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.flights ({flight_columns})
+					SELECT {flight_columns} FROM main.flights WHERE duty_id IN (SELECT id FROM temp.archive_batch)
+				''')
+
+			# 2. Удаление из активной базы того, что совпадает с копией; сводные таблицы не меняются
+			with db.transaction():
+				conn.execute("INSERT INTO archive_in_progress (id) VALUES (1)")
+				conn.execute(rejected_query, statuses)
+				# Копии измененных заданий убираются из архива: задание остается только в активной базе
+				conn.execute(f"DELETE FROM {ARCHIVE_SCHEMA}.flights WHERE duty_id IN (SELECT id FROM temp.archive_rejected)")
+				conn.execute(f"DELETE FROM {ARCHIVE_SCHEMA}.duties WHERE id IN (SELECT id FROM temp.archive_rejected)")
+				conn.execute("DELETE FROM temp.archive_batch WHERE id IN (SELECT id FROM temp.archive_rejected)")
+				flights = conn.execute(
+					"DELETE FROM main.flights WHERE duty_id IN (SELECT id FROM temp.archive_batch)").rowcount
+				duties = conn.execute(
+					"DELETE FROM main.duties WHERE id IN (SELECT id FROM temp.archive_batch)").rowcount
+				conn.execute("DELETE FROM archive_in_progress")
+				conn.execute('''
+					INSERT INTO app_settings (setting_key, setting_value, description)
+					VALUES (?, ?, 'Задания раньше этого времени (секунды UTC) могут быть в архиве')
+					ON CONFLICT (setting_key) DO UPDATE
+					SET setting_value = MAX(CAST(setting_value AS INTEGER), CAST(excluded.setting_value AS INTEGER)),
+					    updated_at = CURRENT_TIMESTAMP
+				''', (ARCHIVE_CUTOFF_SETTING, cutoff_epoch))
+
+			moved_duties += duties
+			moved_flights += flights
+			skipped += batch_ids[2] - duties
+			log(f"  задания {batch_ids[0]}..{batch_ids[1]}: перенесено {duties} (полетов {flights}), "
+			    f"{time.perf_counter() - started:.2f} с")
+		return moved_duties, moved_flights, skipped
+	finally:
+		db.release_connection(conn)
+
+
+def reclaim_space(db, pages_per_step=VACUUM_PAGES_PER_STEP, log=print):
+	"""
+	Возвращает свободные страницы активной базы шагами incremental_vacuum: каждый шаг - короткая
+	транзакция, между шагами GUI может писать. Возвращает число освобожденных страниц
+	(None, если база создана без auto_vacuum = INCREMENTAL - см. enable_incremental_vacuum).
+	"""
+	conn = db.get_connection()
+	if conn is None:
+		raise sqlite3.OperationalError("Не удалось создать соединение с базой данных")
+	try:
+		if conn.execute("PRAGMA main.auto_vacuum").fetchone()[0] != 2:
+			log("База без auto_vacuum = INCREMENTAL: место не возвращается (однократный перевод: --convert)")
+			return None
+		freed = 0
+		while True:
+			free_pages = conn.execute("PRAGMA main.freelist_count").fetchone()[0]
+			if not free_pages:
+				break
+			# Каждая страница - отдельный шаг инструкции без столбцов: execute() освободил бы
+			# одну страницу, executescript выполняет инструкцию до конца
+			conn.executescript(f"PRAGMA main.incremental_vacuum({pages_per_step});")
+			freed += min(free_pages, pages_per_step)
+		# Файл базы уменьшается при контрольной точке WAL
+		conn.execute("PRAGMA main.wal_checkpoint(TRUNCATE)").fetchall()
+		return freed
+	finally:
+		db.release_connection(conn)
+
+
+def enable_incremental_vacuum(db, log=print):
+	"""Однократно переводит базу на auto_vacuum = INCREMENTAL (полный VACUUM: база блокируется на время)"""
+	conn = db.get_connection()
+	if conn is None:
+		raise sqlite3.OperationalError("Не удалось создать соединение с базой данных")
+	try:
+		if conn.execute("PRAGMA main.auto_vacuum").fetchone()[0] == 2:
+			return False
+		started = time.perf_counter()
+		conn.execute("PRAGMA main.auto_vacuum = INCREMENTAL")
+		conn.execute("VACUUM main")
+		log(f"База переведена на auto_vacuum = INCREMENTAL: {time.perf_counter() - started:.2f} с")
+		return True
+	finally:
+		db.release_connection(conn)
+
+
+if __name__ == "__main__":
+	import argparse
+	import os
+
+	parser = argparse.ArgumentParser(description="Перенос закрытых заданий и полетов в архив FDP")
+	parser.add_argument("--db", default="fdp_data.db", help="путь к файлу базы данных")
+	parser.add_argument("--months", type=int, default=ARCHIVE_HORIZON_MONTHS,
+	                    help="горизонт: переносятся задания раньше начала месяца, отстоящего на столько месяцев")
+	parser.add_argument("--status", action="append", dest="statuses",
+	                    help=f"статус закрытого задания (можно несколько, по умолчанию {', '.join(ARCHIVE_STATUSES)})")
+	parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="заданий в одной пачке")
+	parser.add_argument("--vacuum-pages", type=int, default=VACUUM_PAGES_PER_STEP,
+	                    help="страниц в одном шаге incremental_vacuum")
+	parser.add_argument("--convert", action="store_true",
+	                    help="перевести базу без auto_vacuum на INCREMENTAL (однократный полный VACUUM)")
+	parser.add_argument("--no-vacuum", action="store_true", help="не возвращать освободившееся место")
+	args = parser.parse_args()
+
+	database = Database(args.db)
+	try:
+		size_before = os.path.getsize(args.db)
+		started = time.perf_counter()
+		duties, flights, skipped = archive_closed_duties(database, args.months, args.statuses or ARCHIVE_STATUSES,
+		                                                 args.batch_size)
+		print(f"Перенесено заданий: {duties}, полетов: {flights}, пропущено (изменены): {skipped}, "
+		      f"{time.perf_counter() - started:.2f} с")
+		if args.convert:
+			enable_incremental_vacuum(database)
+		if not args.no_vacuum:
+			started = time.perf_counter()
+			freed = reclaim_space(database, args.vacuum_pages)
+			if freed is not None:
+				print(f"Освобождено страниц: {freed}, {time.perf_counter() - started:.2f} с")
+		print(f"Размер базы: {size_before / 2 ** 20:.1f} -> {os.path.getsize(args.db) / 2 ** 20:.1f} МиБ, "
+		      f"архив: {archive_path(args.db)}")
+	finally:
+		database.close()
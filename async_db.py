@@ -0,0 +1,197 @@
+# async_db.py
+import threading
+import types
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from database import get_db
+
+
+# Рабочих потоков немного: SQLite все равно допускает одного писателя,
+# а у каждого потока свое соединение из пула Database
+ASYNC_DB_THREADS = 4
+
+
+class QueryCancelled(Exception):
+	"""Запрос отменен до получения результата"""
+
+
+class QueryHandle(QObject):
+	"""
+	Описатель запроса, выполняемого в пуле потоков. Сигналы приходят в поток GUI
+	(в поток, где создан описатель); после cancel() результат уже не доставляется.
+	"""
+	finished = pyqtSignal(object)
+	failed = pyqtSignal(str)
+	cancelled = pyqtSignal()
+
+	def __init__(self):
+		super().__init__()
+		self._lock = threading.Lock()
+		self._done = threading.Event()
+		self._cancel_requested = False
+		self._conn = None
+		self._result = None
+		self._error = None
+
+	def cancel(self):
+		"""Отменяет запрос: еще не начатый не выполнится, выполняющийся прерывается sqlite3 interrupt()"""
+		with self._lock:
+			self._cancel_requested = True
+			if self._conn is not None:
+				self._conn.interrupt()
+
+	def is_cancelled(self):
+		return self._cancel_requested
+
+	def is_done(self):
+		return self._done.is_set()
+
+	def result(self, timeout=None):
+		"""Блокирующее ожидание результата (для скриптов и фоновых потоков, не для GUI)"""
+		if not self._done.wait(timeout):
+			raise TimeoutError("Запрос не завершился за отведенное время")
+		if self._cancel_requested:
+			raise QueryCancelled()
+		if self._error is not None:
+			raise self._error
+		return self._result
+
+	def _attach(self, conn):
+		"""Запоминает соединение выполняющегося запроса; False, если запрос уже отменен"""
+		with self._lock:
+			if self._cancel_requested:
+				return False
+			self._conn = conn
+			return True
+
+	def _detach(self):
+		with self._lock:
+			self._conn = None
+
+
+class _QueryRunnable(QRunnable):
+	def __init__(self, db, handle, function, args, kwargs, on_done):
+		super().__init__()
+		self.db = db
+		self.handle = handle
+		self.function = function
+		self.args = args
+		self.kwargs = kwargs
+		self.on_done = on_done
+
+	def run(self):
+		handle = self.handle
+		try:
+			# Соединение потока из пула Database: его и прерывает cancel()
+			conn = self.db.get_connection()
+			if conn is not None and handle._attach(conn):
+				try:
+					result = self.function(*self.args, **self.kwargs)
+					# Генераторы (iter_duties) читаются здесь же, с проверкой отмены между строками
+					if isinstance(result, types.GeneratorType):
+						rows = []
+						for row in result:
+							if handle.is_cancelled():
+								result.close()
+								break
+							rows.append(row)
+						result = rows
+					handle._result = result
+				finally:
+					handle._detach()
+					self.db.release_connection(conn)
+			elif conn is None:
+				handle._error = RuntimeError("Не удалось подключиться к базе данных")
+		except Exception as e:
+			handle._error = e
+		finally:
+			handle._done.set()
+
+		if handle.is_cancelled():
+			handle.cancelled.emit()
+		elif handle._error is not None:
+			handle.failed.emit(str(handle._error))
+		else:
+			handle.finished.emit(handle._result)
+		self.on_done(handle)
+
+
+class AsyncDatabase:
+	"""
+	Неблокирующий доступ к Database для GUI: методы выполняются в пуле потоков,
+	результат приходит сигналом QueryHandle.finished (или failed / cancelled).
+	"""
+
+	def __init__(self, db, max_threads=ASYNC_DB_THREADS):
+		self.db = db
+		self._pool = QThreadPool()
+		self._pool.setMaxThreadCount(max_threads)
+		# Потоки не завершаются по простою, чтобы их соединения SQLite переиспользовались
+		self._pool.setExpiryTimeout(-1)
+		self._lock = threading.Lock()
+		self._active = set()
+
+	def submit(self, method, *args, on_result=None, on_error=None, **kwargs):
+		"""
+		Ставит в очередь вызов метода Database (имя или любая функция) и возвращает QueryHandle.
+		Обработчики on_result / on_error подключаются до запуска, поэтому результат не теряется.
+		"""
+		function = getattr(self.db, method) if isinstance(method, str) else method
+		handle = QueryHandle()
+		if on_result is not None:
+			handle.finished.connect(on_result)
+		if on_error is not None:
+			handle.failed.connect(on_error)
+
+		with self._lock:
+			# Описатель живет, пока запрос не завершится, даже если вызывающий его не хранит
+			self._active.add(handle)
+		self._pool.start(_QueryRunnable(self.db, handle, function, args, kwargs, self._forget))
+		return handle
+
+	def submit_with_connection(self, function, *args, on_result=None, on_error=None, **kwargs):
+		"""
+		submit для функций, принимающих соединение SQLite последним позиционным аргументом
+		(проверки лимитов calculator/limits): вызываются с соединением рабочего потока,
+		которое прерывает cancel().
+		"""
+		def call(*call_args, **call_kwargs):
+			conn = self.db.get_connection()
+			try:
+				return function(*call_args, conn, **call_kwargs)
+			finally:
+				self.db.release_connection(conn)
+
+		return self.submit(call, *args, on_result=on_result, on_error=on_error, **kwargs)
+
+	def _forget(self, handle):
+		with self._lock:
+			self._active.discard(handle)
+
+	def cancel_all(self):
+		"""Отменяет все еще не завершенные запросы"""
+		with self._lock:
+			handles = list(self._active)
+		for handle in handles:
+			handle.cancel()
+
+	def wait_for_done(self, timeout_ms=-1):
+		"""Ожидает завершения всех запросов в пуле"""
+		return self._pool.waitForDone(timeout_ms)
+
+	def shutdown(self, timeout_ms=5000):
+		"""Отменяет незавершенные запросы и ждет остановки пула (при закрытии окна)"""
+		self.cancel_all()
+		return self.wait_for_done(timeout_ms)
+
+
+_async_db = None
+
+
+def get_async_db():
+	"""Возвращает общий для процесса AsyncDatabase поверх get_db()"""
+	global _async_db
+	if _async_db is None:
+		_async_db = AsyncDatabase(get_db())
+	return _async_db
@@ -0,0 +1,583 @@
+# benchmarks.py
+"""
+Замеры производительности слоя данных и расчетов.
+
+Запуск:
+    python benchmarks.py limits --rows 1000000
+    python benchmarks.py pool --ops 5000
+    python benchmarks.py bulk --rows 500000 --profile bulk-load
+    python benchmarks.py concurrency
+    python benchmarks.py startup --repeats 5
+    python benchmarks.py duties --rows 200000
+    python benchmarks.py writes --duties 500
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from types import MappingProxyType
+
+from calculator import AcclimatizationStatus, FDPCalculator, get_regulation_tables
+from database import Database, DEFAULT_PRAGMA_PROFILE, PRAGMA_PROFILES, build_duties_query
+from limits import flight_time_totals
+
+
+# Исходная реализация check_limits: три отдельных запроса с функциями над off_block_time
+LEGACY_LIMITS_QUERIES = (
+	"""
+	SELECT COALESCE(SUM(f.flight_time), 0)
+	FROM flights f
+	JOIN duties d ON f.duty_id = d.id
+	WHERE d.crew_member_id = ? AND date(f.off_block_time) >= date('now', '-28 days')
+	""",
+	"""
+	SELECT COALESCE(SUM(f.flight_time), 0)
+	FROM flights f
+	JOIN duties d ON f.duty_id = d.id
+	WHERE d.crew_member_id = ? AND strftime('%Y', f.off_block_time) = strftime('%Y', 'now')
+	""",
+	"""
+	SELECT COALESCE(SUM(f.flight_time), 0)
+	FROM flights f
+	JOIN duties d ON f.duty_id = d.id
+	WHERE d.crew_member_id = ? AND date(f.off_block_time) >= date('now', '-12 months')
+	""",
+)
+
+
+def _timed(func, *args):
+	"""Выполняет функцию и возвращает (результат, время в секундах)"""
+	started = time.perf_counter()
+	result = func(*args)
+	return result, time.perf_counter() - started
+
+
+def populate_flights(db_name, rows, crew_count=200, sectors_per_duty=4, days=730, seed=42):
+	"""Заполняет базу синтетическими заданиями и полетами (rows строк в flights)"""
+	rng = random.Random(seed)
+	Database(db_name)
+	conn = sqlite3.connect(db_name)
+	cursor = conn.cursor()
+
+	cursor.executemany(
+		"INSERT INTO crew_members (name, home_base, is_pilot) VALUES (?, ?, ?)",
+		[(f"Пилот {i}", "UMMS", True) for i in range(crew_count)]
+	)
+	cursor.execute("INSERT INTO aircrafts (registration, type, rest_facility_class) VALUES ('EW-BENCH', 'B737', 2)")
+	aircraft_id = cursor.lastrowid
+
+	now = datetime.now()
+	duty_count = rows // sectors_per_duty
+	duties = []
+	for _ in range(duty_count):
+		start = now - timedelta(minutes=rng.randrange(days * 24 * 60))
+		duties.append((rng.randint(1, crew_count), aircraft_id, start.strftime("%Y-%m-%d %H:%M:%S"),
+		               sectors_per_duty, "UMMS", "UUEE"))
+	cursor.executemany(
+		"""INSERT INTO duties (crew_member_id, aircraft_id, start_time, scheduled_sectors,
+		                       departure_airport, arrival_airport) VALUES (?, ?, ?, ?, ?, ?)""",
+		duties
+	)
+
+	def flight_rows():
+		for duty_id, (_, _, start_time, _, _, _) in enumerate(duties, start=1):
+			off_block = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S")
+			for sector in range(1, sectors_per_duty + 1):
+				flight_time = rng.randint(40, 180)
+				on_block = off_block + timedelta(minutes=flight_time)
+				yield (duty_id, "UMMS", "UUEE", off_block.strftime("%Y-%m-%d %H:%M:%S"),
+				       on_block.strftime("%Y-%m-%d %H:%M:%S"), flight_time, sector)
+				off_block = on_block + timedelta(minutes=45)
+
+	cursor.executemany(
+		"""INSERT INTO flights (duty_id, departure_airport, arrival_airport, off_block_time,
+		                        on_block_time, flight_time, sector_number) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+		flight_rows()
+	)
+	conn.commit()
+	cursor.execute("ANALYZE")
+	conn.close()
+	return crew_count
+
+
+def bench_limits(rows, samples):
+	"""Сравнивает исходную проверку лимитов (3 запроса) и однопроходный запрос limits.py"""
+	with tempfile.TemporaryDirectory() as tmp:
+		db_name = os.path.join(tmp, "bench_limits.db")
+		print(f"Заполнение базы: {rows} полетов...")
+		_, fill_time = _timed(populate_flights, db_name, rows)
+		print(f"  заполнено за {fill_time:.1f} с")
+
+		conn = sqlite3.connect(db_name)
+		crew_ids = random.Random(1).sample(range(1, 201), samples)
+
+		def legacy(crew_member_id):
+			cursor = conn.cursor()
+			totals = []
+			for query in LEGACY_LIMITS_QUERIES:
+				cursor.execute(query, (crew_member_id,))
+				totals.append(cursor.fetchone()[0] or 0)
+			return totals
+
+		def single_pass(crew_member_id):
+			totals = flight_time_totals(conn, crew_member_id, from_flights=True)
+			return [totals["last_28_days"], totals["current_year"], totals["last_12_months"]]
+
+		def daily_summary(crew_member_id):
+			totals = flight_time_totals(conn, crew_member_id)
+			return [totals["last_28_days"], totals["current_year"], totals["last_12_months"]]
+
+		variants = (
+			("3 запроса (исходный)", legacy),
+			("1 запрос по flights", single_pass),
+			("сводная таблица по дням", daily_summary),
+		)
+		for name, func in variants:
+			elapsed = []
+			for crew_member_id in crew_ids:
+				_, duration = _timed(func, crew_member_id)
+				elapsed.append(duration)
+			elapsed.sort()
+			print(f"{name}: медиана {elapsed[len(elapsed) // 2] * 1000:.2f} мс, "
+			      f"макс. {elapsed[-1] * 1000:.2f} мс на члена экипажа")
+
+		mismatched = [
+			crew_member_id for crew_member_id in crew_ids
+			if not legacy(crew_member_id) == single_pass(crew_member_id) == daily_summary(crew_member_id)
+		]
+		print(f"Расхождений в суммах: {len(mismatched)}")
+		conn.close()
+
+	check_batch_matches_scalar(samples * 100)
+
+
+def _shifted_tables(tables, shift):
+	"""Набор таблиц с уменьшенными на shift значениями (свои таблицы калькулятора для проверки)"""
+	def shifted(value):
+		return None if value is None else value - shift
+
+	return tables._replace(
+		appendix1_values=MappingProxyType({key: shifted(value) for key, value in tables.appendix1_values.items()}),
+		appendix4_values=MappingProxyType({key: shifted(value) for key, value in tables.appendix4_values.items()}),
+		appendix3_by_minute=tuple(tuple(shifted(value) for value in row) for row in tables.appendix3_by_minute),
+		appendix5_by_minute=tuple(tuple(shifted(value) for value in row) for row in tables.appendix5_by_minute),
+	)
+
+
+def check_batch_matches_scalar(samples):
+	"""
+	Пакетный расчет FDP и продления совпадает с поэлементным - для общего набора таблиц
+	и для калькулятора со своими таблицами
+	"""
+	import numpy as np
+
+	rng = random.Random(3)
+	start = datetime(2024, 1, 1)
+	start_times = [start + timedelta(minutes=rng.randrange(365 * 24 * 60)) for _ in range(samples)]
+	sectors = [rng.randint(1, 10) for _ in range(samples)]
+	statuses = [rng.choice(list(AcclimatizationStatus)) for _ in range(samples)]
+	has_frms = [rng.random() < 0.3 for _ in range(samples)]
+	minutes = np.timedelta64(1, 'm')
+
+	calculators = (
+		("общие таблицы", FDPCalculator()),
+		("свои таблицы", FDPCalculator(tables=_shifted_tables(get_regulation_tables(), timedelta(hours=1)))),
+	)
+	for name, calculator in calculators:
+		max_fdp = calculator.calculate_max_fdp_batch(start_times, sectors, statuses, has_frms)
+		extension, not_permitted = calculator.calculate_extension_without_rest_batch(start_times, sectors)
+		mismatched = 0
+		for i in range(samples):
+			scalar_fdp = calculator.calculate_max_fdp(start_times[i], sectors[i], statuses[i], has_frms[i])
+			scalar_extension = calculator.calculate_extension_without_rest(start_times[i], sectors[i])
+			batch_extension = None if not_permitted[i] else timedelta(minutes=int(extension[i] / minutes))
+			if timedelta(minutes=int(max_fdp[i] / minutes)) != scalar_fdp or batch_extension != scalar_extension:
+				mismatched += 1
+		print(f"Пакетный и поэлементный расчет ({name}): расхождений {mismatched} из {samples}")
+
+
+def _ops_per_second(func, ops):
+	"""Вызывает func ops раз и возвращает количество операций в секунду"""
+	started = time.perf_counter()
+	for i in range(ops):
+		func(i)
+	return ops / (time.perf_counter() - started)
+
+
+def bench_pool(ops):
+	"""
+	Сравнивает операции Database с соединением на каждый вызов без PRAGMA профиля (исходный
+	вариант) и с пулом соединений с профилем по умолчанию
+	"""
+	with tempfile.TemporaryDirectory() as tmp:
+		results = {}
+		for pooled in (False, True):
+			database = Database(os.path.join(tmp, f"bench_pool_{int(pooled)}.db"), pooled=pooled,
+			                    profile=DEFAULT_PRAGMA_PROFILE if pooled else None)
+			crew_ids = [database.add_crew_member(f"Пилот {i}", "UMMS", True) for i in range(100)]
+
+			aircraft_id = database.add_aircraft("EW-BENCH", "B737", 2)
+			duty_id = database.add_duty(crew_ids[0], aircraft_id, "2024-01-01 06:00:00", 2, "UMMS", "UUEE")
+
+			# update_setting обновляет только существующий ключ: счетчик для замера записи добавляется заранее
+			conn = database.get_connection()
+			conn.execute("INSERT INTO app_settings (setting_key, setting_value) VALUES ('bench_counter', '0')")
+			conn.commit()
+			database.release_connection(conn)
+
+			reads = {
+				"get_crew_member": lambda i: database.get_crew_member(crew_ids[i % len(crew_ids)]),
+				"get_setting": lambda i: database.get_setting("default_home_base"),
+			}
+			writes = {
+				"update_setting": lambda i: database.update_setting("bench_counter", str(i)),
+				"update_duty_status": lambda i: database.update_duty_status(duty_id, "planned"),
+			}
+
+			for name, func in {**reads, **writes}.items():
+				results.setdefault(name, {})[pooled] = _ops_per_second(func, ops)
+
+			def in_transaction(i):
+				with database.transaction():
+					database.update_setting("bench_counter", str(i))
+					database.update_duty_status(duty_id, "planned")
+
+			results.setdefault("2 записи в transaction()", {})[pooled] = _ops_per_second(in_transaction, ops)
+			if database.get_setting("bench_counter") != str(ops - 1):
+				print(f"Запись не выполнена: bench_counter = {database.get_setting('bench_counter')}")
+			database.close()
+
+		print(f"{'операция':<28}{'без пула, оп/с':>18}{'с пулом, оп/с':>18}{'ускорение':>12}")
+		for name, by_mode in results.items():
+			print(f"{name:<28}{by_mode[False]:>18.0f}{by_mode[True]:>18.0f}{by_mode[True] / by_mode[False]:>11.1f}x")
+
+
+def bench_bulk(rows, single_rows, profile):
+	"""Сравнивает построчное add_duty и массовую загрузку заданий, полетов и периодов отдыха"""
+	rng = random.Random(7)
+	sectors_per_duty = 4
+	with tempfile.TemporaryDirectory() as tmp:
+		database = Database(os.path.join(tmp, "bench_bulk.db"), profile=profile)
+		print(f"Профиль SQLite: {profile or 'по умолчанию SQLite'}")
+		crew_ids = [database.add_crew_member(f"Пилот {i}", "UMMS", True) for i in range(200)]
+		aircraft_id = database.add_aircraft("EW-BENCH", "B737", 2)
+		now = datetime.now()
+
+		def duty_row():
+			start = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+			return (rng.choice(crew_ids), aircraft_id, start.strftime("%Y-%m-%d %H:%M:%S"),
+			        sectors_per_duty, "UMMS", "UUEE")
+
+		single = [duty_row() for _ in range(single_rows)]
+		_, single_time = _timed(lambda: [database.add_duty(*row) for row in single])
+		print(f"add_duty построчно: {single_rows} строк за {single_time:.2f} с "
+		      f"({single_rows / single_time:.0f} строк/с)")
+
+		duties = [duty_row() for _ in range(rows // sectors_per_duty)]
+		duty_ids, duty_time = _timed(database.add_duties_bulk, duties)
+		print(f"add_duties_bulk: {len(duties)} строк за {duty_time:.2f} с ({len(duties) / duty_time:.0f} строк/с)")
+
+		def flight_rows():
+			for duty_id, (_, _, start_time, _, _, _) in zip(duty_ids, duties):
+				off_block = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S")
+				for sector in range(1, sectors_per_duty + 1):
+					flight_time = rng.randint(40, 180)
+					on_block = off_block + timedelta(minutes=flight_time)
+					yield (duty_id, "UMMS", "UUEE", off_block.strftime("%Y-%m-%d %H:%M:%S"),
+					       on_block.strftime("%Y-%m-%d %H:%M:%S"), flight_time, sector)
+					off_block = on_block + timedelta(minutes=45)
+
+		flights = list(flight_rows())
+		flight_ids, flight_time = _timed(database.add_flights_bulk, flights)
+		print(f"add_flights_bulk: {len(flights)} строк за {flight_time:.2f} с "
+		      f"({len(flights) / flight_time:.0f} строк/с)")
+
+		rest_periods = [
+			(crew_id, start, end, "regular", "UMMS")
+			for crew_id, _, start, _, _, _ in duties[:rows // 10]
+			for end in [(datetime.strptime(start, "%Y-%m-%d %H:%M:%S") + timedelta(hours=12)).strftime("%Y-%m-%d %H:%M:%S")]
+		]
+		# Ошибочные строки не должны откатывать пачку целиком
+		rest_periods[5] = (crew_ids[0], None, None, "regular")
+		rest_periods[17] = {"crew_member_id": crew_ids[0]}
+		rest_ids, rest_time = _timed(database.add_rest_periods_bulk, rest_periods)
+		print(f"add_rest_periods_bulk: {len(rest_periods)} строк за {rest_time:.2f} с, "
+		      f"отклонено строк: {rest_ids.count(None)} (ожидалось 2)")
+
+		stored = database.get_connection().execute("SELECT COUNT(*) FROM flights").fetchone()[0]
+		print(f"Полетов в базе: {stored}, ID получено: {sum(1 for i in flight_ids if i is not None)}")
+		print(f"Расхождений сводной таблицы налета: {len(database.check_flight_minutes_summary() or [])}")
+		database.close()
+
+
+def check_concurrent_read(rows, writer_profile):
+	"""
+	Проверяет, что соединение для отчетов читает, пока другая транзакция ведет массовую запись:
+	читатель видит последнее зафиксированное состояние и не ждет блокировки.
+	"""
+	with tempfile.TemporaryDirectory() as tmp:
+		db_name = os.path.join(tmp, "bench_concurrency.db")
+		writer = Database(db_name, profile=writer_profile)
+		reader = Database(db_name, profile="read-only-reporting")
+		crew_id = writer.add_crew_member("Пилот", "UMMS", True)
+		aircraft_id = writer.add_aircraft("EW-BENCH", "B737", 2)
+		committed = writer.add_duties_bulk(
+			[(crew_id, aircraft_id, "2024-01-01 06:00:00", 1, "UMMS", "UUEE")] * 100)
+
+		write_started = threading.Event()
+		reads_done = threading.Event()
+		errors = []
+
+		def bulk_write():
+			def duties():
+				for i in range(rows):
+					if i == rows // 2:
+						# Половина строк вставлена, транзакция не зафиксирована
+						write_started.set()
+						reads_done.wait(timeout=60)
+					yield (crew_id, aircraft_id, "2024-01-02 06:00:00", 1, "UMMS", "UUEE")
+			try:
+				writer.add_duties_bulk(duties(), batch_size=5000)
+			except Exception as e:
+				errors.append(e)
+			finally:
+				write_started.set()
+				writer.close()
+
+		thread = threading.Thread(target=bulk_write)
+		thread.start()
+		write_started.wait(timeout=60)
+
+		latencies = []
+		counts = set()
+		conn = reader.get_connection()
+		try:
+			for _ in range(20):
+				started = time.perf_counter()
+				counts.add(conn.execute("SELECT COUNT(*) FROM duties").fetchone()[0])
+				latencies.append(time.perf_counter() - started)
+		except sqlite3.Error as e:
+			errors.append(e)
+		finally:
+			reads_done.set()
+			thread.join()
+
+		final_count = reader.get_connection().execute("SELECT COUNT(*) FROM duties").fetchone()[0]
+		reader.close()
+
+		ok = not errors and counts == {len(committed)} and final_count == len(committed) + rows
+		print(f"Профиль записи: {writer_profile}, профиль чтения: read-only-reporting")
+		if latencies:
+			print(f"Чтений во время записи: {len(latencies)}, макс. задержка {max(latencies) * 1000:.2f} мс, "
+			      f"видимых строк: {sorted(counts)} (ожидалось {len(committed)})")
+		print(f"Строк после фиксации записи: {final_count} (ожидалось {len(committed) + rows})")
+		for error in errors:
+			print(f"Ошибка: {error}")
+		print("OK" if ok else "ОШИБКА: чтение заблокировано или видит незафиксированные данные")
+		return ok
+
+
+# Замер запуска в отдельном процессе: импорт модулей не кэширован, база в текущем каталоге
+STARTUP_SCRIPT = """
+import json, sys, time
+timings = {}
+started = time.perf_counter()
+import database
+timings["import database"] = time.perf_counter() - started
+started = time.perf_counter()
+database.get_db()
+timings["get_db()"] = time.perf_counter() - started
+if sys.argv[1] == "gui":
+	from PyQt6.QtWidgets import QApplication
+	app = QApplication([])
+	started = time.perf_counter()
+	from main_window import MainWindow
+	timings["import main_window"] = time.perf_counter() - started
+	started = time.perf_counter()
+	window = MainWindow()
+	timings["MainWindow()"] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+
+def _run_startup(cwd, mode):
+	"""Запускает STARTUP_SCRIPT в отдельном процессе и возвращает замеры в секундах"""
+	env = dict(os.environ)
+	env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+	                                                   env.get("PYTHONPATH")]))
+	env.setdefault("QT_QPA_PLATFORM", "offscreen")
+	result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, mode], cwd=cwd, env=env,
+	                        capture_output=True, text=True, check=True)
+	# Последняя строка - замеры, выше - вывод приложения
+	return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(repeats, gui):
+	"""Время импорта database, первого get_db() (новая и актуальная база) и создания MainWindow"""
+	mode = "gui" if gui else "db"
+	with tempfile.TemporaryDirectory() as tmp:
+		first = _run_startup(tmp, mode)
+		runs = [_run_startup(tmp, mode) for _ in range(repeats)]
+
+	print(f"{'этап':<22}{'новая база, мс':>16}{'актуальная схема (медиана), мс':>34}")
+	for stage, duration in first.items():
+		durations = sorted(run[stage] for run in runs)
+		print(f"{stage:<22}{duration * 1000:>16.1f}{durations[len(durations) // 2] * 1000:>34.1f}")
+
+
+def _timed_peak(func, *args):
+	"""Выполняет функцию и возвращает (результат, время в секундах, пик выделенной памяти в байтах)"""
+	tracemalloc.start()
+	try:
+		result, duration = _timed(func, *args)
+		return result, duration, tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+
+def bench_duties(rows):
+	"""Сравнивает чтение всех заданий fetchall, потоковое iter_duties и одну страницу get_duties_page"""
+	with tempfile.TemporaryDirectory() as tmp:
+		db_name = os.path.join(tmp, "bench_duties.db")
+		print(f"Заполнение базы: {rows} полетов ({rows // 4} заданий)...")
+		populate_flights(db_name, rows)
+		database = Database(db_name)
+
+		def fetch_all():
+			# Исходное чтение: вся таблица одним fetchall
+			conn = database.get_connection()
+			return conn.execute(*build_duties_query()).fetchall()
+
+		def page_walk(pages):
+			after = None
+			for _ in range(pages):
+				page, after = database.get_duties_page(after=after)
+				if after is None:
+					break
+			return page
+
+		variants = (
+			("fetchall всех заданий (исходный)", lambda: len(fetch_all())),
+			("iter_duties (полный проход)", lambda: sum(1 for _ in database.iter_duties())),
+			("get_duties_page (первая страница)", lambda: len(database.get_duties_page()[0])),
+			("get_duties_page (50-я страница)", lambda: len(page_walk(50))),
+			("iter_duties (член экипажа, 1 месяц)",
+			 lambda: sum(1 for _ in database.iter_duties(crew_member_id=1, start_date=datetime.now() - timedelta(days=30)))),
+		)
+		for name, func in variants:
+			count, duration, peak = _timed_peak(func)
+			print(f"{name:<40} строк: {count:>8}  {duration * 1000:>9.1f} мс  пик памяти {peak / 1024 / 1024:>7.2f} МБ")
+
+		# Постраничный обход должен вернуть те же задания в том же порядке, что и iter_duties
+		walked, after = [], None
+		while True:
+			page, after = database.get_duties_page(after=after, limit=1000)
+			walked.extend(row[0] for row in page)
+			if after is None:
+				break
+		print(f"Постраничный обход совпадает с iter_duties: {walked == [row[0] for row in database.iter_duties()]}")
+		database.close()
+
+
+def bench_writes(duties):
+	"""Сравнивает построчное add_duty (фиксация на каждое задание) и очередь DutyWriter"""
+	from PyQt6.QtCore import Qt
+	from write_behind import DutyWriter
+
+	with tempfile.TemporaryDirectory() as tmp:
+		database = Database(os.path.join(tmp, "bench_writes.db"))
+		crew_id = database.add_crew_member("Пилот", "UMMS", True)
+		aircraft_id = database.add_aircraft("EW-BENCH", "B737", 2)
+		start = datetime(2024, 1, 1, 6, 0)
+
+		def duty_args(i):
+			return (crew_id, aircraft_id, (start + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S"),
+			        2, "UMMS", "UUEE")
+
+		_, single_time = _timed(lambda: [database.add_duty(*duty_args(i)) for i in range(duties)])
+		print(f"add_duty построчно: {duties} заданий за {single_time:.2f} с ({duties / single_time:.0f} заданий/с)")
+
+		writer = DutyWriter(database)
+		results = {"written": 0, "failed": 0}
+		writer.written.connect(lambda ticket, duty_id: results.__setitem__("written", results["written"] + 1),
+		                       type=Qt.ConnectionType.DirectConnection)
+		writer.failed.connect(lambda ticket, message: results.__setitem__("failed", results["failed"] + 1),
+		                      type=Qt.ConnectionType.DirectConnection)
+		flights = [{"departure_airport": "UMMS", "arrival_airport": "UUEE", "flight_time": 90, "sector_number": 1}]
+
+		def enqueue_all():
+			for i in range(duties):
+				writer.enqueue_duty(*duty_args(duties + i), flights=flights)
+			# Задание без воздушного судна (NOT NULL): запись отклоняется, остальные в группе сохраняются
+			writer.enqueue_duty(crew_id, None, "2024-01-01 00:00:00", 1, "UMMS", "UUEE")
+			writer.flush()
+
+		_, queued_time = _timed(enqueue_all)
+		writer.close()
+		print(f"DutyWriter (задание + полет): {duties} заданий за {queued_time:.2f} с "
+		      f"({duties / queued_time:.0f} заданий/с), записано: {results['written']}, "
+		      f"отклонено: {results['failed']} (ожидалось 1)")
+		database.close()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Замеры производительности Aviation FDP Calculator")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+
+	limits_parser = subparsers.add_parser("limits", help="проверка лимитов налета на большом объеме полетов")
+	limits_parser.add_argument("--rows", type=int, default=1_000_000)
+	limits_parser.add_argument("--samples", type=int, default=50)
+
+	pool_parser = subparsers.add_parser("pool", help="операции Database с пулом соединений и без него")
+	pool_parser.add_argument("--ops", type=int, default=5000)
+
+	bulk_parser = subparsers.add_parser("bulk", help="массовая загрузка заданий, полетов и периодов отдыха")
+	bulk_parser.add_argument("--rows", type=int, default=500_000)
+	bulk_parser.add_argument("--single-rows", type=int, default=500)
+	bulk_parser.add_argument("--profile", choices=list(PRAGMA_PROFILES), default="bulk-load")
+
+	concurrency_parser = subparsers.add_parser(
+		"concurrency", help="проверка: чтение не блокируется незавершенной массовой записью")
+	concurrency_parser.add_argument("--rows", type=int, default=200_000)
+	concurrency_parser.add_argument("--profile", choices=list(PRAGMA_PROFILES), default="bulk-load",
+	                                help="профиль пишущего соединения")
+
+	startup_parser = subparsers.add_parser("startup", help="время импорта database и создания MainWindow")
+	startup_parser.add_argument("--repeats", type=int, default=5)
+	startup_parser.add_argument("--no-gui", action="store_true", help="без создания MainWindow")
+
+	duties_parser = subparsers.add_parser("duties", help="потоковое и постраничное чтение заданий")
+	duties_parser.add_argument("--rows", type=int, default=200_000)
+
+	writes_parser = subparsers.add_parser("writes", help="построчное сохранение заданий и очередь записи")
+	writes_parser.add_argument("--duties", type=int, default=500)
+
+	args = parser.parse_args()
+	if args.command == "limits":
+		bench_limits(args.rows, args.samples)
+	elif args.command == "pool":
+		bench_pool(args.ops)
+	elif args.command == "bulk":
+		bench_bulk(args.rows, args.single_rows, args.profile)
+	elif args.command == "concurrency":
+		ok = check_concurrent_read(args.rows, args.profile)
+		raise SystemExit(0 if ok else 1)
+	elif args.command == "startup":
+		bench_startup(args.repeats, not args.no_gui)
+	elif args.command == "duties":
+		bench_duties(args.rows)
+	elif args.command == "writes":
+		bench_writes(args.duties)
+
+
+if __name__ == "__main__":
+	main()
@@ -1,22 +1,132 @@
 # calculator.py
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+import os
+import threading
 import pytz
 from enum import Enum
+from limits import flight_time_totals, build_limits_report, fleet_headroom
 
 
-class AcclimatizationStatus(Enum):
-	ACCLIMATIZED = 'Б'  # Акклиматизирован к базовому времени
-	ACCLIMATIZED_TO_NEW = 'В'  # Акклиматизирован к новому времени
-	UNDEFINED = 'Н'  # Неопределенное состояние
+MINUTES_PER_DAY = 24 * 60
 
 
-class FDPCalculator:
-	def __init__(self):
-		# Таблицы для расчетов (на основе приложений документа)
+def _scan_range_table(table, minute_of_day, sectors, default):
+	"""Поиск значения по диапазонам ((ч, м), (ч, м)) перебором словаря (исходная логика)"""
+	hour, minute = divmod(minute_of_day, 60)
+
+	for (start_range, end_range), values in table.items():
+		start_hour, start_minute = start_range
+		end_hour, end_minute = end_range
+
+		if (hour > start_hour or (hour == start_hour and minute >= start_minute)) and \
+				(hour < end_hour or (hour == end_hour and minute <= end_minute)):
+			return values.get(sectors, default)
+
+	return default
+
 
-		# Приложение 1: Максимальное служебное полетное время, когда состояние акклиматизации
-		# членов экипажа ВС не определено и эксплуатант ВС внедрил FRMS
-		self.appendix1_values = {
+def _compile_minute_table(table, max_sectors, default):
+	"""
+	Компилирует таблицу с диапазонами времени в массив из 1440 строк (минута суток),
+	каждая строка - кортеж значений по количеству секторов (индекс 0 не используется).
+	"""
+	return tuple(
+		tuple(
+			_scan_range_table(table, minute_of_day, sectors, default) if sectors else default
+			for sectors in range(max_sectors + 1)
+		)
+		for minute_of_day in range(MINUTES_PER_DAY)
+	)
+
+
+def _freeze(table):
+	"""Возвращает неизменяемое представление словаря (рекурсивно для вложенных словарей)"""
+	return MappingProxyType({
+		key: _freeze(value) if isinstance(value, dict) else value
+		for key, value in table.items()
+	})
+
+
+class RegulationTables(NamedTuple):
+	"""Неизменяемый набор таблиц приложений документа, общий для всех калькуляторов процесса"""
+	appendix1_values: Mapping
+	appendix3_values: Mapping
+	appendix4_values: Mapping
+	appendix5_values: Mapping
+	appendix6_values: Mapping
+	appendix7_values: Mapping
+	appendix3_by_minute: tuple
+	appendix5_by_minute: tuple
+
+	def __reduce__(self):
+		# MappingProxyType не сериализуется pickle: таблицы передаются словарями и замораживаются заново
+		return (_restore_regulation_tables, (tuple(_thaw(value) if isinstance(value, Mapping) else value
+		                                           for value in self),))
+
+
+def _thaw(table):
+	"""Обратное к _freeze: изменяемая копия таблицы (рекурсивно для вложенных таблиц)"""
+	return {
+		key: _thaw(value) if isinstance(value, Mapping) else value
+		for key, value in table.items()
+	}
+
+
+def _restore_regulation_tables(values):
+	"""Восстанавливает RegulationTables после pickle"""
+	return RegulationTables(*(_freeze(value) if isinstance(value, dict) else value for value in values))
+
+
+def _build_regulation_tables():
+	"""Строит таблицы для расчетов (на основе приложений документа)"""
+	# Приложение 1: Максимальное служебное полетное время, когда состояние акклиматизации
+	# членов экипажа ВС не определено и эксплуатант ВС внедрил FRMS
+	appendix1_values = {
+		1: timedelta(hours=12),
+		2: timedelta(hours=12),
+		3: timedelta(hours=11, minutes=30),
+		4: timedelta(hours=11),
+		5: timedelta(hours=10, minutes=30),
+		6: timedelta(hours=10),
+		7: timedelta(hours=9, minutes=30),
+		8: timedelta(hours=9)
+	}
+
+	# Приложение 3: Значения для расчета максимального служебного полетного времени
+	# для минимального состава акклиматизированного экипажа ВС
+	appendix3_values = {
+		# 06:00--14:59
+		((6, 0), (14, 59)): {
+			1: timedelta(hours=13),
+			2: timedelta(hours=13),
+			3: timedelta(hours=12, minutes=30),
+			4: timedelta(hours=12),
+			5: timedelta(hours=11, minutes=30),
+			6: timedelta(hours=11),
+			7: timedelta(hours=10, minutes=30),
+			8: timedelta(hours=10),
+			9: timedelta(hours=9, minutes=30),
+			10: timedelta(hours=9)
+		},
+		# 15:00--16:59
+		((15, 0), (16, 59)): {
+			1: timedelta(hours=12, minutes=30),
+			2: timedelta(hours=12, minutes=30),
+			3: timedelta(hours=12),
+			4: timedelta(hours=11, minutes=30),
+			5: timedelta(hours=11),
+			6: timedelta(hours=10, minutes=30),
+			7: timedelta(hours=10),
+			8: timedelta(hours=9, minutes=30),
+			9: timedelta(hours=9),
+			10: timedelta(hours=9)
+		},
+		# 17:00--23:59
+		((17, 0), (23, 59)): {
 			1: timedelta(hours=12),
 			2: timedelta(hours=12),
 			3: timedelta(hours=11, minutes=30),
@@ -24,193 +134,330 @@ class FDPCalculator:
 			5: timedelta(hours=10, minutes=30),
 			6: timedelta(hours=10),
 			7: timedelta(hours=9, minutes=30),
-			8: timedelta(hours=9)
+			8: timedelta(hours=9),
+			9: timedelta(hours=9),
+			10: timedelta(hours=9)
+		},
+		# 00:00--05:59
+		((0, 0), (5, 59)): {
+			1: timedelta(hours=11, minutes=30),
+			2: timedelta(hours=11, minutes=30),
+			3: timedelta(hours=11),
+			4: timedelta(hours=10, minutes=30),
+			5: timedelta(hours=10),
+			6: timedelta(hours=9, minutes=30),
+			7: timedelta(hours=9),
+			8: timedelta(hours=9),
+			9: timedelta(hours=9),
+			10: timedelta(hours=9)
 		}
-
-		# Приложение 3: Значения для расчета максимального служебного полетного времени
-		# для минимального состава акклиматизированного экипажа ВС
-		self.appendix3_values = {
-			# 06:00--14:59
-			((6, 0), (14, 59)): {
-				1: timedelta(hours=13),
-				2: timedelta(hours=13),
-				3: timedelta(hours=12, minutes=30),
-				4: timedelta(hours=12),
-				5: timedelta(hours=11, minutes=30),
-				6: timedelta(hours=11),
-				7: timedelta(hours=10, minutes=30),
-				8: timedelta(hours=10),
-				9: timedelta(hours=9, minutes=30),
-				10: timedelta(hours=9)
-			},
-			# 15:00--16:59
-			((15, 0), (16, 59)): {
-				1: timedelta(hours=12, minutes=30),
-				2: timedelta(hours=12, minutes=30),
-				3: timedelta(hours=12),
-				4: timedelta(hours=11, minutes=30),
-				5: timedelta(hours=11),
-				6: timedelta(hours=10, minutes=30),
-				7: timedelta(hours=10),
-				8: timedelta(hours=9, minutes=30),
-				9: timedelta(hours=9),
-				10: timedelta(hours=9)
-			},
-			# 17:00--23:59
-			((17, 0), (23, 59)): {
-				1: timedelta(hours=12),
-				2: timedelta(hours=12),
-				3: timedelta(hours=11, minutes=30),
-				4: timedelta(hours=11),
-				5: timedelta(hours=10, minutes=30),
-				6: timedelta(hours=10),
-				7: timedelta(hours=9, minutes=30),
-				8: timedelta(hours=9),
-				9: timedelta(hours=9),
-				10: timedelta(hours=9)
-			},
-			# 00:00--05:59
-			((0, 0), (5, 59)): {
-				1: timedelta(hours=11, minutes=30),
-				2: timedelta(hours=11, minutes=30),
-				3: timedelta(hours=11),
-				4: timedelta(hours=10, minutes=30),
-				5: timedelta(hours=10),
-				6: timedelta(hours=9, minutes=30),
-				7: timedelta(hours=9),
-				8: timedelta(hours=9),
-				9: timedelta(hours=9),
-				10: timedelta(hours=9)
-			}
+	}
+
+	# Приложение 4: Значения для расчета максимального служебного полетного времени
+	# для минимального состава экипажа ВС, когда состояние акклиматизации членов
+	# экипажа ВС не определено и не внедрена FRMS
+	appendix4_values = {
+		1: timedelta(hours=11),
+		2: timedelta(hours=11),
+		3: timedelta(hours=10, minutes=30),
+		4: timedelta(hours=10),
+		5: timedelta(hours=9, minutes=30),
+		6: timedelta(hours=9),
+		7: timedelta(hours=9),
+		8: timedelta(hours=9)
+	}
+
+	# Приложение 5: Предельные значения продления служебного полетного времени без отдыха в полете
+	appendix5_values = {
+		# 06:00--14:59
+		((6, 0), (14, 59)): {
+			1: timedelta(hours=14),
+			2: timedelta(hours=14),
+			3: timedelta(hours=13, minutes=30),
+			4: timedelta(hours=13),
+			5: timedelta(hours=12, minutes=30)
+		},
+		# 15:00--16:59
+		((15, 0), (16, 59)): {
+			1: timedelta(hours=13, minutes=30),
+			2: timedelta(hours=13, minutes=30),
+			3: timedelta(hours=13),
+			4: timedelta(hours=12, minutes=30),
+			5: None  # Не допускается
+		},
+		# 17:00--23:59
+		((17, 0), (23, 59)): {
+			1: timedelta(hours=13),
+			2: timedelta(hours=13),
+			3: timedelta(hours=12, minutes=30),
+			4: timedelta(hours=12),
+			5: None  # Не допускается
+		},
+		# 00:00--05:59
+		((0, 0), (5, 59)): {
+			1: timedelta(hours=12, minutes=30),
+			2: timedelta(hours=12, minutes=30),
+			3: None,  # Не допускается
+			4: None,  # Не допускается
+			5: None  # Не допускается
 		}
-
-		# Приложение 4: Значения для расчета максимального служебного полетного времени
-		# для минимального состава экипажа ВС, когда состояние акклиматизации членов
-		# экипажа ВС не определено и не внедрена FRMS
-		self.appendix4_values = {
-			1: timedelta(hours=11),
-			2: timedelta(hours=11),
-			3: timedelta(hours=10, minutes=30),
-			4: timedelta(hours=10),
-			5: timedelta(hours=9, minutes=30),
-			6: timedelta(hours=9),
-			7: timedelta(hours=9),
-			8: timedelta(hours=9)
+	}
+
+	# Приложение 6: Минимальное время отдыха в полете для каждого члена экипажа ВС
+	appendix6_values = {
+		timedelta(hours=14, minutes=30): {
+			1: timedelta(hours=1, minutes=30),
+			2: timedelta(hours=1, minutes=30),
+			3: timedelta(hours=1, minutes=30)
+		},
+		timedelta(hours=15, minutes=0): {
+			1: timedelta(hours=1, minutes=45),
+			2: timedelta(hours=2),
+			3: timedelta(hours=2, minutes=20)
+		},
+		timedelta(hours=15, minutes=30): {
+			1: timedelta(hours=2),
+			2: timedelta(hours=2),
+			3: timedelta(hours=2, minutes=40)
+		},
+		timedelta(hours=16, minutes=0): {
+			1: timedelta(hours=2, minutes=15),
+			2: timedelta(hours=2, minutes=40),
+			3: timedelta(hours=3)
+		},
+		timedelta(hours=16, minutes=30): {
+			1: timedelta(hours=2, minutes=35),
+			2: timedelta(hours=3),
+			3: None  # Не допускается
+		},
+		timedelta(hours=17, minutes=0): {
+			1: timedelta(hours=3),
+			2: timedelta(hours=3, minutes=25),
+			3: None  # Не допускается
+		},
+		timedelta(hours=17, minutes=30): {
+			1: timedelta(hours=3, minutes=25),
+			2: None,  # Не допускается
+			3: None  # Не допускается
+		},
+		timedelta(hours=18, minutes=0): {
+			1: timedelta(hours=3, minutes=50),
+			2: None,  # Не допускается
+			3: None  # Не допускается
 		}
+	}
+
+	# Приложение 7: Значения минимального количества ночей, предоставляемых для отдыха
+	# в основном месте базирования после ротации
+	appendix7_values = {
+		# (максимальная временная разница, продолжительность ротации): минимальное количество ночей
+		((4, 6), (0, 48)): 2,
+		((4, 6), (48, 72)): 2,
+		((4, 6), (72, 96)): 3,
+		((4, 6), (96, 1000)): 3,  # >96
+
+		((6, 9), (0, 48)): 2,
+		((6, 9), (48, 72)): 3,
+		((6, 9), (72, 96)): 3,
+		((6, 9), (96, 1000)): 4,  # >96
+
+		((9, 12), (0, 48)): 2,
+		((9, 12), (48, 72)): 3,
+		((9, 12), (72, 96)): 4,
+		((9, 12), (96, 1000)): 5  # >96
+	}
+
+	return RegulationTables(
+		appendix1_values=_freeze(appendix1_values),
+		appendix3_values=_freeze(appendix3_values),
+		appendix4_values=_freeze(appendix4_values),
+		appendix5_values=_freeze(appendix5_values),
+		appendix6_values=_freeze(appendix6_values),
+		appendix7_values=_freeze(appendix7_values),
+		# Скомпилированные таблицы Приложений 3 и 5: индекс по минуте суток и числу секторов.
+		# Исходными остаются словари выше, массивы строятся из них один раз.
+		appendix3_by_minute=_compile_minute_table(appendix3_values, 10, timedelta(hours=10)),
+		appendix5_by_minute=_compile_minute_table(appendix5_values, 5, None),
+	)
 
-		# Приложение 5: Предельные значения продления служебного полетного времени без отдыха в полете
-		self.appendix5_values = {
-			# 06:00--14:59
-			((6, 0), (14, 59)): {
-				1: timedelta(hours=14),
-				2: timedelta(hours=14),
-				3: timedelta(hours=13, minutes=30),
-				4: timedelta(hours=13),
-				5: timedelta(hours=12, minutes=30)
-			},
-			# 15:00--16:59
-			((15, 0), (16, 59)): {
-				1: timedelta(hours=13, minutes=30),
-				2: timedelta(hours=13, minutes=30),
-				3: timedelta(hours=13),
-				4: timedelta(hours=12, minutes=30),
-				5: None  # Не допускается
-			},
-			# 17:00--23:59
-			((17, 0), (23, 59)): {
-				1: timedelta(hours=13),
-				2: timedelta(hours=13),
-				3: timedelta(hours=12, minutes=30),
-				4: timedelta(hours=12),
-				5: None  # Не допускается
-			},
-			# 00:00--05:59
-			((0, 0), (5, 59)): {
-				1: timedelta(hours=12, minutes=30),
-				2: timedelta(hours=12, minutes=30),
-				3: None,  # Не допускается
-				4: None,  # Не допускается
-				5: None  # Не допускается
-			}
-		}
 
-		# Приложение 6: Минимальное время отдыха в полете для каждого члена экипажа ВС
-		self.appendix6_values = {
-			timedelta(hours=14, minutes=30): {
-				1: timedelta(hours=1, minutes=30),
-				2: timedelta(hours=1, minutes=30),
-				3: timedelta(hours=1, minutes=30)
-			},
-			timedelta(hours=15, minutes=0): {
-				1: timedelta(hours=1, minutes=45),
-				2: timedelta(hours=2),
-				3: timedelta(hours=2, minutes=20)
-			},
-			timedelta(hours=15, minutes=30): {
-				1: timedelta(hours=2),
-				2: timedelta(hours=2),
-				3: timedelta(hours=2, minutes=40)
-			},
-			timedelta(hours=16, minutes=0): {
-				1: timedelta(hours=2, minutes=15),
-				2: timedelta(hours=2, minutes=40),
-				3: timedelta(hours=3)
-			},
-			timedelta(hours=16, minutes=30): {
-				1: timedelta(hours=2, minutes=35),
-				2: timedelta(hours=3),
-				3: None  # Не допускается
-			},
-			timedelta(hours=17, minutes=0): {
-				1: timedelta(hours=3),
-				2: timedelta(hours=3, minutes=25),
-				3: None  # Не допускается
-			},
-			timedelta(hours=17, minutes=30): {
-				1: timedelta(hours=3, minutes=25),
-				2: None,  # Не допускается
-				3: None  # Не допускается
-			},
-			timedelta(hours=18, minutes=0): {
-				1: timedelta(hours=3, minutes=50),
-				2: None,  # Не допускается
-				3: None  # Не допускается
-			}
-		}
+# Таблицы строятся один раз на процесс при первом обращении. Дочерние процессы,
+# созданные через fork после построения, получают их готовыми (copy-on-write),
+# поэтому перед созданием пула процессов достаточно вызвать get_regulation_tables().
+_regulation_tables = None
+_batch_tables = None
+_tables_lock = threading.Lock()
+
+# Массивы NumPy для наборов таблиц, переданных в FDPCalculator(tables=...)
+BATCH_TABLES_CACHE_SIZE = 8
+_custom_batch_tables = OrderedDict()
+
+
+def _reset_tables_lock():
+	"""Пересоздает блокировку в дочернем процессе (она могла быть захвачена в момент fork)"""
+	global _tables_lock
+	_tables_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+	os.register_at_fork(after_in_child=_reset_tables_lock)
+
+
+def get_regulation_tables():
+	"""Возвращает общий для процесса набор таблиц, строит его при первом вызове (потокобезопасно)"""
+	global _regulation_tables
+	if _regulation_tables is None:
+		with _tables_lock:
+			if _regulation_tables is None:
+				_regulation_tables = _build_regulation_tables()
+	return _regulation_tables
+
+
+def _build_batch_tables(tables):
+	"""Таблицы приложений набора tables в виде массивов NumPy (в минутах)"""
+	import numpy as np
+
+	def to_minutes(value):
+		return -1 if value is None else int(value.total_seconds() // 60)
+
+	def to_array(values):
+		array = np.array(values, dtype=np.int64)
+		array.setflags(write=False)
+		return array
+
+	return MappingProxyType({
+		# Значения по умолчанию - как в _lookup_appendix1/_lookup_appendix4
+		'appendix1': to_array([0] + [to_minutes(tables.appendix1_values.get(s, timedelta(hours=10)))
+		                             for s in range(1, 9)]),
+		'appendix4': to_array([0] + [to_minutes(tables.appendix4_values.get(s, timedelta(hours=9)))
+		                             for s in range(1, 9)]),
+		'appendix3': to_array([[to_minutes(v) for v in row] for row in tables.appendix3_by_minute]),
+		'appendix5': to_array([[to_minutes(v) for v in row] for row in tables.appendix5_by_minute]),
+	})
+
+
+def get_batch_tables(tables=None):
+	"""
+	Возвращает таблицы приложений в виде массивов NumPy (в минутах). Для общего набора
+	строятся один раз на процесс; для другого набора RegulationTables (калькулятор со своими
+	таблицами) - кэшируются по объекту набора (последние BATCH_TABLES_CACHE_SIZE наборов).
+	"""
+	global _batch_tables
+	if tables is not None and tables is not _regulation_tables:
+		with _tables_lock:
+			# RegulationTables не хешируется (MappingProxyType) и не поддерживает weakref: ключ - id,
+			# сам набор хранится в записи, поэтому id не может быть переиспользован, пока запись в кэше
+			entry = _custom_batch_tables.get(id(tables))
+			if entry is not None and entry[0] is tables:
+				_custom_batch_tables.move_to_end(id(tables))
+				return entry[1]
+		batch_tables = _build_batch_tables(tables)
+		with _tables_lock:
+			_custom_batch_tables[id(tables)] = (tables, batch_tables)
+			while len(_custom_batch_tables) > BATCH_TABLES_CACHE_SIZE:
+				_custom_batch_tables.popitem(last=False)
+		return batch_tables
+
+	if _batch_tables is None:
+		tables = get_regulation_tables()
+		with _tables_lock:
+			if _batch_tables is None:
+				_batch_tables = _build_batch_tables(tables)
+	return _batch_tables
+
+
+@lru_cache(maxsize=64)
+def _timezone(zone_name):
+	"""Кэшированный объект часового пояса pytz"""
+	return pytz.timezone(zone_name)
+
+
+def _utc_hour_bucket(reference_time, zone_name):
+	"""Номер часа UTC от начала эпохи для момента reference_time"""
+	if reference_time is None:
+		reference_time = datetime.now(timezone.utc)
+	elif reference_time.tzinfo is None:
+		reference_time = _timezone(zone_name).localize(reference_time)
+	return int(reference_time.timestamp() // 3600)
+
+
+@lru_cache(maxsize=8192)
+def _utc_offset_hours(zone_name, hour_bucket):
+	"""Смещение часового пояса от UTC (в часах) в начале часа hour_bucket"""
+	instant = datetime.fromtimestamp(hour_bucket * 3600, tz=timezone.utc)
+	return instant.astimezone(_timezone(zone_name)).utcoffset().total_seconds() / 3600
+
+
+class AcclimatizationStatus(Enum):
+	ACCLIMATIZED = 'Б'  # Акклиматизирован к базовому времени
+	ACCLIMATIZED_TO_NEW = 'В'  # Акклиматизирован к новому времени
+	UNDEFINED = 'Н'  # Неопределенное состояние
 
-		# Приложение 7: Значения минимального количества ночей, предоставляемых для отдыха
-		# в основном месте базирования после ротации
-		self.appendix7_values = {
-			# (максимальная временная разница, продолжительность ротации): минимальное количество ночей
-			((4, 6), (0, 48)): 2,
-			((4, 6), (48, 72)): 2,
-			((4, 6), (72, 96)): 3,
-			((4, 6), (96, 1000)): 3,  # >96
-
-			((6, 9), (0, 48)): 2,
-			((6, 9), (48, 72)): 3,
-			((6, 9), (72, 96)): 3,
-			((6, 9), (96, 1000)): 4,  # >96
-
-			((9, 12), (0, 48)): 2,
-			((9, 12), (48, 72)): 3,
-			((9, 12), (72, 96)): 4,
-			((9, 12), (96, 1000)): 5  # >96
-		}
 
-	def determine_acclimatization(self, base_time_zone, local_time_zone, hours_since_duty_start):
+class FDPCalculator:
+	def __init__(self, tables=None):
+		# Таблицы общие для процесса и загружаются при первом обращении;
+		# создание калькулятора ничего не строит.
+		self._tables = tables
+
+	@property
+	def tables(self):
+		if self._tables is None:
+			self._tables = get_regulation_tables()
+		return self._tables
+
+	def __getstate__(self):
+		# Общий набор таблиц не передается в рабочие процессы: там используется свой общий набор.
+		# Таблицы, переданные в конструктор, передаются вместе с калькулятором.
+		if self._tables is None or self._tables is _regulation_tables:
+			return {'_tables': None}
+		return {'_tables': self._tables}
+
+	@property
+	def appendix1_values(self):
+		return self.tables.appendix1_values
+
+	@property
+	def appendix3_values(self):
+		return self.tables.appendix3_values
+
+	@property
+	def appendix4_values(self):
+		return self.tables.appendix4_values
+
+	@property
+	def appendix5_values(self):
+		return self.tables.appendix5_values
+
+	@property
+	def appendix6_values(self):
+		return self.tables.appendix6_values
+
+	@property
+	def appendix7_values(self):
+		return self.tables.appendix7_values
+
+	@property
+	def appendix3_by_minute(self):
+		return self.tables.appendix3_by_minute
+
+	@property
+	def appendix5_by_minute(self):
+		return self.tables.appendix5_by_minute
+
+	def determine_acclimatization(self, base_time_zone, local_time_zone, hours_since_duty_start,
+	                              reference_time=None):
 		"""
         Определяет состояние акклиматизации на основе Приложения 2.
+        Разница поясов берется на момент reference_time (начало задания); время без
+        часового пояса считается местным временем local_time_zone. По умолчанию - текущий момент.
         """
 		try:
-			base_tz = pytz.timezone(base_time_zone)
-			local_tz = pytz.timezone(local_time_zone)
-
-			now = datetime.now()
-			base_offset = base_tz.utcoffset(now)
-			local_offset = local_tz.utcoffset(now)
+			hour_bucket = _utc_hour_bucket(reference_time, local_time_zone)
+			base_offset = _utc_offset_hours(base_time_zone, hour_bucket)
+			local_offset = _utc_offset_hours(local_time_zone, hour_bucket)
 
-			time_difference = (local_offset - base_offset).total_seconds() / 3600
+			time_difference = local_offset - base_offset
 
 			# Определяем статус акклиматизации по таблице Приложения 2
 			if time_difference < 4:
@@ -282,20 +529,8 @@ class FDPCalculator:
 
 	def _lookup_appendix3(self, start_time, sectors):
 		"""Поиск значения в Приложении 3"""
-		hour = start_time.hour
-		minute = start_time.minute
-
-		for time_range, values in self.appendix3_values.items():
-			start_range, end_range = time_range
-			start_hour, start_minute = start_range
-			end_hour, end_minute = end_range
-
-			if (hour > start_hour or (hour == start_hour and minute >= start_minute)) and \
-					(hour < end_hour or (hour == end_hour and minute <= end_minute)):
-				sectors = min(max(sectors, 1), 10)
-				return values.get(sectors, timedelta(hours=10))
-
-		return timedelta(hours=10)
+		sectors = min(max(sectors, 1), 10)
+		return self.appendix3_by_minute[start_time.hour * 60 + start_time.minute][sectors]
 
 	def _lookup_appendix4(self, sectors):
 		"""Поиск значения в Приложении 4"""
@@ -307,25 +542,32 @@ class FDPCalculator:
         Расчет предельного значения продления служебного полетного времени без отдыха в полете (Приложение 5).
         """
 		try:
-			hour = start_time.hour
-			minute = start_time.minute
-
-			for time_range, values in self.appendix5_values.items():
-				start_range, end_range = time_range
-				start_hour, start_minute = start_range
-				end_hour, end_minute = end_range
-
-				if (hour > start_hour or (hour == start_hour and minute >= start_minute)) and \
-						(hour < end_hour or (hour == end_hour and minute <= end_minute)):
-					sectors = min(max(sectors, 1), 5)
-					return values.get(sectors)
-
-			return None
+			sectors = min(max(sectors, 1), 5)
+			return self.appendix5_by_minute[start_time.hour * 60 + start_time.minute][sectors]
 
 		except Exception as e:
 			print(f"Ошибка при расчете продления без отдыха: {e}")
 			return None
 
+	def verify_compiled_tables(self):
+		"""
+        Сверяет скомпилированные таблицы Приложений 3 и 5 с поиском по диапазонам исходных словарей
+        для каждой минуты суток и каждого количества секторов. Возвращает список расхождений.
+        """
+		mismatches = []
+		checks = (
+			("appendix3", self.appendix3_values, self.appendix3_by_minute, 10, timedelta(hours=10)),
+			("appendix5", self.appendix5_values, self.appendix5_by_minute, 5, None),
+		)
+		for name, table, compiled, max_sectors, default in checks:
+			for minute_of_day in range(MINUTES_PER_DAY):
+				for sectors in range(1, max_sectors + 1):
+					expected = _scan_range_table(table, minute_of_day, sectors, default)
+					actual = compiled[minute_of_day][sectors]
+					if actual != expected:
+						mismatches.append((name, minute_of_day, sectors, expected, actual))
+		return mismatches
+
 	def calculate_min_in_flight_rest(self, extended_fdp_duration, rest_facility_class):
 		"""
         Расчет минимального времени отдыха в полете (Приложение 6).
@@ -377,75 +619,103 @@ class FDPCalculator:
 			min_rest = max(previous_fdp_duration, timedelta(hours=10))
 			return min_rest + timedelta(hours=9)
 
+	# Пакетные расчеты (NumPy) для проверки большого количества заданий за один вызов.
+	# Продолжительности возвращаются массивами timedelta64[m].
+
+	@staticmethod
+	def _batch_minutes_of_day(start_times):
+		"""
+        Переводит массив времени начала в минуты суток.
+        Принимает datetime64, список datetime или уже готовые целые минуты суток (0-1439).
+        """
+		import numpy as np
+
+		values = np.asarray(start_times)
+		if values.dtype.kind in 'iu':
+			return values.astype(np.int64) % MINUTES_PER_DAY
+		values = values.astype('datetime64[m]')
+		return (values - values.astype('datetime64[D]')).astype(np.int64)
+
+	@staticmethod
+	def _batch_acclimatization_codes(acclimatization_statuses):
+		"""Переводит состояния акклиматизации (AcclimatizationStatus или 'Б'/'В'/'Н') в коды 0/1/2"""
+		import numpy as np
+
+		values = np.asarray(acclimatization_statuses)
+		if values.dtype.kind in 'iu':
+			return values.astype(np.int64)
+		codes = {status.value: code for code, status in enumerate(AcclimatizationStatus)}
+		return np.array(
+			[codes[getattr(value, 'value', value)] for value in values.ravel()],
+			dtype=np.int64
+		).reshape(values.shape)
+
+	def calculate_max_fdp_batch(self, start_times, sectors, acclimatization_statuses, has_frms=False):
+		"""
+        Пакетный расчет максимального FDP (та же логика выбора приложения, что и в calculate_max_fdp).
+        Коды акклиматизации: 0 - 'Б', 1 - 'В', 2 - 'Н' (порядок AcclimatizationStatus).
+        """
+		import numpy as np
+
+		tables = get_batch_tables(self.tables)
+		minutes = self._batch_minutes_of_day(start_times)
+		sectors = np.asarray(sectors, dtype=np.int64)
+		codes = self._batch_acclimatization_codes(acclimatization_statuses)
+		has_frms = np.asarray(has_frms, dtype=bool)
+
+		appendix1 = tables['appendix1'][np.clip(sectors, 1, 8)]
+		appendix3 = tables['appendix3'][minutes, np.clip(sectors, 1, 10)]
+		appendix4 = tables['appendix4'][np.clip(sectors, 1, 8)]
+
+		result = np.where(
+			has_frms,
+			appendix1,
+			np.select([codes == 0, codes == 2], [appendix3, appendix4], np.minimum(appendix3, appendix4))
+		)
+		return result.astype('timedelta64[m]')
+
+	def calculate_extension_without_rest_batch(self, start_times, sectors):
+		"""
+        Пакетный расчет продления без отдыха в полете (Приложение 5).
+        Возвращает (значения, маска "не допускается"); для недопустимых значений - NaT.
+        """
+		import numpy as np
+
+		tables = get_batch_tables(self.tables)
+		minutes = self._batch_minutes_of_day(start_times)
+		sectors = np.clip(np.asarray(sectors, dtype=np.int64), 1, 5)
+
+		values = tables['appendix5'][minutes, sectors]
+		not_permitted = values < 0
+		extension = values.astype('timedelta64[m]')
+		extension[not_permitted] = np.timedelta64('NaT')
+		return extension, not_permitted
+
+	@staticmethod
+	def calculate_required_rest_batch(previous_fdp_durations, is_at_home_base=True):
+		"""
+        Пакетный расчет необходимого отдыха после FDP.
+        Продолжительности FDP - timedelta64 или целые минуты.
+        """
+		import numpy as np
+
+		durations = np.asarray(previous_fdp_durations)
+		if durations.dtype.kind != 'm':
+			durations = durations.astype(np.int64).astype('timedelta64[m]')
+		durations = durations.astype('timedelta64[m]')
+		is_at_home_base = np.asarray(is_at_home_base, dtype=bool)
+
+		home_base = np.maximum(durations, np.timedelta64(12 * 60, 'm')) + np.timedelta64(8 * 60, 'm')
+		away = np.maximum(durations, np.timedelta64(10 * 60, 'm')) + np.timedelta64(9 * 60, 'm')
+		return np.where(is_at_home_base, home_base, away)
+
 	def check_limits(self, crew_member_id, planned_flight_time, db_connection):
 		"""
         Проверка месячных/годовых лимитов полетного времени.
         """
 		try:
-			cursor = db_connection.cursor()
-
-			# Sum flight_time from flights joined to duties filtered by crew_member_id
-			cursor.execute(
-				"""
-				SELECT COALESCE(SUM(f.flight_time), 0)
-				FROM flights f
-				JOIN duties d ON f.duty_id = d.id
-				WHERE d.crew_member_id = ? AND date(f.off_block_time) >= date('now', '-28 days')
-				""",
-				(crew_member_id,),
-			)
-			last_28_days = cursor.fetchone()[0] or 0
-
-			cursor.execute(
-				"""
-				SELECT COALESCE(SUM(f.flight_time), 0)
-				FROM flights f
-				JOIN duties d ON f.duty_id = d.id
-				WHERE d.crew_member_id = ? AND strftime('%Y', f.off_block_time) = strftime('%Y', 'now')
-				""",
-				(crew_member_id,),
-			)
-			current_year = cursor.fetchone()[0] or 0
-
-			cursor.execute(
-				"""
-				SELECT COALESCE(SUM(f.flight_time), 0)
-				FROM flights f
-				JOIN duties d ON f.duty_id = d.id
-				WHERE d.crew_member_id = ? AND date(f.off_block_time) >= date('now', '-12 months')
-				""",
-				(crew_member_id,),
-			)
-			last_12_months = cursor.fetchone()[0] or 0
-
-			last_28_days_td = timedelta(minutes=last_28_days)
-			current_year_td = timedelta(minutes=current_year)
-			last_12_months_td = timedelta(minutes=last_12_months)
-
-			planned_minutes = planned_flight_time.total_seconds() / 60
-
-			result = {
-				"last_28_days": {
-					"current": last_28_days_td,
-					"limit": timedelta(hours=90),
-					"remaining": timedelta(hours=90) - last_28_days_td,
-					"exceeded": last_28_days_td + planned_flight_time > timedelta(hours=90)
-				},
-				"current_year": {
-					"current": current_year_td,
-					"limit": timedelta(hours=900),
-					"remaining": timedelta(hours=900) - current_year_td,
-					"exceeded": current_year_td + planned_flight_time > timedelta(hours=900)
-				},
-				"last_12_months": {
-					"current": last_12_months_td,
-					"limit": timedelta(hours=1000),
-					"remaining": timedelta(hours=1000) - last_12_months_td,
-					"exceeded": last_12_months_td + planned_flight_time > timedelta(hours=1000)
-				}
-			}
-
-			return result
+			totals = flight_time_totals(db_connection, crew_member_id)
+			return build_limits_report(totals, planned_flight_time)
 
 		except Exception as e:
 			print(f"Ошибка при проверке лимитов: {e}")
@@ -456,6 +726,17 @@ class FDPCalculator:
 			}
 
 
+	def check_fleet_limits(self, db_connection, crew_member_ids=None, planned_flight_time=timedelta(0)):
+		"""
+        Запас до лимитов полетного времени для всех (или выбранных) членов экипажа одним запросом.
+        """
+		try:
+			return fleet_headroom(db_connection, crew_member_ids, planned_flight_time)
+
+		except Exception as e:
+			print(f"Ошибка при проверке лимитов экипажей: {e}")
+			return []
+
 # Пример использования
 if __name__ == "__main__":
 	calculator = FDPCalculator()
@@ -467,7 +748,8 @@ if __name__ == "__main__":
 	status = calculator.determine_acclimatization(
 		"Europe/Minsk",
 		"Asia/Dubai",
-		60
+		60,
+		start_time
 	)
 	print(f"Статус акклиматизации: {status.value}")
 
@@ -497,4 +779,8 @@ if __name__ == "__main__":
 
 	# Пример расчета необходимого отдыха
 	rest_time = calculator.calculate_required_rest(max_fdp, True)
-	print(f"Необходимый отдых: {rest_time}")
\ No newline at end of file
+	print(f"Необходимый отдых: {rest_time}")
+
+	# Проверка скомпилированных таблиц
+	mismatches = calculator.verify_compiled_tables()
+	print(f"Расхождений в скомпилированных таблицах: {len(mismatches)}")
\ No newline at end of file
@@ -4,31 +4,252 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGroupBox,
                              QPushButton, QTextEdit, QFormLayout, QCheckBox,
                              QMessageBox, QScrollArea, QFrame, QGridLayout,
                              QSplitter, QTabWidget, QProgressBar, QProgressDialog, QCompleter)
-from PyQt6.QtCore import QDateTime, Qt, QTimer, QThread, pyqtSignal, QSize
-from PyQt6.QtGui import QFont, QColor, QPalette, QPixmap, QPainter, QMovie
+from PyQt6.QtCore import QDateTime, Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal, QSize, QStringListModel
+from PyQt6.QtGui import QFont, QColor, QPalette, QPixmap, QPainter, QMovie, QTextCursor, QTextFrameFormat
 from calculator import FDPCalculator, AcclimatizationStatus
+from airports_data import get_airport_index, get_airport_completion_model
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
 import pytz
 import os
 import json
+import threading
+
+
+# Пересчет предварительного просмотра откладывается не больше чем на кадр (~60 Гц):
+# все изменения полей за это время объединяются в один пересчет
+PREVIEW_DELAY_MS = 16
+
+# Разделы предварительного просмотра (по порядку вывода) и входные данные, от которых они зависят.
+# При пересчете заново строятся только разделы с измененными входными данными.
+PREVIEW_SECTIONS = (
+    ("parameters", {"start_time", "base_tz", "route", "hours_since_duty", "frms", "rest_in_flight", "transfer"}),
+    ("circadian", {"start_time"}),
+    ("acclimatization", {"start_time", "base_tz", "route", "hours_since_duty"}),
+    ("route", {"start_time", "route"}),
+)
+PREVIEW_INPUTS = frozenset().union(*(depends_on for _, depends_on in PREVIEW_SECTIONS))
+
+
+# Стандартные значения подготовительных операций, часы
+PREFLIGHT_HOURS = 1  # Стандартная предполетная подготовка - 1 час
+POSTFLIGHT_HOURS = 0.5  # Стандартная послеполетная подготовка - 30 минут
+
+REST_CLASS_MAP = {"Не предусмотрен": None, "1 класс": 1, "2 класс": 2, "3 класс": 3}
+
+# Сколько последних сценариев расчета (с готовым HTML вкладок) хранит ResultCache
+RESULT_CACHE_SIZE = 32
+
+# Разделы вкладок результатов (по порядку вывода) и поля calculation_results, от которых они зависят.
+# Раздел собирается заново только при изменении своих полей, в документе заменяется только
+# раздел с изменившимся содержимым.
+DETAIL_SECTIONS = (
+    ("title", ("start_time", "sectors", "has_frms")),
+    ("parameters", ("start_time", "base_tz", "local_tz", "hours_since_duty", "sectors", "has_frms",
+                    "rest_in_flight", "preflight", "postflight", "transfer", "rest_facility_class")),
+    ("acclimatization", ("acclimatization_status",)),
+    ("main_results", ("max_fdp", "required_rest", "is_at_home_base")),
+    ("extension", ("extension_without_rest", "min_rest_in_flight")),
+    ("progress_bars", ("max_fdp",)),
+    ("status", ("start_time",)),
+)
+RECOMMENDATION_SECTIONS = (
+    ("title", ()),
+    ("circadian", ("start_time", "has_frms", "sectors")),
+    ("acclimatization", ("acclimatization_status",)),
+    ("rest", ("is_at_home_base",)),
+    ("extension", ("extension_without_rest",)),
+    ("general", ()),
+)
+
+
+class CalculationInputs(NamedTuple):
+    """Неизменяемый снимок полей калькулятора: рабочий поток не обращается к виджетам"""
+    start_time: datetime
+    base_tz: str
+    local_tz: str
+    hours_since_duty: int
+    sectors: int
+    has_frms: bool
+    rest_in_flight: bool
+    rest_facility_class: Optional[int]
+    transfer: float
+    preflight: float = PREFLIGHT_HOURS
+    postflight: float = POSTFLIGHT_HOURS
+
+
+class CalculationBundle(NamedTuple):
+    """Полный результат расчета: словарь результатов и готовое содержимое разделов вкладок"""
+    results: dict
+    detail_sections: dict
+    recommendation_sections: dict
+
+
+class ResultCache:
+    """
+    LRU-кэш CalculationBundle по снимку CalculationInputs (нормализованному в
+    collect_calculation_inputs): повторный сценарий показывается без расчета и без
+    повторной сборки HTML. Используется только из потока GUI.
+    """
+
+    def __init__(self, max_size=RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, inputs):
+        """Готовый результат для снимка или None; найденный сценарий становится самым свежим"""
+        bundle = self._entries.get(inputs)
+        if bundle is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(inputs)
+        self.stats["hits"] += 1
+        return bundle
+
+    def put(self, inputs, bundle):
+        self._entries[inputs] = bundle
+        self._entries.move_to_end(inputs)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
 
-
-class CalculatorWorker(QThread):
-    """Worker thread for async calculations"""
-    finished = pyqtSignal(dict)
-    error = pyqtSignal(str)
-    
-    def __init__(self, calculation_data):
+    def clear(self):
+        self._entries.clear()
+
+
+class SectionedDocument:
+    """
+    Документ QTextEdit из именованных разделов, каждый - в своем QTextFrame. update заменяет на
+    месте содержимое только изменившихся разделов: остальной документ не пересобирается и не
+    перекомпонуется, прокрутка и выделение в нетронутых разделах сохраняются.
+    """
+
+    def __init__(self, text_edit, section_names, html=True):
+        self.html = html
+        self.document = text_edit.document()
+        self.frames = {}
+        self.contents = {}
+
+        self.document.clear()
+        frame_format = QTextFrameFormat()
+        frame_format.setBorder(0)
+        frame_format.setMargin(0)
+        frame_format.setBottomMargin(8)
+        frame_format.setPadding(0)
+        for name in section_names:
+            cursor = self.document.rootFrame().lastCursorPosition()
+            self.frames[name] = cursor.insertFrame(frame_format)
+
+    def update(self, sections):
+        """Записывает содержимое разделов; возвращает, сколько разделов действительно заменено"""
+        changed = [name for name, content in sections.items() if self.contents.get(name) != content]
+        if not changed:
+            return 0
+
+        cursor = QTextCursor(self.document)
+        cursor.beginEditBlock()
+        for name in changed:
+            frame = self.frames[name]
+            cursor.setPosition(frame.firstPosition())
+            cursor.setPosition(frame.lastPosition(), QTextCursor.MoveMode.KeepAnchor)
+            if self.html:
+                cursor.insertHtml(sections[name])
+            else:
+                cursor.insertText(sections[name])
+            self.contents[name] = sections[name]
+        cursor.endEditBlock()
+        return len(changed)
+
+
+class CalculationCancelled(Exception):
+    """Расчет заменен более новым запросом"""
+
+
+def run_fdp_calculation(calculator, inputs, check_cancelled=lambda: None):
+    """
+    Полный расчет FDP по снимку входных данных; возвращает словарь calculation_results.
+    check_cancelled вызывается между шагами и прерывает расчет исключением CalculationCancelled.
+    """
+    # Определяем акклиматизацию
+    acclimatization_status = calculator.determine_acclimatization(
+        inputs.base_tz, inputs.local_tz, inputs.hours_since_duty, inputs.start_time
+    )
+    check_cancelled()
+
+    # Рассчитываем максимальное FDP
+    max_fdp = calculator.calculate_max_fdp(
+        inputs.start_time, inputs.sectors, acclimatization_status, inputs.has_frms, inputs.rest_facility_class
+    )
+    check_cancelled()
+
+    # Рассчитываем необходимый отдых
+    is_at_home_base = inputs.base_tz == inputs.local_tz
+    required_rest = calculator.calculate_required_rest(max_fdp, is_at_home_base)
+
+    # Рассчитываем продление без отдыха в полете
+    extension_without_rest = calculator.calculate_extension_without_rest(inputs.start_time, inputs.sectors)
+
+    # Рассчитываем минимальный отдых в полете
+    min_rest_in_flight = None
+    if inputs.rest_in_flight and inputs.rest_facility_class:
+        min_rest_in_flight = calculator.calculate_min_in_flight_rest(max_fdp, inputs.rest_facility_class)
+    check_cancelled()
+
+    return dict(
+        inputs._asdict(),
+        acclimatization_status=acclimatization_status,
+        max_fdp=max_fdp,
+        required_rest=required_rest,
+        extension_without_rest=extension_without_rest,
+        min_rest_in_flight=min_rest_in_flight,
+        is_at_home_base=is_at_home_base,
+    )
+
+
+class CalculatorSignals(QObject):
+    """Сигналы CalculatorWorker (QRunnable сам сигналов не имеет): приходят в поток GUI"""
+    finished = pyqtSignal(int, dict)  # поколение запроса, результаты
+    failed = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+
+class CalculatorWorker(QRunnable):
+    """
+    Расчет FDP в пуле потоков по снимку CalculationInputs. Каждый запрос получает номер
+    поколения; cancel() (новый запрос заменил этот) прерывает расчет между шагами,
+    а CalculatorTab дополнительно отбрасывает результаты устаревших поколений.
+    """
+
+    def __init__(self, generation, inputs, calculator):
         super().__init__()
-        self.calculation_data = calculation_data
-        
+        self.generation = generation
+        self.inputs = inputs
+        self.calculator = calculator
+        self.signals = CalculatorSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise CalculationCancelled()
+
     def run(self):
         try:
-            # Simulate heavy calculation
-            self.msleep(100)  # Small delay to show progress
-            self.finished.emit(self.calculation_data)
+            self.check_cancelled()
+            results = run_fdp_calculation(self.calculator, self.inputs, self.check_cancelled)
+        except CalculationCancelled:
+            self.signals.cancelled.emit(self.generation)
         except Exception as e:
-            self.error.emit(str(e))
+            self.signals.failed.emit(self.generation, str(e))
+        else:
+            self.signals.finished.emit(self.generation, results)
 
 
 class ValidationWidget(QLabel):
@@ -121,44 +342,21 @@ class AirportSearchWidget(QLineEdit):
     
     def setup_autocomplete(self):
         """Setup autocomplete functionality"""
-        # Create search strings for all airports
-        search_strings = []
-        self.search_to_icao = {}  # Map search strings to ICAO codes
-        self.icao_to_display = {}  # Map ICAO codes to display format
-        
-        for icao, data in self.airports_data.items():
-            # Create display format: "ICAO/IATA - City, Name"
-            display_format = f"{icao}/{data['iata']} - {data['city']}, {data['name']}"
-            self.icao_to_display[icao] = display_format
-            
-            # Add only the main display format to search strings
-            search_strings.append(display_format)
-            self.search_to_icao[display_format.lower()] = icao
-            
-            # Add individual search terms for matching
-            search_terms = [
-                icao.lower(),  # ICAO code
-                data['iata'].lower(),  # IATA code
-                data['city'].lower(),  # City name
-                data['name'].lower(),  # Airport name
-            ]
-            
-            for term in search_terms:
-                if term not in self.search_to_icao:
-                    self.search_to_icao[term] = icao
+        # Индекс и модель строк автокомплита общие для всех полей поиска:
+        # новый сегмент не пересобирает список аэропортов
+        self.airport_index = get_airport_index(self.airports_data)
+        if self.airport_index is get_airport_index():
+            model = get_airport_completion_model()
+        else:
+            model = QStringListModel(self.airport_index.search_strings, self)
         
         # Create completer
-        self.completer = QCompleter(search_strings)
+        self.completer = QCompleter(model, self)
         self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
         self.completer.setFilterMode(Qt.MatchFlag.MatchContains)
         self.completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
         self.completer.setMaxVisibleItems(12)
         
-        # Настройка ширины popup окна сразу после создания
-        popup = self.completer.popup()
-        popup.setMinimumWidth(280)  # Уменьшенная ширина на одну треть
-        popup.setMaximumWidth(300)  # Максимальная ширина
-        
         # Connect completer selection
         self.completer.activated.connect(self.on_completer_activated)
         
@@ -183,40 +381,24 @@ class AirportSearchWidget(QLineEdit):
     def on_completer_activated(self, text):
         """Handle selection from completer"""
         # Extract ICAO code from selected text
-        icao = self.search_to_icao.get(text.lower())
+        icao = self.airport_index.find(text)
         if icao:
-            self.current_icao = icao
-            # Set only ICAO/IATA codes in the field
-            data = self.airports_data[icao]
-            codes_display = f"{icao}/{data['iata']}"
-            self.setText(codes_display)
-            self.airport_selected.emit(icao)
+            self.select_airport(icao)
     
     def on_return_pressed(self):
         """Handle Enter key press"""
         text = self.text()
         if text:
-            # Try to find matching airport
-            icao = self.search_to_icao.get(text.lower())
+            # Try to find matching airport, then partial match
+            icao = self.airport_index.find(text) or self.airport_index.find_partial(text)
             if icao:
-                self.current_icao = icao
-                # Set only ICAO/IATA codes in the field
-                data = self.airports_data[icao]
-                codes_display = f"{icao}/{data['iata']}"
-                self.setText(codes_display)
-                self.airport_selected.emit(icao)
-            else:
-                # Try partial match
-                for search_str, icao in self.search_to_icao.items():
-                    if text.lower() in search_str:
-                        self.current_icao = icao
-                        # Set only ICAO/IATA codes in the field
-                        data = self.airports_data[icao]
-                        codes_display = f"{icao}/{data['iata']}"
-                        self.setText(codes_display)
-                        self.airport_selected.emit(icao)
-                        break
+                self.select_airport(icao)
     
+    def select_airport(self, icao):
+        """Выбирает аэропорт: в поле остаются только ICAO/IATA коды"""
+        self.current_icao = icao
+        self.setText(self.airport_index.codes_display(icao))
+        self.airport_selected.emit(icao)
     
     def get_current_icao(self):
         """Get the currently selected ICAO code"""
@@ -225,9 +407,7 @@ class AirportSearchWidget(QLineEdit):
     def set_airport(self, icao):
         """Set the airport by ICAO code"""
         if icao in self.airports_data:
-            data = self.airports_data[icao]
-            codes_display = f"{icao}/{data['iata']}"
-            self.setText(codes_display)
+            self.setText(self.airport_index.codes_display(icao))
             self.current_icao = icao
 
 
@@ -303,6 +483,7 @@ class SegmentWidget(QWidget):
         self.arrival_time.setCalendarPopup(True)  # Enable calendar popup for easy date selection
         self.arrival_time.setMinimumWidth(90)  # Уменьшаем ширину
         self.arrival_time.setMaximumWidth(110)  # Ограничиваем максимальную ширину
+        self.arrival_time.dateTimeChanged.connect(self.on_arrival_time_changed)
         layout.addWidget(self.arrival_time)
 
         # Add segment button
@@ -426,6 +607,10 @@ class SegmentWidget(QWidget):
             return self.departure_combo.get_current_icao() or combo_text
         return combo_text
     
+    def get_departure_airport_code(self):
+        """ICAO код аэропорта отправления сегмента (или введенный текст, если аэропорт не выбран)"""
+        return self.departure_combo.get_current_icao() or self.departure_combo.text()
+
     def get_airport_info(self, airport_code):
         """Получает информацию об аэропорте по коду"""
         return self.airports_data.get(airport_code, {"city": "Неизвестно", "name": "Неизвестно", "country": "Неизвестно", "iata": "N/A", "timezone": "Europe/Minsk"})
@@ -435,12 +620,14 @@ class SegmentWidget(QWidget):
         airport_info = self.get_airport_info(icao)
         tooltip_text = f"Аэропорт отправления:\n{airport_info['name']}\nГород: {airport_info['city']}\nСтрана: {airport_info['country']}\nКод ИКАО: {icao}\nКод ИАТА: {airport_info.get('iata', 'N/A')}"
         self.departure_combo.setToolTip(tooltip_text)
+        self.schedule_preview("route")
     
     def on_arrival_airport_selected(self, icao):
         """Handle arrival airport selection"""
         airport_info = self.get_airport_info(icao)
         tooltip_text = f"Аэропорт прибытия:\n{airport_info['name']}\nГород: {airport_info['city']}\nСтрана: {airport_info['country']}\nКод ИКАО: {icao}\nКод ИАТА: {airport_info.get('iata', 'N/A')}"
         self.arrival_combo.setToolTip(tooltip_text)
+        self.schedule_preview("route")
 
 
     def set_segment_number(self, number):
@@ -459,7 +646,18 @@ class SegmentWidget(QWidget):
         if self.parent_calculator and self.segment_number == 1:
             # Если это первый сегмент, обновляем валидацию FDP времени
             self.parent_calculator.validate_fdp_time()
-            self.parent_calculator.update_preview()
+            self.schedule_preview("start_time")
+        else:
+            self.schedule_preview("route")
+
+    def on_arrival_time_changed(self):
+        """Обработчик изменения времени прилета"""
+        self.schedule_preview("route")
+
+    def schedule_preview(self, key):
+        """Сообщает калькулятору об изменении сегмента (пересчет просмотра объединяется)"""
+        if self.parent_calculator:
+            self.parent_calculator.schedule_preview(key)
 
 
 class CalculatorTab(QWidget):
@@ -470,7 +668,39 @@ class CalculatorTab(QWidget):
         self.segment_widgets = []  # List to track all segment widgets
         self.calculation_results = {}
         self.validation_widgets = {}  # Store validation widgets
+        # Фоновые расчеты: результат принимается только от последнего поколения запроса
+        self.calculation_pool = QThreadPool(self)
+        self.calculation_pool.setMaxThreadCount(2)
+        self.calculation_generation = 0
         self.calculation_worker = None
+        self.calculation_stats = {"started": 0, "finished": 0, "cancelled": 0, "stale": 0,
+                                  "sections_rendered": 0, "sections_reused": 0, "sections_replaced": 0}
+        self.result_cache = ResultCache()
+        # Вкладки результатов по разделам: последняя сборка каждого раздела с ключом из его полей
+        # и документы с разделами (создаются при первом показе результата)
+        self.section_renders = {}
+        self.details_document = None
+        self.recommendations_document = None
+
+        # Предварительный просмотр: измененные входные данные копятся в preview_dirty, пересчет -
+        # один на PREVIEW_DELAY_MS по таймеру; готовые разделы и акклиматизация кэшируются
+        self.preview_dirty = set()
+        self.preview_sections = {}
+        self.acclimatization_key = None
+        self.preview_stats = {
+            "requests": 0,  # изменений полей, запросивших пересчет
+            "coalesced": 0,  # из них объединены с уже запланированным пересчетом
+            "recomputes": 0,  # выполнено пересчетов
+            "sections_built": 0,
+            "sections_skipped": 0,  # разделов, входные данные которых не менялись
+            "acclimatization_runs": 0,
+            "acclimatization_skipped": 0,  # те же параметры акклиматизации, что и в прошлый раз
+        }
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY_MS)
+        self.preview_timer.timeout.connect(self.update_preview)
+
         self.init_ui()
 
     def init_ui(self):
@@ -572,7 +802,7 @@ class CalculatorTab(QWidget):
         ])
         self.base_timezone_combo.setCurrentText("Europe/Minsk")
         self.base_timezone_combo.setEditable(True)
-        self.base_timezone_combo.currentTextChanged.connect(self.update_preview)
+        self.base_timezone_combo.currentTextChanged.connect(lambda _: self.schedule_preview("base_tz"))
         basic_params_layout.addRow("Часовой пояс основного места базирования:", self.base_timezone_combo)
 
 
@@ -581,7 +811,7 @@ class CalculatorTab(QWidget):
         self.hours_since_duty_spin.setRange(0, 500)
         self.hours_since_duty_spin.setValue(0)
         self.hours_since_duty_spin.setSuffix(" часов")
-        self.hours_since_duty_spin.valueChanged.connect(self.update_preview)
+        self.hours_since_duty_spin.valueChanged.connect(lambda _: self.schedule_preview("hours_since_duty"))
         basic_params_layout.addRow("Часов с начала выполнения обязанностей:", self.hours_since_duty_spin)
         
         basic_params_group.setLayout(basic_params_layout)
@@ -596,7 +826,7 @@ class CalculatorTab(QWidget):
         # FRMS - система управления факторами риска
         self.has_frms_combo = QComboBox()
         self.has_frms_combo.addItems(["Нет", "Да"])
-        self.has_frms_combo.currentTextChanged.connect(self.update_preview)
+        self.has_frms_combo.currentTextChanged.connect(lambda _: self.schedule_preview("frms"))
         additional_layout.addRow("📊 Система управления факторами риска (FRMS):", self.has_frms_combo)
         
         # Отдых в полете
@@ -608,6 +838,7 @@ class CalculatorTab(QWidget):
         self.rest_facility_combo = QComboBox()
         self.rest_facility_combo.addItems(["Не предусмотрен", "1 класс", "2 класс", "3 класс"])
         self.rest_facility_combo.setEnabled(False)
+        self.rest_facility_combo.currentTextChanged.connect(lambda _: self.schedule_preview("rest_in_flight"))
         additional_layout.addRow("🏨 Класс места для отдыха:", self.rest_facility_combo)
         
         # Трансфер
@@ -620,7 +851,7 @@ class CalculatorTab(QWidget):
         self.transfer_hours_spin.setSuffix(" ч")
         self.transfer_hours_spin.setMaximumWidth(80)  # Увеличиваем для удобства
         self.transfer_hours_spin.setEnabled(False)  # По умолчанию отключен
-        self.transfer_hours_spin.valueChanged.connect(self.update_preview)
+        self.transfer_hours_spin.valueChanged.connect(lambda _: self.schedule_preview("transfer"))
         transfer_layout.addWidget(self.transfer_hours_spin)
         
         # Разделитель
@@ -636,7 +867,7 @@ class CalculatorTab(QWidget):
         self.transfer_minutes_spin.setSuffix(" мин")
         self.transfer_minutes_spin.setMaximumWidth(80)  # Увеличиваем для удобства
         self.transfer_minutes_spin.setEnabled(False)  # По умолчанию отключен
-        self.transfer_minutes_spin.valueChanged.connect(self.update_preview)
+        self.transfer_minutes_spin.valueChanged.connect(lambda _: self.schedule_preview("transfer"))
         transfer_layout.addWidget(self.transfer_minutes_spin)
         
         # Чекбокс трансфера
@@ -682,6 +913,12 @@ class CalculatorTab(QWidget):
             }
         """)
         scroll_layout.addWidget(self.calculate_btn)
+
+        # Состояние фонового расчета (вместо модального сообщения об успехе)
+        self.calculation_status_label = QLabel("")
+        self.calculation_status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.calculation_status_label.setStyleSheet("color: #7f8c8d;")
+        scroll_layout.addWidget(self.calculation_status_label)
         
         # Настройка скроллируемой области
         scroll_area.setWidget(scroll_widget)
@@ -759,7 +996,7 @@ class CalculatorTab(QWidget):
         self.rest_facility_combo.setEnabled(is_enabled)
         if not is_enabled:
             self.rest_facility_combo.setCurrentText("Не предусмотрен")
-        self.update_preview()
+        self.schedule_preview("rest_in_flight")
 
     def on_transfer_changed(self, state):
         """Обработчик изменения состояния чекбокса трансфера"""
@@ -772,7 +1009,7 @@ class CalculatorTab(QWidget):
         if not is_enabled:
             self.transfer_hours_spin.setValue(0)  # Сбрасываем значения при отключении
             self.transfer_minutes_spin.setValue(0)
-        self.update_preview()
+        self.schedule_preview("transfer")
 
     def add_initial_segment(self):
         """Add the initial segment to start the flight route"""
@@ -873,6 +1110,7 @@ class CalculatorTab(QWidget):
         # Принудительно обновляем весь layout
         self.segments_container.update()
         self.route_group.update()
+        self.schedule_preview("route")
 
     def remove_segment(self, segment_number):
         """
@@ -905,6 +1143,7 @@ class CalculatorTab(QWidget):
             
             # Update button visibility for all segments
             self.update_buttons_visibility()
+            self.schedule_preview("start_time" if remove_index == 0 else "route")
 
     def rebuild_segments_layout(self):
         """Completely rebuild the segments layout with current widgets"""
@@ -1005,169 +1244,276 @@ class CalculatorTab(QWidget):
                 return airport_info.get('timezone', 'Europe/Minsk')
         return 'Europe/Minsk'  # По умолчанию
 
+    def schedule_preview(self, *keys):
+        """
+        Отмечает измененные входные данные (ключи PREVIEW_SECTIONS, без ключей - все) и планирует
+        пересчет предварительного просмотра. Пока пересчет запланирован, новые изменения
+        только добавляются в preview_dirty.
+        """
+        self.preview_dirty.update(keys or PREVIEW_INPUTS)
+        self.preview_stats["requests"] += 1
+        if self.preview_timer.isActive():
+            self.preview_stats["coalesced"] += 1
+        else:
+            self.preview_timer.start()
+
+    def collect_preview_inputs(self):
+        """Текущие значения полей, которые показывает предварительный просмотр"""
+        transfer_enabled = self.transfer_check.isChecked()
+        return {
+            'start_time': self.get_fdp_start_time(),  # Получаем время из маршрута
+            'base_tz': self.base_timezone_combo.currentText(),
+            'local_tz': self.get_departure_timezone(),  # Автоматически определяем часовой пояс
+            'hours_since_duty': self.hours_since_duty_spin.value(),
+            'sectors': self.get_sectors_count(),
+            'has_frms': self.has_frms_combo.currentText() == "Да",
+            'rest_in_flight': self.rest_in_flight_check.isChecked(),
+            'rest_class': self.rest_facility_combo.currentText(),
+            'transfer_enabled': transfer_enabled,
+            'transfer_hours': self.transfer_hours_spin.value() if transfer_enabled else 0,
+            'transfer_minutes': self.transfer_minutes_spin.value() if transfer_enabled else 0,
+        }
+
     def update_preview(self):
-        """Обновляет предварительный просмотр результатов"""
+        """Пересчитывает разделы предварительного просмотра, входные данные которых изменились"""
+        self.preview_timer.stop()
+        dirty = self.preview_dirty or set(PREVIEW_INPUTS)
+        self.preview_dirty = set()
+        self.preview_stats["recomputes"] += 1
         try:
-            # Собираем параметры
-            start_time = self.get_fdp_start_time()  # Получаем время из маршрута
-            base_tz = self.base_timezone_combo.currentText()
-            local_tz = self.get_departure_timezone()  # Автоматически определяем часовой пояс
-            hours_since_duty = self.hours_since_duty_spin.value()
-            sectors = self.get_sectors_count()
-            has_frms = self.has_frms_combo.currentText() == "Да"
-            rest_in_flight = self.rest_in_flight_check.isChecked()
-            
-            # Стандартные значения подготовительных операций
-            preflight = 1  # Стандартная предполетная подготовка - 1 час
-            postflight = 0.5  # Стандартная послеполетная подготовка - 30 минут
-            
-            # Трансфер только если включен (часы + минуты)
-            if self.transfer_check.isChecked():
-                transfer_hours = self.transfer_hours_spin.value()
-                transfer_minutes = self.transfer_minutes_spin.value()
-                transfer = transfer_hours + (transfer_minutes / 60.0)  # Переводим в часы
-            else:
-                transfer = 0
-            
+            inputs = self.collect_preview_inputs()
+            for name, depends_on in PREVIEW_SECTIONS:
+                if name in self.preview_sections and not dirty & depends_on:
+                    self.preview_stats["sections_skipped"] += 1
+                    continue
+                self.preview_sections[name] = getattr(self, f"preview_{name}_section")(inputs)
+                self.preview_stats["sections_built"] += 1
+
             # Формируем предварительный просмотр
             preview = f"ПРЕДВАРИТЕЛЬНЫЙ ПРОСМОТР\n"
             preview += "=" * 40 + "\n\n"
-            
-            preview += f"📅 Дата и время начала FDP: {start_time.strftime('%d.%m.%Y %H:%M')}\n"
-            preview += f"🌍 Базовый часовой пояс: {base_tz}\n"
-            preview += f"🌍 Местный часовой пояс: {local_tz}\n"
-            preview += f"⏰ Часов с начала выполнения обязанностей: {hours_since_duty}\n"
-            preview += f"✈️ Количество секторов: {sectors}\n"
-            preview += f"📊 Наличие FRMS: {'Да' if has_frms else 'Нет'}\n"
-            preview += f"🛏️ Отдых в полете: {'Да' if rest_in_flight else 'Нет'}\n"
-            preview += f"🛫 Предполетная подготовка: {preflight} часов\n"
-            preview += f"🛬 Послеполетная подготовка: {postflight} часов\n"
-            if self.transfer_check.isChecked():
-                transfer_hours = self.transfer_hours_spin.value()
-                transfer_minutes = self.transfer_minutes_spin.value()
-                if transfer_minutes > 0:
-                    preview += f"🚗 Трансфер: {transfer_hours}ч {transfer_minutes}мин\n"
-                else:
-                    preview += f"🚗 Трансфер: {transfer_hours} часов\n"
-            else:
-                preview += f"🚗 Трансфер: отключен\n"
-            
-            if rest_in_flight:
-                rest_class = self.rest_facility_combo.currentText()
-                preview += f"🏨 Класс места для отдыха: {rest_class}\n"
-            
-            # Проверка циркадного окна
-            hour = start_time.hour
-            if 2 <= hour <= 5:
-                preview += f"\n⚠️ ВНИМАНИЕ: Время начала FDP попадает в окно минимальной циркадной активности (02:00-05:59)\n"
-            
-            # Попытка определения акклиматизации
-            try:
-                acclimatization_status = self.calculator.determine_acclimatization(
-                    base_tz, local_tz, hours_since_duty
-                )
-                status_text = {
-                    'Б': "Акклиматизирован к базовому времени",
-                    'В': "Акклиматизирован к новому времени", 
-                    'Н': "Неопределенное состояние акклиматизации"
-                }
-                preview += f"\n🧠 Состояние акклиматизации: {acclimatization_status.value} - {status_text[acclimatization_status.value]}\n"
-                
-            except Exception as e:
-                preview += f"\n❌ Ошибка определения акклиматизации: {str(e)}\n"
-            
-            # Информация о маршруте
-            segments = self.get_route_segments()
-            if segments:
-                preview += f"\nМАРШРУТ ПОЛЕТА:\n"
-                for segment in segments:
-                    preview += f"{segment['segment']}. {segment['departure']} → {segment['arrival']}\n"
-                    preview += f"   Вылет: {segment['departure_time'].strftime('%d.%m.%Y %H:%M')}\n"
-                    preview += f"   Прилет: {segment['arrival_time'].strftime('%d.%m.%Y %H:%M')}\n"
-            
+            preview += "".join(self.preview_sections[name] for name, _ in PREVIEW_SECTIONS)
             self.preview_tab.setPlainText(preview)
             
         except Exception as e:
+            self.preview_sections.clear()
             self.preview_tab.setPlainText(f"Ошибка обновления предварительного просмотра: {str(e)}")
+        self.preview_tab.setToolTip(self.preview_statistics_text())
+
+    def preview_parameters_section(self, inputs):
+        """Раздел параметров FDP"""
+        preflight = PREFLIGHT_HOURS
+        postflight = POSTFLIGHT_HOURS
+
+        preview = f"📅 Дата и время начала FDP: {inputs['start_time'].strftime('%d.%m.%Y %H:%M')}\n"
+        preview += f"🌍 Базовый часовой пояс: {inputs['base_tz']}\n"
+        preview += f"🌍 Местный часовой пояс: {inputs['local_tz']}\n"
+        preview += f"⏰ Часов с начала выполнения обязанностей: {inputs['hours_since_duty']}\n"
+        preview += f"✈️ Количество секторов: {inputs['sectors']}\n"
+        preview += f"📊 Наличие FRMS: {'Да' if inputs['has_frms'] else 'Нет'}\n"
+        preview += f"🛏️ Отдых в полете: {'Да' if inputs['rest_in_flight'] else 'Нет'}\n"
+        preview += f"🛫 Предполетная подготовка: {preflight} часов\n"
+        preview += f"🛬 Послеполетная подготовка: {postflight} часов\n"
+        if inputs['transfer_enabled']:
+            if inputs['transfer_minutes'] > 0:
+                preview += f"🚗 Трансфер: {inputs['transfer_hours']}ч {inputs['transfer_minutes']}мин\n"
+            else:
+                preview += f"🚗 Трансфер: {inputs['transfer_hours']} часов\n"
+        else:
+            preview += f"🚗 Трансфер: отключен\n"
+        
+        if inputs['rest_in_flight']:
+            preview += f"🏨 Класс места для отдыха: {inputs['rest_class']}\n"
+        return preview
 
-    def calculate_all(self):
-        """Выполняет полный расчет FDP"""
+    def preview_circadian_section(self, inputs):
+        """Проверка циркадного окна"""
+        hour = inputs['start_time'].hour
+        if 2 <= hour <= 5:
+            return f"\n⚠️ ВНИМАНИЕ: Время начала FDP попадает в окно минимальной циркадной активности (02:00-05:59)\n"
+        return ""
+
+    def preview_acclimatization_section(self, inputs):
+        """Состояние акклиматизации; determine_acclimatization вызывается, только если изменились его параметры"""
+        key = (inputs['base_tz'], inputs['local_tz'], inputs['hours_since_duty'], inputs['start_time'])
+        if key == self.acclimatization_key and "acclimatization" in self.preview_sections:
+            self.preview_stats["acclimatization_skipped"] += 1
+            return self.preview_sections["acclimatization"]
+
+        self.preview_stats["acclimatization_runs"] += 1
+        self.acclimatization_key = key
+        # Попытка определения акклиматизации
         try:
-            # Собираем все параметры
-            start_time = self.get_fdp_start_time()  # Получаем время из маршрута
-            base_tz = self.base_timezone_combo.currentText()
-            local_tz = self.get_departure_timezone()  # Автоматически определяем часовой пояс
-            hours_since_duty = self.hours_since_duty_spin.value()
-            sectors = self.get_sectors_count()
-            has_frms = self.has_frms_combo.currentText() == "Да"
-            rest_in_flight = self.rest_in_flight_check.isChecked()
-            
-            # Стандартные значения подготовительных операций
-            preflight = 1  # Стандартная предполетная подготовка - 1 час
-            postflight = 0.5  # Стандартная послеполетная подготовка - 30 минут
-            
-            # Трансфер только если включен (часы + минуты)
-            if self.transfer_check.isChecked():
-                transfer_hours = self.transfer_hours_spin.value()
-                transfer_minutes = self.transfer_minutes_spin.value()
-                transfer = transfer_hours + (transfer_minutes / 60.0)  # Переводим в часы
-            else:
-                transfer = 0
-            
-            rest_class_map = {"Не предусмотрен": None, "1 класс": 1, "2 класс": 2, "3 класс": 3}
-            rest_facility_class = rest_class_map[self.rest_facility_combo.currentText()] if rest_in_flight else None
-            
-            # Определяем акклиматизацию
-            acclimatization_status = self.calculator.determine_acclimatization(
-                base_tz, local_tz, hours_since_duty
-            )
-            
-            # Рассчитываем максимальное FDP
-            max_fdp = self.calculator.calculate_max_fdp(
-                start_time, sectors, acclimatization_status, has_frms, rest_facility_class
-            )
-            
-            # Рассчитываем необходимый отдых
-            is_at_home_base = base_tz == local_tz
-            required_rest = self.calculator.calculate_required_rest(max_fdp, is_at_home_base)
-            
-            # Рассчитываем продление без отдыха в полете
-            extension_without_rest = self.calculator.calculate_extension_without_rest(start_time, sectors)
-            
-            # Рассчитываем минимальный отдых в полете
-            min_rest_in_flight = None
-            if rest_in_flight and rest_facility_class:
-                min_rest_in_flight = self.calculator.calculate_min_in_flight_rest(max_fdp, rest_facility_class)
-            
-            # Сохраняем результаты
-            self.calculation_results = {
-                'start_time': start_time,
-                'base_tz': base_tz,
-                'local_tz': local_tz,
-                'hours_since_duty': hours_since_duty,
-                'sectors': sectors,
-                'has_frms': has_frms,
-                'rest_in_flight': rest_in_flight,
-                'rest_facility_class': rest_facility_class,
-                'preflight': preflight,
-                'postflight': postflight,
-                'transfer': transfer,
-                'acclimatization_status': acclimatization_status,
-                'max_fdp': max_fdp,
-                'required_rest': required_rest,
-                'extension_without_rest': extension_without_rest,
-                'min_rest_in_flight': min_rest_in_flight,
-                'is_at_home_base': is_at_home_base
+            acclimatization_status = self.calculator.determine_acclimatization(*key)
+            status_text = {
+                'Б': "Акклиматизирован к базовому времени",
+                'В': "Акклиматизирован к новому времени", 
+                'Н': "Неопределенное состояние акклиматизации"
             }
+            return f"\n🧠 Состояние акклиматизации: {acclimatization_status.value} - {status_text[acclimatization_status.value]}\n"
             
-            # Обновляем результаты
-            self.update_results()
-            
-            # Показываем сообщение об успехе
-            QMessageBox.information(self, "Успех", "Расчет FDP выполнен успешно!")
-            
+        except Exception as e:
+            return f"\n❌ Ошибка определения акклиматизации: {str(e)}\n"
+
+    def preview_route_section(self, inputs):
+        """Информация о маршруте"""
+        segments = self.get_route_segments()
+        preview = ""
+        if segments:
+            preview += f"\nМАРШРУТ ПОЛЕТА:\n"
+            for segment in segments:
+                preview += f"{segment['segment']}. {segment['departure']} → {segment['arrival']}\n"
+                preview += f"   Вылет: {segment['departure_time'].strftime('%d.%m.%Y %H:%M')}\n"
+                preview += f"   Прилет: {segment['arrival_time'].strftime('%d.%m.%Y %H:%M')}\n"
+        return preview
+
+    def preview_statistics_text(self):
+        """Счетчики пересчетов предварительного просмотра (подсказка вкладки)"""
+        stats = self.preview_stats
+        return (
+            f"Пересчетов просмотра: {stats['recomputes']} на {stats['requests']} изменений полей "
+            f"(объединено: {stats['coalesced']})\n"
+            f"Разделов построено: {stats['sections_built']}, пропущено: {stats['sections_skipped']}\n"
+            f"Расчетов акклиматизации: {stats['acclimatization_runs']}, "
+            f"пропущено: {stats['acclimatization_skipped']}"
+        )
+
+    def collect_calculation_inputs(self):
+        """Снимок всех параметров расчета с виджетов (в потоке GUI)"""
+        rest_in_flight = self.rest_in_flight_check.isChecked()
+
+        # Трансфер только если включен (часы + минуты)
+        if self.transfer_check.isChecked():
+            transfer_hours = self.transfer_hours_spin.value()
+            transfer_minutes = self.transfer_minutes_spin.value()
+            transfer = transfer_hours + (transfer_minutes / 60.0)  # Переводим в часы
+        else:
+            transfer = 0
+
+        # Снимок - ключ ResultCache: время с точностью до минуты (как в полях ввода), пояс без пробелов
+        return CalculationInputs(
+            start_time=self.get_fdp_start_time().replace(second=0, microsecond=0),  # Получаем время из маршрута
+            base_tz=self.base_timezone_combo.currentText().strip(),
+            local_tz=self.get_departure_timezone(),  # Автоматически определяем часовой пояс
+            hours_since_duty=self.hours_since_duty_spin.value(),
+            sectors=self.get_sectors_count(),
+            has_frms=self.has_frms_combo.currentText() == "Да",
+            rest_in_flight=rest_in_flight,
+            rest_facility_class=REST_CLASS_MAP[self.rest_facility_combo.currentText()] if rest_in_flight else None,
+            transfer=transfer,
+        )
+
+    def calculate_all(self):
+        """Запускает полный расчет FDP в фоне; незавершенный предыдущий расчет отменяется"""
+        try:
+            inputs = self.collect_calculation_inputs()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка при расчете FDP: {str(e)}")
+            return
+
+        if self.calculation_worker is not None:
+            self.calculation_worker.cancel()
+        self.calculation_generation += 1
+
+        # Тот же сценарий уже считали: результат и вкладки берутся из кэша
+        bundle = self.result_cache.get(inputs)
+        if bundle is not None:
+            self.calculation_worker = None
+            self.show_calculation(bundle)
+            self.calculation_status_label.setText(
+                f"✅ Расчет FDP выполнен, из кэша ({datetime.now().strftime('%H:%M:%S')})")
+            self.calculation_status_label.setToolTip(self.calculation_statistics_text())
+            return
+
+        worker = CalculatorWorker(self.calculation_generation, inputs, self.calculator)
+        worker.signals.finished.connect(self.on_calculation_finished)
+        worker.signals.failed.connect(self.on_calculation_failed)
+        worker.signals.cancelled.connect(self.on_calculation_cancelled)
+        self.calculation_worker = worker
+        self.calculation_stats["started"] += 1
+        self.calculation_status_label.setText("⏳ Расчет выполняется...")
+        self.calculation_pool.start(worker)
+
+    def is_current_calculation(self, generation):
+        """Результат последнего запроса; ответы замененных запросов отбрасываются"""
+        if generation != self.calculation_generation:
+            self.calculation_stats["stale"] += 1
+            return False
+        self.calculation_worker = None
+        return True
+
+    def on_calculation_finished(self, generation, results):
+        if not self.is_current_calculation(generation):
+            return
+        self.calculation_stats["finished"] += 1
+        bundle = CalculationBundle(results, self.render_sections("details", DETAIL_SECTIONS, results),
+                                   self.render_sections("recommendations", RECOMMENDATION_SECTIONS, results))
+        inputs = CalculationInputs(**{field: results[field] for field in CalculationInputs._fields})
+        self.result_cache.put(inputs, bundle)
+        self.show_calculation(bundle)
+        self.calculation_status_label.setText(f"✅ Расчет FDP выполнен ({datetime.now().strftime('%H:%M:%S')})")
+        self.calculation_status_label.setToolTip(self.calculation_statistics_text())
+
+    def on_calculation_failed(self, generation, message):
+        if not self.is_current_calculation(generation):
+            return
+        self.calculation_status_label.setText("❌ Ошибка расчета")
+        QMessageBox.critical(self, "Ошибка", f"Ошибка при расчете FDP: {message}")
+
+    def on_calculation_cancelled(self, generation):
+        self.calculation_stats["cancelled"] += 1
+
+    def show_calculation(self, bundle):
+        """Показывает готовый результат расчета во вкладках"""
+        # Сохраняем результаты
+        self.calculation_results = bundle.results
+        self.show_detail_sections(bundle.detail_sections)
+        self.show_recommendation_sections(bundle.recommendation_sections)
+
+    def show_detail_sections(self, sections):
+        if self.details_document is None:
+            self.details_document = SectionedDocument(self.details_tab, [name for name, _ in DETAIL_SECTIONS])
+        self.calculation_stats["sections_replaced"] += self.details_document.update(sections)
+
+    def show_recommendation_sections(self, sections):
+        if self.recommendations_document is None:
+            self.recommendations_document = SectionedDocument(
+                self.recommendations_tab, [name for name, _ in RECOMMENDATION_SECTIONS], html=False)
+        self.calculation_stats["sections_replaced"] += self.recommendations_document.update(sections)
+
+    def render_sections(self, tab, sections, results):
+        """
+        Содержимое разделов вкладки tab ("details"/"recommendations") по results: раздел
+        собирается методом render_<tab>_<раздел>, только если изменились его поля, иначе
+        берется последняя сборка.
+        """
+        rendered = {}
+        for name, fields in sections:
+            key = tuple(results[field] for field in fields)
+            cached = self.section_renders.get((tab, name))
+            if cached is not None and cached[0] == key:
+                self.calculation_stats["sections_reused"] += 1
+                rendered[name] = cached[1]
+                continue
+            content = getattr(self, f"render_{tab}_{name}")(results)
+            self.section_renders[(tab, name)] = (key, content)
+            self.calculation_stats["sections_rendered"] += 1
+            rendered[name] = content
+        return rendered
+
+    def calculation_statistics_text(self):
+        """Счетчики фоновых расчетов и кэша результатов (подсказка строки состояния)"""
+        stats = self.calculation_stats
+        cache_stats = self.result_cache.stats
+        return (
+            f"Расчетов запущено: {stats['started']}, выполнено: {stats['finished']}, "
+            f"отменено: {stats['cancelled']}, устаревших: {stats['stale']}\n"
+            f"Кэш результатов: {len(self.result_cache)} из {self.result_cache.max_size}, "
+            f"попаданий: {cache_stats['hits']}, промахов: {cache_stats['misses']}, "
+            f"вытеснено: {cache_stats['evictions']}\n"
+            f"Разделов собрано: {stats['sections_rendered']}, взято готовыми: {stats['sections_reused']}, "
+            f"заменено в документах: {stats['sections_replaced']}"
+        )
 
     def update_results(self):
         """Обновляет все вкладки с результатами"""
@@ -1182,136 +1528,143 @@ class CalculatorTab(QWidget):
 
     def update_detailed_results(self):
         """Обновляет вкладку с детальными результатами"""
-        results = self.calculation_results
-        
+        self.show_detail_sections(self.render_sections("details", DETAIL_SECTIONS, self.calculation_results))
+
+    def render_details_title(self, results):
         # Определяем цветовое кодирование на основе результатов
         status_color = self.get_result_status_color(results)
-        
-        details = f"<h2 style='color: {status_color};'>ДЕТАЛЬНЫЕ РЕЗУЛЬТАТЫ РАСЧЕТА FDP</h2>"
-        details += "<hr>"
-        
-        # Параметры расчета
-        details += "ПАРАМЕТРЫ РАСЧЕТА:\n"
-        details += f"📅 Дата и время начала FDP: {results['start_time'].strftime('%d.%m.%Y %H:%M')}\n"
-        details += f"🌍 Базовый часовой пояс: {results['base_tz']}\n"
-        details += f"🌍 Местный часовой пояс: {results['local_tz']}\n"
-        details += f"⏰ Часов с начала выполнения обязанностей: {results['hours_since_duty']}\n"
-        details += f"✈️ Количество секторов: {results['sectors']}\n"
-        details += f"📊 Наличие FRMS: {'Да' if results['has_frms'] else 'Нет'}\n"
-        details += f"🛏️ Отдых в полете: {'Да' if results['rest_in_flight'] else 'Нет'}\n"
-        details += f"🛫 Предполетная подготовка: {results['preflight']} часов (стандартное значение)\n"
-        details += f"🛬 Послеполетная подготовка: {results['postflight']} часов (стандартное значение)\n"
+        return f"<h2 style='color: {status_color};'>ДЕТАЛЬНЫЕ РЕЗУЛЬТАТЫ РАСЧЕТА FDP</h2><hr>"
+
+    def render_details_parameters(self, results):
+        lines = [
+            "ПАРАМЕТРЫ РАСЧЕТА:",
+            f"📅 Дата и время начала FDP: {results['start_time'].strftime('%d.%m.%Y %H:%M')}",
+            f"🌍 Базовый часовой пояс: {results['base_tz']}",
+            f"🌍 Местный часовой пояс: {results['local_tz']}",
+            f"⏰ Часов с начала выполнения обязанностей: {results['hours_since_duty']}",
+            f"✈️ Количество секторов: {results['sectors']}",
+            f"📊 Наличие FRMS: {'Да' if results['has_frms'] else 'Нет'}",
+            f"🛏️ Отдых в полете: {'Да' if results['rest_in_flight'] else 'Нет'}",
+            f"🛫 Предполетная подготовка: {results['preflight']} часов (стандартное значение)",
+            f"🛬 Послеполетная подготовка: {results['postflight']} часов (стандартное значение)",
+        ]
         if results['transfer'] > 0:
             transfer_hours = int(results['transfer'])
             transfer_minutes = int((results['transfer'] - transfer_hours) * 60)
             if transfer_minutes > 0:
-                details += f"🚗 Трансфер: {transfer_hours}ч {transfer_minutes}мин (включен)\n"
+                lines.append(f"🚗 Трансфер: {transfer_hours}ч {transfer_minutes}мин (включен)")
             else:
-                details += f"🚗 Трансфер: {transfer_hours} часов (включен)\n"
+                lines.append(f"🚗 Трансфер: {transfer_hours} часов (включен)")
         else:
-            details += f"🚗 Трансфер: отключен\n"
+            lines.append("🚗 Трансфер: отключен")
         
         if results['rest_facility_class']:
-            details += f"🏨 Класс места для отдыха: {results['rest_facility_class']} класс\n"
-        
-        details += "\n"
-        
+            lines.append(f"🏨 Класс места для отдыха: {results['rest_facility_class']} класс")
+        return "<br>".join(lines)
+
+    def render_details_acclimatization(self, results):
         # Состояние акклиматизации
         status_text = {
             'Б': "Акклиматизирован к базовому времени",
             'В': "Акклиматизирован к новому времени", 
             'Н': "Неопределенное состояние акклиматизации"
         }
-        details += f"🧠 Состояние акклиматизации: {results['acclimatization_status'].value} - {status_text[results['acclimatization_status'].value]}\n\n"
-        
-        # Основные результаты
-        details += "ОСНОВНЫЕ РЕЗУЛЬТАТЫ:\n"
-        details += f"⏱️ Максимальное FDP: {results['max_fdp']}\n"
-        details += f"😴 Необходимый отдых: {results['required_rest']}\n"
-        details += f"📍 Место отдыха: {'Основное место базирования' if results['is_at_home_base'] else 'Вне основного места базирования'}\n\n"
-        
-        # Продление FDP
-        details += "ПРОДЛЕНИЕ FDP:\n"
+        status = results['acclimatization_status'].value
+        return f"🧠 Состояние акклиматизации: {status} - {status_text[status]}"
+
+    def render_details_main_results(self, results):
+        return (
+            "ОСНОВНЫЕ РЕЗУЛЬТАТЫ:<br>"
+            f"⏱️ Максимальное FDP: {results['max_fdp']}<br>"
+            f"😴 Необходимый отдых: {results['required_rest']}<br>"
+            f"📍 Место отдыха: {'Основное место базирования' if results['is_at_home_base'] else 'Вне основного места базирования'}"
+        )
+
+    def render_details_extension(self, results):
+        extension = "ПРОДЛЕНИЕ FDP:<br>"
         if results['extension_without_rest']:
-            details += f"⏰ Продление без отдыха в полете: {results['extension_without_rest']}\n"
+            extension += f"⏰ Продление без отдыха в полете: {results['extension_without_rest']}"
         else:
-            details += "❌ Продление без отдыха в полете не допускается\n"
+            extension += "❌ Продление без отдыха в полете не допускается"
         
         if results['min_rest_in_flight']:
-            details += f"🛏️ Минимальный отдых в полете: {results['min_rest_in_flight']}\n"
-        
-        # Добавляем прогресс-бары и статусные индикаторы
-        details += self.add_progress_bars(results)
-        
-        # Добавляем статусный индикатор
+            extension += f"<br>🛏️ Минимальный отдых в полете: {results['min_rest_in_flight']}"
+        return extension
+
+    def render_details_progress_bars(self, results):
+        return self.add_progress_bars(results)
+
+    def render_details_status(self, results):
         hour = results['start_time'].hour
         if 2 <= hour <= 5:
-            details += self.create_status_indicator('warning', '⚠️ Время начала FDP попадает в окно циркадной активности')
-        else:
-            details += self.create_status_indicator('safe', '✅ Время начала FDP в норме')
-        
-        self.details_tab.setHtml(details)
+            return self.create_status_indicator('warning', '⚠️ Время начала FDP попадает в окно циркадной активности')
+        return self.create_status_indicator('safe', '✅ Время начала FDP в норме')
 
     def update_recommendations(self):
         """Обновляет вкладку с рекомендациями"""
-        results = self.calculation_results
-        
-        recommendations = f"РЕКОМЕНДАЦИИ И ПРЕДУПРЕЖДЕНИЯ\n"
-        recommendations += "=" * 40 + "\n\n"
-        
+        self.show_recommendation_sections(
+            self.render_sections("recommendations", RECOMMENDATION_SECTIONS, self.calculation_results))
+
+    def render_recommendations_title(self, results):
+        return "РЕКОМЕНДАЦИИ И ПРЕДУПРЕЖДЕНИЯ\n" + "=" * 40
+
+    def render_recommendations_circadian(self, results):
         # Проверка циркадного окна
         hour = results['start_time'].hour
-        if 2 <= hour <= 5:
-            recommendations += "⚠️ КРИТИЧЕСКОЕ ПРЕДУПРЕЖДЕНИЕ:\n"
-            recommendations += "Время начала FDP попадает в окно минимальной циркадной активности (02:00-05:59).\n"
-            recommendations += "Это требует дополнительных ограничений согласно документу №110.\n\n"
-            
-            if results['has_frms']:
-                if results['sectors'] <= 5:
-                    recommendations += "При наличии FRMS допускается до 5 секторов, если они не попадают в окно циркадной активности более чем на 2 часа.\n"
-                elif results['sectors'] <= 4:
-                    recommendations += "При наличии FRMS допускается до 4 секторов, если они попадают в окно циркадной активности на 2 часа или меньше.\n"
-                else:
-                    recommendations += "При наличии FRMS допускается до 2 секторов, если они попадают в окно циркадной активности более чем на 2 часа.\n"
+        if not 2 <= hour <= 5:
+            return ""
+        recommendations = "⚠️ КРИТИЧЕСКОЕ ПРЕДУПРЕЖДЕНИЕ:\n"
+        recommendations += "Время начала FDP попадает в окно минимальной циркадной активности (02:00-05:59).\n"
+        recommendations += "Это требует дополнительных ограничений согласно документу №110.\n\n"
+        
+        if results['has_frms']:
+            if results['sectors'] <= 5:
+                recommendations += "При наличии FRMS допускается до 5 секторов, если они не попадают в окно циркадной активности более чем на 2 часа."
+            elif results['sectors'] <= 4:
+                recommendations += "При наличии FRMS допускается до 4 секторов, если они попадают в окно циркадной активности на 2 часа или меньше."
             else:
-                recommendations += "Без FRMS рекомендуется избегать полетов в это время.\n"
-            
-            recommendations += "\n"
-        
+                recommendations += "При наличии FRMS допускается до 2 секторов, если они попадают в окно циркадной активности более чем на 2 часа."
+        else:
+            recommendations += "Без FRMS рекомендуется избегать полетов в это время."
+        return recommendations
+
+    def render_recommendations_acclimatization(self, results):
         # Рекомендации по акклиматизации
-        if results['acclimatization_status'].value == 'Н':
-            recommendations += "🧠 РЕКОМЕНДАЦИЯ ПО АККЛИМАТИЗАЦИИ:\n"
-            recommendations += "Состояние акклиматизации не определено. Рекомендуется использовать наиболее строгие ограничения.\n\n"
-        
+        if results['acclimatization_status'].value != 'Н':
+            return ""
+        return ("🧠 РЕКОМЕНДАЦИЯ ПО АККЛИМАТИЗАЦИИ:\n"
+                "Состояние акклиматизации не определено. Рекомендуется использовать наиболее строгие ограничения.")
+
+    def render_recommendations_rest(self, results):
         # Рекомендации по отдыху
-        recommendations += "😴 РЕКОМЕНДАЦИИ ПО ОТДЫХУ:\n"
+        recommendations = "😴 РЕКОМЕНДАЦИИ ПО ОТДЫХУ:\n"
         if results['is_at_home_base']:
             recommendations += "• Отдых в основном месте базирования\n"
             recommendations += "• Минимум 8 часов сна без учета трансфера\n"
-            recommendations += "• Общий период отдыха: не менее 12 часов или продолжительность предыдущего FDP\n"
+            recommendations += "• Общий период отдыха: не менее 12 часов или продолжительность предыдущего FDP"
         else:
             recommendations += "• Отдых вне основного места базирования\n"
             recommendations += "• Минимум 8 часов сна + 1 час на физиологические потребности\n"
-            recommendations += "• Общий период отдыха: не менее 10 часов или продолжительность предыдущего FDP\n"
-        
-        recommendations += "\n"
-        
+            recommendations += "• Общий период отдыха: не менее 10 часов или продолжительность предыдущего FDP"
+        return recommendations
+
+    def render_recommendations_extension(self, results):
         # Рекомендации по продлению
-        if results['extension_without_rest']:
-            recommendations += "⏰ РЕКОМЕНДАЦИИ ПО ПРОДЛЕНИЮ FDP:\n"
-            recommendations += "• Продление возможно на срок до 1 часа\n"
-            recommendations += "• Не более 2 раз в любые 7 последовательных дней\n"
-            recommendations += "• При каждом продлении отдых увеличивается на 4 часа\n"
-            recommendations += "• Требуется устное согласие всех членов экипажа\n\n"
-        
+        if not results['extension_without_rest']:
+            return ""
+        return ("⏰ РЕКОМЕНДАЦИИ ПО ПРОДЛЕНИЮ FDP:\n"
+                "• Продление возможно на срок до 1 часа\n"
+                "• Не более 2 раз в любые 7 последовательных дней\n"
+                "• При каждом продлении отдых увеличивается на 4 часа\n"
+                "• Требуется устное согласие всех членов экипажа")
+
+    def render_recommendations_general(self, results):
         # Общие рекомендации
-        recommendations += "📋 ОБЩИЕ РЕКОМЕНДАЦИИ:\n"
-        recommendations += "• Соблюдайте все ограничения документа №110\n"
-        recommendations += "• При непредвиденных обстоятельствах после взлета - полет до запланированного аэродрома\n"
-        recommendations += "• Минимальный отдых после FDP: не менее 10 часов (включая 8 часов сна)\n"
-        recommendations += "• Ведите учет всех изменений и продлений FDP\n"
-        
-        self.recommendations_tab.setPlainText(recommendations)
+        return ("📋 ОБЩИЕ РЕКОМЕНДАЦИИ:\n"
+                "• Соблюдайте все ограничения документа №110\n"
+                "• При непредвиденных обстоятельствах после взлета - полет до запланированного аэродрома\n"
+                "• Минимальный отдых после FDP: не менее 10 часов (включая 8 часов сна)\n"
+                "• Ведите учет всех изменений и продлений FDP")
 
     def export_results(self):
         """Экспортирует результаты в файл"""
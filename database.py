@@ -1,176 +1,575 @@
 import sqlite3
 import os
-from datetime import datetime
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import sql_trace
+from limits import CREW_TOTALS_FROM_FLIGHTS_QUERY, CREW_TOTALS_QUERY, epoch_window_bounds, window_bounds
+from migrations import (EPOCH_COLUMNS, RAW_DAILY_FLIGHT_MINUTES_QUERY, RAW_MONTHLY_FLIGHT_STATS_QUERY, SCHEMA_VERSION,
+                        get_schema_version, migrate)
+
+
+def to_epoch(value):
+	"""
+	Переводит datetime, date или строку ISO в секунды Unix так же, как strftime('%s') в SQLite:
+	время без часового пояса считается UTC. None остается None.
+	"""
+	if value is None:
+		return None
+	if isinstance(value, str):
+		value = datetime.fromisoformat(value.strip())
+	if not isinstance(value, datetime):
+		value = datetime(value.year, value.month, value.day)
+	if value.tzinfo is None:
+		value = value.replace(tzinfo=timezone.utc)
+	return int(value.timestamp())
+
+
+def month_key(value):
+	"""Месяц (год, месяц) из кортежа, date/datetime или строки 'YYYY-MM' / 'YYYY-MM-DD ...'"""
+	if isinstance(value, tuple):
+		year, month = value
+	elif isinstance(value, str):
+		year, month = int(value[:4]), int(value[5:7])
+	else:
+		year, month = value.year, value.month
+	if not 1 <= month <= 12:
+		raise ValueError(f"Некорректный месяц: {value!r}")
+	return year, month
+
+
+# Месячная сводка за диапазон месяцев включительно: по члену экипажа (по первичному ключу)
+# и по всему парку (по индексу idx_monthly_stats_month)
+MONTHLY_STATS_COLUMNS = "year, month, flight_minutes, sector_count, flight_days, duty_count"
+CREW_MONTHLY_STATS_QUERY = f'''
+	SELECT {MONTHLY_STATS_COLUMNS}
+	FROM crew_monthly_flight_stats
+	WHERE crew_member_id = ? AND (year, month) BETWEEN (?, ?) AND (?, ?)
+	ORDER BY year, month
+'''
+FLEET_MONTHLY_STATS_QUERY = '''
+	SELECT year, month, SUM(flight_minutes), SUM(sector_count), SUM(flight_days), SUM(duty_count),
+	       COUNT(CASE WHEN sector_count > 0 OR duty_count > 0 THEN 1 END)
+	FROM crew_monthly_flight_stats
+	WHERE (year, month) BETWEEN (?, ?) AND (?, ?)
+	GROUP BY year, month
+	ORDER BY year, month
+'''
+
+# Границы ID членов экипажа для RAW_MONTHLY_FLIGHT_STATS_QUERY без ограничения
+ALL_CREW_RANGE = {"low": -2 ** 63, "high": 2 ** 63 - 1}
+
+
+# Задание с членом экипажа и воздушным судном (столбцы как у get_duties_with_details).
+# LEFT JOIN: внешние ключи не проверяются (PRAGMA foreign_keys выключен), и задания удаленного
+# ВС или члена экипажа остаются в duties - они выбираются с NULL в crew_name/registration/aircraft_type.
+DUTY_DETAILS_SELECT = '''
+	SELECT d.id, d.crew_member_id, cm.name AS crew_name,
+	       d.aircraft_id, a.registration, a.type AS aircraft_type,
+	       d.start_time, d.scheduled_sectors, d.departure_airport,
+	       d.arrival_airport, d.rest_in_flight, d.has_frms, d.status
+	FROM duties d
+	LEFT JOIN crew_members cm ON d.crew_member_id = cm.id
+	LEFT JOIN aircrafts a ON d.aircraft_id = a.id
+'''
+
+# Размер страницы и пачки fetchmany по умолчанию
+DUTY_PAGE_SIZE = 100
+DUTY_FETCH_SIZE = 500
+
+
+def build_duties_query(crew_member_id=None, aircraft_id=None, status=None, start_date=None, end_date=None,
+                       after=None, descending=False, limit=None):
+	"""
+	Собирает запрос DUTY_DETAILS_SELECT с фильтрами и порядком (start_epoch, id).
+	Период - полуинтервал [start_date, end_date); status - строка или список статусов;
+	after - ключ (start_time, id) последней строки предыдущей страницы.
+	Возвращает (sql, параметры).
+	"""
+	conditions = []
+	params = []
+	if crew_member_id is not None:
+		conditions.append("d.crew_member_id = ?")
+		params.append(crew_member_id)
+	if aircraft_id is not None:
+		conditions.append("d.aircraft_id = ?")
+		params.append(aircraft_id)
+	if status is not None:
+		statuses = [status] if isinstance(status, str) else list(status)
+		conditions.append(f"d.status IN ({', '.join('?' * len(statuses))})")
+		params.extend(statuses)
+	if start_date is not None:
+		conditions.append("d.start_epoch >= ?")
+		params.append(to_epoch(start_date))
+	if end_date is not None:
+		conditions.append("d.start_epoch < ?")
+		params.append(to_epoch(end_date))
+	if after is not None:
+		after_time, after_id = after
+		# Сравнение пар по индексу (..., start_epoch, id): страница начинается сразу после ключа
+		conditions.append(f"(d.start_epoch, d.id) {'<' if descending else '>'} (?, ?)")
+		params.extend([to_epoch(after_time), after_id])
+
+	order = "DESC" if descending else "ASC"
+	sql = DUTY_DETAILS_SELECT
+	if conditions:
+		sql += "\tWHERE " + "\n\t  AND ".join(conditions) + "\n"
+	sql += f"\tORDER BY d.start_epoch {order}, d.id {order}\n"
+	if limit is not None:
+		sql += "\tLIMIT ?\n"
+		params.append(limit)
+	return sql, tuple(params)
+
+
+# Задания члена экипажа за период (get_duties_by_crew_member)
+CREW_DUTIES_SELECT = '''
+	SELECT d.id, d.crew_member_id, cm.name, d.aircraft_id, a.registration,
+	       d.start_time, d.scheduled_sectors, d.departure_airport, d.arrival_airport,
+	       d.rest_in_flight, d.has_frms, d.status
+	FROM duties d
+	JOIN crew_members cm ON d.crew_member_id = cm.id
+	JOIN aircrafts a ON d.aircraft_id = a.id
+	WHERE d.crew_member_id = ?
+'''
+
+
+def build_crew_duties_query(crew_member_id, start_date=None, end_date=None):
+	"""Запрос get_duties_by_crew_member: период [start_date, end_date] учитывается, если заданы обе границы"""
+	sql = CREW_DUTIES_SELECT
+	params = [crew_member_id]
+	if start_date and end_date:
+		sql += "\t  AND d.start_epoch BETWEEN ? AND ?\n"
+		params.extend([to_epoch(start_date), to_epoch(end_date)])
+	sql += "\tORDER BY d.start_epoch\n"
+	return sql, tuple(params)
+
+
+# Статистика налета члена экипажа за произвольный период по flights (get_flight_time_stats)
+FLIGHT_TIME_STATS_QUERY = '''
+	SELECT SUM(f.flight_time) as total_flight_time,
+	       COUNT(f.id) as total_flights,
+	       COUNT(DISTINCT DATE(f.off_block_time)) as flight_days
+	FROM flights f
+	JOIN duties d ON f.duty_id = d.id
+	WHERE d.crew_member_id = ?
+	  AND f.off_block_epoch BETWEEN ? AND ?
+'''
+
+# Периоды отдыха члена экипажа за период (get_rest_periods)
+REST_PERIODS_QUERY = '''
+	SELECT start_time, end_time, rest_type, location
+	FROM rest_periods
+	WHERE crew_member_id = ?
+	  AND start_epoch BETWEEN ? AND ?
+	ORDER BY start_epoch
+'''
+
+
+# Архив закрытых заданий и полетов (archive.py): отдельный файл рядом с основной базой.
+# Подключается к соединению как схема archive только для исторических запросов - с началом
+# периода раньше границы архива (настройка archive_cutoff_epoch, секунды UTC).
+ARCHIVE_SCHEMA = "archive"
+ARCHIVE_TABLES = ("duties", "flights")
+ARCHIVE_CUTOFF_SETTING = "archive_cutoff_epoch"
+_ARCHIVED_TABLE_RE = re.compile(r"\b(FROM|JOIN)\s+(duties|flights)\b")
+
+
+def archive_path(db_name):
+	"""Файл архива базы db_name: fdp_data.db -> fdp_data_archive.db"""
+	root, ext = os.path.splitext(db_name)
+	return f"{root}_archive{ext or '.db'}"
+
+
+# Частые запросы по диапазонам времени и индекс, который каждый из них должен использовать
+# (проверяется через EXPLAIN QUERY PLAN: python database.py check-plans)
+HOT_QUERIES = (
+	(
+		"Database.iter_duties(crew_member_id, период) - ScheduleTab.load_schedule",
+		*build_duties_query(crew_member_id=1, start_date="2024-01-01", end_date="2024-01-08"),
+		"idx_duties_crew_start_epoch",
+	),
+	(
+		"Database.get_duties_page(after=...)",
+		*build_duties_query(after=("2024-01-01 00:00:00", 1), limit=100),
+		"idx_duties_start_epoch",
+	),
+	(
+		"Database.get_duties_page(aircraft_id, after=...)",
+		*build_duties_query(aircraft_id=1, after=("2024-01-01 00:00:00", 1), limit=100),
+		"idx_duties_aircraft_start_epoch",
+	),
+	(
+		"Database.get_duties_by_crew_member",
+		*build_crew_duties_query(1, "2024-01-01", "2024-01-31"),
+		"idx_duties_crew_start_epoch",
+	),
+	(
+		"Database.get_flight_time_stats",
+		FLIGHT_TIME_STATS_QUERY,
+		(1, 0, 1),
+		"idx_flights_duty_off_block_epoch",
+	),
+	(
+		"Database.get_rest_periods",
+		REST_PERIODS_QUERY,
+		(1, 0, 1),
+		"idx_rest_periods_crew_start_epoch",
+	),
+	(
+		"limits.flight_time_totals(from_flights=True)",
+		CREW_TOTALS_FROM_FLIGHTS_QUERY,
+		dict(epoch_window_bounds(), crew_member_id=1),
+		"idx_flights_duty_off_block_epoch",
+	),
+	(
+		"limits.flight_time_totals",
+		CREW_TOTALS_QUERY,
+		dict(window_bounds(), crew_member_id=1),
+		"PRIMARY KEY",
+	),
+	(
+		"Database.get_monthly_flight_stats",
+		CREW_MONTHLY_STATS_QUERY,
+		(1, 2024, 1, 2024, 12),
+		"PRIMARY KEY",
+	),
+	(
+		"Database.get_fleet_monthly_flight_stats",
+		FLEET_MONTHLY_STATS_QUERY,
+		(2024, 1, 2024, 12),
+		"idx_monthly_stats_month",
+	),
+)
+
+
+# Столбцы массовой загрузки: порядок значений в строках-кортежах и значения по умолчанию
+# для необязательных хвостовых столбцов (строки-словари дополняются по именам)
+DUTY_BULK_COLUMNS = ('crew_member_id', 'aircraft_id', 'start_time', 'scheduled_sectors',
+                     'departure_airport', 'arrival_airport', 'rest_in_flight', 'has_frms')
+DUTY_BULK_DEFAULTS = {'rest_in_flight': False, 'has_frms': False}
+
+FLIGHT_BULK_COLUMNS = ('duty_id', 'departure_airport', 'arrival_airport', 'off_block_time',
+                       'on_block_time', 'flight_time', 'sector_number')
+FLIGHT_BULK_DEFAULTS = {'off_block_time': None, 'on_block_time': None, 'flight_time': None, 'sector_number': None}
+
+REST_PERIOD_BULK_COLUMNS = ('crew_member_id', 'start_time', 'end_time', 'rest_type', 'location', 'was_reduced')
+REST_PERIOD_BULK_DEFAULTS = {'location': None, 'was_reduced': False}
+
+# Количество строк в одном executemany при массовой загрузке
+BULK_BATCH_SIZE = 1000
+
+
+def _epoch_or_none(value):
+	"""to_epoch() для массовой загрузки: нераспознанное значение досчитает триггер"""
+	try:
+		return to_epoch(value)
+	except (TypeError, ValueError, OverflowError):
+		return None
+
+
+def _bulk_row_values(row, columns, defaults):
+	"""Приводит строку массовой загрузки (словарь или кортеж) к кортежу значений по columns"""
+	if isinstance(row, dict):
+		unknown = set(row) - set(columns)
+		if unknown:
+			raise ValueError(f"неизвестные столбцы: {', '.join(sorted(unknown))}")
+		missing = [column for column in columns if column not in row and column not in defaults]
+		if missing:
+			raise ValueError(f"нет значений для столбцов: {', '.join(missing)}")
+		return tuple(row[column] if column in row else defaults[column] for column in columns)
+
+	values = tuple(row)
+	required = len(columns) - len(defaults)
+	if not required <= len(values) <= len(columns):
+		raise ValueError(f"ожидалось от {required} до {len(columns)} значений, получено {len(values)}")
+	return values + tuple(defaults[column] for column in columns[len(values):])
+
+
+# Размер кэша подготовленных выражений для долгоживущих соединений пула
+STATEMENT_CACHE_SIZE = 256
+
+# Профили настроек SQLite, применяются к каждому новому соединению Database.
+# WAL позволяет читать во время записи (GUI не ждет фонового импорта);
+# cache_size в отрицательных значениях - КиБ, mmap_size - байты, busy_timeout - мс.
+# auto_vacuum действует только на еще пустой файл (до WAL и первой таблицы): новая база
+# создается с incremental auto_vacuum, место после переноса в архив (archive.py) возвращается по частям.
+PRAGMA_PROFILES = {
+	# Планирование в GUI: короткие транзакции, надежность при сбое питания достаточна с NORMAL в WAL
+	"interactive": (
+		("auto_vacuum", "INCREMENTAL"),
+		("journal_mode", "WAL"),
+		("synchronous", "NORMAL"),
+		("cache_size", -16000),
+		("mmap_size", 64 * 1024 * 1024),
+		("temp_store", "MEMORY"),
+		("busy_timeout", 5000),
+	),
+	# Массовый импорт: без fsync на каждую транзакцию, большой кэш, долгое ожидание блокировки
+	"bulk-load": (
+		("auto_vacuum", "INCREMENTAL"),
+		("journal_mode", "WAL"),
+		("synchronous", "OFF"),
+		("cache_size", -131072),
+		("mmap_size", 256 * 1024 * 1024),
+		("temp_store", "MEMORY"),
+		("busy_timeout", 30000),
+	),
+	# Отчеты: только чтение, большой кэш и mmap под агрегирующие запросы
+	"read-only-reporting": (
+		("journal_mode", "WAL"),
+		("synchronous", "NORMAL"),
+		("cache_size", -65536),
+		("mmap_size", 256 * 1024 * 1024),
+		("temp_store", "MEMORY"),
+		("busy_timeout", 10000),
+		("query_only", "ON"),
+	),
+}
+DEFAULT_PRAGMA_PROFILE = "interactive"
 
 
 class Database:
-	def __init__(self, db_name='fdp_data.db'):
+	def __init__(self, db_name='fdp_data.db', pooled=True, profile=DEFAULT_PRAGMA_PROFILE):
+		if profile is not None and profile not in PRAGMA_PROFILES:
+			raise ValueError(f"Неизвестный профиль SQLite: {profile}")
 		self.db_name = db_name
+		# Профиль PRAGMA из PRAGMA_PROFILES (None - настройки SQLite по умолчанию)
+		self.profile = profile
+		# Пул: по одному долгоживущему соединению на поток (pooled=False - соединение на каждый вызов)
+		self.pooled = pooled
+		self._local = threading.local()
+		self._pool = []
+		self._pool_lock = threading.Lock()
+		# Подписчики на изменения справочников: callback(таблица, id строки)
+		self._change_listeners = []
 		self.create_tables()
 
 	def create_connection(self):
 		"""Создает соединение с базой данных"""
 		conn = None
 		try:
-			conn = sqlite3.connect(self.db_name)
+			conn = sql_trace.connect(self.db_name)
+			self._apply_profile(conn)
 			return conn
 		except sqlite3.Error as e:
 			print(f"Ошибка подключения к базе данных: {e}")
 		return conn
 
-	def create_tables(self):
-		"""Создает все необходимые таблицы в базе данных"""
-		conn = self.create_connection()
+	def _apply_profile(self, conn):
+		"""Применяет к соединению PRAGMA выбранного профиля"""
+		if self.profile is None:
+			return
+		for pragma, value in PRAGMA_PROFILES[self.profile]:
+			conn.execute(f"PRAGMA {pragma} = {value}")
+
+	def get_connection(self):
+		"""
+		Возвращает соединение текущего потока из пула (создает при первом обращении).
+		Без пула - новое соединение, которое закрывается в release_connection().
+		"""
+		conn = getattr(self._local, 'conn', None)
 		if conn is not None:
+			return conn
+		if not self.pooled:
+			return self.create_connection()
+
+		try:
+			conn = sql_trace.connect(self.db_name, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+			self._apply_profile(conn)
+		except sqlite3.Error as e:
+			print(f"Ошибка подключения к базе данных: {e}")
+			return None
+		self._local.conn = conn
+		with self._pool_lock:
+			self._pool.append(conn)
+		return conn
+
+	def release_connection(self, conn):
+		"""Освобождает соединение после вызова: соединения пула и открытой транзакции остаются открытыми"""
+		if not self.pooled and conn is not getattr(self._local, 'conn', None):
+			conn.close()
+
+	def _in_transaction(self):
+		return getattr(self._local, 'transaction_depth', 0) > 0
+
+	def _commit(self, conn):
+		"""Фиксирует изменения, если вызов не выполняется внутри transaction()"""
+		if not self._in_transaction():
+			conn.commit()
+
+	def _rollback(self, conn):
+		"""Откатывает незавершенные изменения, если вызов не выполняется внутри transaction()"""
+		if not self._in_transaction():
+			conn.rollback()
+
+	@contextmanager
+	def transaction(self):
+		"""
+		Явная транзакция: все вызовы методов Database в блоке (в этом потоке) фиксируются
+		одним COMMIT или откатываются при исключении. Вложенные блоки - точки сохранения.
+		"""
+		depth = getattr(self._local, 'transaction_depth', 0)
+		if depth == 0:
+			conn = self.get_connection()
+			if conn is None:
+				raise sqlite3.OperationalError("Не удалось создать соединение с базой данных")
+			# Без пула соединение закрепляется за потоком на время транзакции
+			self._local.conn = conn
+		else:
+			conn = self._local.conn
+
+		savepoint = f"sp_{depth}"
+		if depth == 0:
+			if not conn.in_transaction:
+				conn.execute("BEGIN")
+		else:
+			conn.execute(f"SAVEPOINT {savepoint}")
+		self._local.transaction_depth = depth + 1
+		# Уведомления об изменениях внутри транзакции рассылаются только после COMMIT
+		pending_changes = self._pending_changes()
+		pending_mark = len(pending_changes)
+		try:
+			yield conn
+		except BaseException:
+			del pending_changes[pending_mark:]
+			if depth == 0:
+				conn.rollback()
+			else:
+				conn.execute(f"ROLLBACK TO {savepoint}")
+				conn.execute(f"RELEASE {savepoint}")
+			raise
+		else:
 			try:
-				cursor = conn.cursor()
+				if depth == 0:
+					conn.commit()
+				else:
+					conn.execute(f"RELEASE {savepoint}")
+			except BaseException:
+				# Изменения не зафиксированы (например, SQLITE_BUSY): уведомления о них не рассылаются
+				del pending_changes[pending_mark:]
+				if depth == 0:
+					conn.rollback()
+				raise
+		finally:
+			self._local.transaction_depth = depth
+			if depth == 0 and not self.pooled:
+				self._local.conn = None
+				conn.close()
 
-				# Таблица "Члены экипажа"
-				cursor.execute('''
-                CREATE TABLE IF NOT EXISTS crew_members (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    home_base TEXT NOT NULL,
-                    is_pilot BOOLEAN NOT NULL DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                ''')
-
-				# Таблица "Воздушные суда"
-				cursor.execute('''
-                CREATE TABLE IF NOT EXISTS aircrafts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    registration TEXT UNIQUE NOT NULL,
-                    type TEXT NOT NULL,
-                    rest_facility_class INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                ''')
-
-				# Таблица "Задания" (Duties)
-				cursor.execute('''
-                CREATE TABLE IF NOT EXISTS duties (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    crew_member_id INTEGER NOT NULL,
-                    aircraft_id INTEGER NOT NULL,
-                    start_time TIMESTAMP NOT NULL,
-                    end_time TIMESTAMP,
-                    duty_type TEXT NOT NULL DEFAULT 'flight',
-                    fdp_start_time TIMESTAMP,
-                    fdp_end_time TIMESTAMP,
-                    scheduled_sectors INTEGER,
-                    actual_sectors INTEGER,
-                    rest_in_flight BOOLEAN DEFAULT FALSE,
-                    rest_facility_used INTEGER,
-                    time_acclimatized TEXT,
-                    base_time TEXT,
-                    is_acclimatized BOOLEAN,
-                    departure_airport TEXT NOT NULL,
-                    arrival_airport TEXT NOT NULL,
-                    has_frms BOOLEAN DEFAULT FALSE,
-                    status TEXT DEFAULT 'planned',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (crew_member_id) REFERENCES crew_members (id),
-                    FOREIGN KEY (aircraft_id) REFERENCES aircrafts (id)
-                )
-                ''')
-
-				# Таблица "Полетное время" (Flights)
-				cursor.execute('''
-                CREATE TABLE IF NOT EXISTS flights (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    duty_id INTEGER NOT NULL,
-                    departure_airport TEXT NOT NULL,
-                    arrival_airport TEXT NOT NULL,
-                    off_block_time TIMESTAMP,
-                    on_block_time TIMESTAMP,
-                    flight_time INTEGER,
-                    sector_number INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (duty_id) REFERENCES duties (id)
-                )
-                ''')
-
-				# Таблица "Периоды отдыха"
-				cursor.execute('''
-                CREATE TABLE IF NOT EXISTS rest_periods (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    crew_member_id INTEGER NOT NULL,
-                    start_time TIMESTAMP NOT NULL,
-                    end_time TIMESTAMP NOT NULL,
-                    rest_type TEXT NOT NULL,
-                    location TEXT,
-                    was_reduced BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (crew_member_id) REFERENCES crew_members (id)
-                )
-                ''')
-
-				# Таблица "Режим ожидания"
-				cursor.execute('''
-                CREATE TABLE IF NOT EXISTS standby_periods (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    crew_member_id INTEGER NOT NULL,
-                    start_time TIMESTAMP NOT NULL,
-                    end_time TIMESTAMP NOT NULL,
-                    standby_type TEXT NOT NULL,
-                    location TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (crew_member_id) REFERENCES crew_members (id)
-                )
-                ''')
-
-				# Таблица "Резерв"
-				cursor.execute('''
-                CREATE TABLE IF NOT EXISTS reserve_periods (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    crew_member_id INTEGER NOT NULL,
-                    start_time TIMESTAMP NOT NULL,
-                    end_time TIMESTAMP NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (crew_member_id) REFERENCES crew_members (id)
-                )
-                ''')
-
-				# Таблица "Настройки приложения"
-				cursor.execute('''
-                CREATE TABLE IF NOT EXISTS app_settings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    setting_key TEXT UNIQUE NOT NULL,
-                    setting_value TEXT NOT NULL,
-                    description TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                ''')
-
-				# Вставляем начальные настройки
-				cursor.execute('''
-                INSERT OR IGNORE INTO app_settings (setting_key, setting_value, description)
-                VALUES 
-                    ('default_home_base', 'UMMS', 'Основное место базирования по умолчанию'),
-                    ('max_fdp_extension', '1', 'Максимальное продление FDP в часах'),
-                    ('min_rest_period', '12', 'Минимальный период отдыха в часах'),
-                    ('timezone', 'Europe/Minsk', 'Часовой пояс по умолчанию')
-                ''')
-
-				# Создаем индексы для улучшения производительности
-				cursor.execute('CREATE INDEX IF NOT EXISTS idx_duties_crew_member_id ON duties (crew_member_id)')
-				cursor.execute('CREATE INDEX IF NOT EXISTS idx_duties_start_time ON duties (start_time)')
-				cursor.execute('CREATE INDEX IF NOT EXISTS idx_flights_duty_id ON flights (duty_id)')
-				cursor.execute(
-					'CREATE INDEX IF NOT EXISTS idx_rest_periods_crew_member_id ON rest_periods (crew_member_id)')
-				cursor.execute('CREATE INDEX IF NOT EXISTS idx_rest_periods_start_time ON rest_periods (start_time)')
+		if depth == 0:
+			changes = list(pending_changes)
+			pending_changes.clear()
+			for table, row_id in changes:
+				self._dispatch_change(table, row_id)
+
+	def add_change_listener(self, callback):
+		"""Подписывает callback(таблица, id строки) на изменения членов экипажа и воздушных судов"""
+		self._change_listeners.append(callback)
+
+	def remove_change_listener(self, callback):
+		"""Отписывает callback от изменений"""
+		if callback in self._change_listeners:
+			self._change_listeners.remove(callback)
+
+	def _pending_changes(self):
+		pending = getattr(self._local, 'pending_changes', None)
+		if pending is None:
+			pending = self._local.pending_changes = []
+		return pending
+
+	def _notify_change(self, table, row_id):
+		"""Сообщает подписчикам о зафиксированном изменении строки (внутри transaction() - после COMMIT)"""
+		if self._in_transaction():
+			self._pending_changes().append((table, row_id))
+		else:
+			self._dispatch_change(table, row_id)
+
+	def _dispatch_change(self, table, row_id):
+		for callback in list(self._change_listeners):
+			try:
+				callback(table, row_id)
+			except Exception as e:
+				print(f"Ошибка в обработчике изменений {table}: {e}")
+
+	def archive_cutoff(self):
+		"""Граница архива (секунды UTC): закрытые задания раньше нее могут быть в архиве; None - архива нет"""
+		value = self.get_setting(ARCHIVE_CUTOFF_SETTING)
+		return int(value) if value is not None else None
 
-				conn.commit()
-				print("База данных и все таблицы успешно созданы!")
+	def _reaches_archive(self, start_date):
+		"""Нужен ли архив запросу с началом периода start_date (без начала периода - только активная база)"""
+		if start_date is None:
+			return False
+		cutoff = self.archive_cutoff()
+		return cutoff is not None and to_epoch(start_date) < cutoff
+
+	def _historical_sql(self, conn, sql):
+		"""
+		Переписывает запрос: duties и flights в FROM / JOIN читаются из активной базы и архива.
+		Архив подключается к соединению (ATTACH) при первом историческом запросе и остается
+		подключенным; ATTACH невозможен внутри открытой транзакции.
+		"""
+		attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+		if ARCHIVE_SCHEMA not in attached:
+			path = archive_path(self.db_name)
+			if not os.path.exists(path):
+				return sql
+			if conn.in_transaction:
+				raise sqlite3.OperationalError("Архив нельзя подключить внутри открытой транзакции")
+			conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+		sources = {table: self._historical_source(conn, table) for table in ARCHIVE_TABLES}
+		return _ARCHIVED_TABLE_RE.sub(lambda match: f"{match.group(1)} {sources[match.group(2)]}", sql)
+
+	def _historical_source(self, conn, table):
+		"""
+		Подзапрос со строками таблицы из активной базы и из архива. Архивные строки, которые
+		еще есть в активной базе (перенос прерван между фиксациями), пропускаются; столбцы,
+		которых в архиве пока нет, читаются как NULL.
+		"""
+		columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+		archive_columns = {row[1] for row in conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.table_info({table})")}
+		if not archive_columns:
+			return f"main.{table}"
+		archived = ", ".join(column if column in archive_columns else f"NULL AS {column}" for column in columns)
+		return (
+			f"(SELECT {', '.join(columns)} FROM main.{table}"
+			f" UNION ALL SELECT {archived} FROM {ARCHIVE_SCHEMA}.{table} a"
+			f" WHERE NOT EXISTS (SELECT 1 FROM main.{table} m WHERE m.id = a.id))"
+		)
+
+	def close(self):
+		"""Закрывает все соединения пула"""
+		with self._pool_lock:
+			pool, self._pool = self._pool, []
+		for conn in pool:
+			try:
+				conn.close()
+			except sqlite3.Error as e:
+				print(f"Ошибка при закрытии соединения: {e}")
+		self._local = threading.local()
+
+	def create_tables(self):
+		"""Создает все необходимые таблицы в базе данных (применяет недостающие миграции схемы)"""
+		# Схема актуальна - DDL не выполняется (проверка на соединении пула, которое все равно понадобится)
+		conn = self.get_connection()
+		if conn is not None:
+			try:
+				if get_schema_version(conn) >= SCHEMA_VERSION:
+					return
+			except sqlite3.Error as e:
+				print(f"Ошибка при проверке версии схемы: {e}")
+			finally:
+				self.release_connection(conn)
+
+		conn = self.create_connection()
+		if conn is not None:
+			try:
+				# Схема создается и для профиля только для чтения
+				conn.execute("PRAGMA query_only = OFF")
+				if migrate(conn):
+					print("База данных и все таблицы успешно созданы!")
 
 			except sqlite3.Error as e:
 				print(f"Ошибка при создании таблиц: {e}")
@@ -182,7 +581,7 @@ class Database:
 	# Методы для работы с членами экипажа
 	def add_crew_member(self, name, home_base, is_pilot=True):
 		"""Добавляет нового члена экипажа в базу данных"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -190,17 +589,19 @@ class Database:
 					"INSERT INTO crew_members (name, home_base, is_pilot) VALUES (?, ?, ?)",
 					(name, home_base, is_pilot)
 				)
-				conn.commit()
+				self._commit(conn)
+				self._notify_change("crew_members", cursor.lastrowid)
 				return cursor.lastrowid
 			except sqlite3.Error as e:
+				self._rollback(conn)
 				print(f"Ошибка при добавлении члена экипажа: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return None
 
 	def get_all_crew_members(self):
 		"""Возвращает всех членов экипажа из базы данных"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -209,12 +610,12 @@ class Database:
 			except sqlite3.Error as e:
 				print(f"Ошибка при получении членов экипажа: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return []
 
 	def get_crew_member(self, crew_member_id):
 		"""Возвращает данные о конкретном члене экипажа"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -223,12 +624,12 @@ class Database:
 			except sqlite3.Error as e:
 				print(f"Ошибка при получении члена экипажа: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return None
 
 	def update_crew_member(self, crew_member_id, name, home_base, is_pilot):
 		"""Обновляет данные члена экипажа"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -236,33 +637,37 @@ class Database:
 					"UPDATE crew_members SET name = ?, home_base = ?, is_pilot = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
 					(name, home_base, is_pilot, crew_member_id)
 				)
-				conn.commit()
+				self._commit(conn)
+				self._notify_change("crew_members", crew_member_id)
 				return True
 			except sqlite3.Error as e:
+				self._rollback(conn)
 				print(f"Ошибка при обновлении члена экипажа: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return False
 
 	def delete_crew_member(self, crew_member_id):
 		"""Удаляет члена экипажа из базы данных"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
 				cursor.execute("DELETE FROM crew_members WHERE id = ?", (crew_member_id,))
-				conn.commit()
+				self._commit(conn)
+				self._notify_change("crew_members", crew_member_id)
 				return True
 			except sqlite3.Error as e:
+				self._rollback(conn)
 				print(f"Ошибка при удалении члена экипажа: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return False
 
 	# Методы для работы с воздушными судами
 	def add_aircraft(self, registration, aircraft_type, rest_facility_class=None):
 		"""Добавляет новое воздушное судно в базу данных"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -270,17 +675,19 @@ class Database:
 					"INSERT INTO aircrafts (registration, type, rest_facility_class) VALUES (?, ?, ?)",
 					(registration, aircraft_type, rest_facility_class)
 				)
-				conn.commit()
+				self._commit(conn)
+				self._notify_change("aircrafts", cursor.lastrowid)
 				return cursor.lastrowid
 			except sqlite3.Error as e:
+				self._rollback(conn)
 				print(f"Ошибка при добавлении воздушного судна: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return None
 
 	def get_all_aircrafts(self):
 		"""Возвращает все воздушные суда из базы данных"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -289,12 +696,12 @@ class Database:
 			except sqlite3.Error as e:
 				print(f"Ошибка при получении воздушных судов: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return []
 
 	def get_aircraft(self, aircraft_id):
 		"""Возвращает данные о конкретном воздушном судне"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -304,12 +711,12 @@ class Database:
 			except sqlite3.Error as e:
 				print(f"Ошибка при получении воздушного судна: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return None
 
 	def update_aircraft(self, aircraft_id, registration, aircraft_type, rest_facility_class):
 		"""Обновляет данные воздушного судна"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -317,34 +724,38 @@ class Database:
 					"UPDATE aircrafts SET registration = ?, type = ?, rest_facility_class = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
 					(registration, aircraft_type, rest_facility_class, aircraft_id)
 				)
-				conn.commit()
+				self._commit(conn)
+				self._notify_change("aircrafts", aircraft_id)
 				return True
 			except sqlite3.Error as e:
+				self._rollback(conn)
 				print(f"Ошибка при обновлении воздушного судна: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return False
 
 	def delete_aircraft(self, aircraft_id):
 		"""Удаляет воздушное судно из базы данных"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
 				cursor.execute("DELETE FROM aircrafts WHERE id = ?", (aircraft_id,))
-				conn.commit()
+				self._commit(conn)
+				self._notify_change("aircrafts", aircraft_id)
 				return True
 			except sqlite3.Error as e:
+				self._rollback(conn)
 				print(f"Ошибка при удалении воздушного судна: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return False
 
 	# Методы для работы с заданиями
 	def add_duty(self, crew_member_id, aircraft_id, start_time, scheduled_sectors,
 	             departure_airport, arrival_airport, rest_in_flight=False, has_frms=False):
 		"""Добавляет новое задание в базу данных"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -354,94 +765,106 @@ class Database:
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (crew_member_id, aircraft_id, start_time, scheduled_sectors,
 				      departure_airport, arrival_airport, rest_in_flight, has_frms))
-				conn.commit()
+				self._commit(conn)
 				return cursor.lastrowid
 			except sqlite3.Error as e:
+				self._rollback(conn)
 				print(f"Ошибка при добавлении задания: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return None
 
 	def get_duties_with_details(self):
-		"""Возвращает все задания с подробной информацией о члене экипажа и воздушном судне"""
-		conn = self.create_connection()
+		"""
+		Возвращает все задания с подробной информацией о члене экипажа и воздушном судне, новые первыми.
+		Загружает всю таблицу списком: для GUI и отчетов - iter_duties / get_duties_page.
+		"""
+		return list(self.iter_duties(descending=True))
+
+	def iter_duties(self, crew_member_id=None, aircraft_id=None, status=None, start_date=None, end_date=None,
+	                descending=False, batch_size=DUTY_FETCH_SIZE):
+		"""
+		Генератор заданий (столбцы как у get_duties_with_details) по фильтрам build_duties_query.
+		Строки читаются пачками fetchmany, в памяти не больше batch_size строк.
+		Период, начинающийся раньше границы архива, читается вместе с архивом.
+		"""
+		sql, params = build_duties_query(crew_member_id, aircraft_id, status, start_date, end_date,
+		                                 descending=descending)
+		reaches_archive = self._reaches_archive(start_date)
+		conn = self.get_connection()
 		if conn is not None:
 			try:
+				if reaches_archive:
+					sql = self._historical_sql(conn, sql)
 				cursor = conn.cursor()
-				cursor.execute('''
-	                SELECT d.id, d.crew_member_id, cm.name as crew_name, 
-	                       d.aircraft_id, a.registration, a.type as aircraft_type,
-	                       d.start_time, d.scheduled_sectors, d.departure_airport, 
-	                       d.arrival_airport, d.rest_in_flight, d.has_frms, d.status
-	                FROM duties d
-	                JOIN crew_members cm ON d.crew_member_id = cm.id
-	                JOIN aircrafts a ON d.aircraft_id = a.id
-	                ORDER BY d.start_time DESC
-	            ''')
-				return cursor.fetchall()
+				cursor.execute(sql, params)
+				while True:
+					rows = cursor.fetchmany(batch_size)
+					if not rows:
+						break
+					yield from rows
 			except sqlite3.Error as e:
-				print(f"Ошибка при получении заданий с деталями: {e}")
+				print(f"Ошибка при получении заданий: {e}")
 			finally:
-				conn.close()
-		return []
-
+				self.release_connection(conn)
 
-	def get_all_duties(self):
-		"""Возвращает все задания из базы данных"""
-		conn = self.create_connection()
+	def get_duties_page(self, after=None, limit=DUTY_PAGE_SIZE, crew_member_id=None, aircraft_id=None,
+	                    status=None, start_date=None, end_date=None, descending=False):
+		"""
+		Возвращает страницу заданий по ключу (start_time, id) последней строки предыдущей страницы:
+		(строки, ключ следующей страницы или None, если страница последняя).
+		"""
+		sql, params = build_duties_query(crew_member_id, aircraft_id, status, start_date, end_date,
+		                                 after=after, descending=descending, limit=limit + 1)
+		reaches_archive = self._reaches_archive(start_date)
+		conn = self.get_connection()
 		if conn is not None:
 			try:
+				if reaches_archive:
+					sql = self._historical_sql(conn, sql)
 				cursor = conn.cursor()
-				cursor.execute('''
-                    SELECT d.id, d.crew_member_id, cm.name, d.aircraft_id, a.registration, 
-                           d.start_time, d.scheduled_sectors, d.departure_airport, d.arrival_airport,
-                           d.rest_in_flight, d.has_frms, d.status
-                    FROM duties d
-                    JOIN crew_members cm ON d.crew_member_id = cm.id
-                    JOIN aircrafts a ON d.aircraft_id = a.id
-                    ORDER BY d.start_time
-                ''')
-				return cursor.fetchall()
+				cursor.execute(sql, params)
+				rows = cursor.fetchall()
+				# Лишняя строка только показывает, что следующая страница есть
+				if len(rows) > limit:
+					rows = rows[:limit]
+					return rows, (rows[-1][6], rows[-1][0])
+				return rows, None
 			except sqlite3.Error as e:
-				print(f"Ошибка при получении заданий: {e}")
+				print(f"Ошибка при получении страницы заданий: {e}")
 			finally:
-				conn.close()
-		return []
+				self.release_connection(conn)
+		return [], None
+
+	def get_all_duties(self):
+		"""
+		Возвращает все задания из базы данных (без типа ВС), по времени начала.
+		Загружает всю таблицу списком: для GUI и отчетов - iter_duties / get_duties_page.
+		"""
+		return [row[:5] + row[6:] for row in self.iter_duties()]
 
 	def get_duties_by_crew_member(self, crew_member_id, start_date=None, end_date=None):
-		"""Возвращает задания для конкретного члена экипажа за указанный период"""
-		conn = self.create_connection()
+		"""Возвращает задания для конкретного члена экипажа за указанный период (вместе с архивом, если нужно)"""
+		reaches_archive = bool(start_date and end_date) and self._reaches_archive(start_date)
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
-				query = '''
-                    SELECT d.id, d.crew_member_id, cm.name, d.aircraft_id, a.registration, 
-                           d.start_time, d.scheduled_sectors, d.departure_airport, d.arrival_airport,
-                           d.rest_in_flight, d.has_frms, d.status
-                    FROM duties d
-                    JOIN crew_members cm ON d.crew_member_id = cm.id
-                    JOIN aircrafts a ON d.aircraft_id = a.id
-                    WHERE d.crew_member_id = ?
-                '''
-				params = [crew_member_id]
-
-				if start_date and end_date:
-					query += " AND d.start_time BETWEEN ? AND ?"
-					params.extend([start_date, end_date])
-
-				query += " ORDER BY d.start_time"
+				query, params = build_crew_duties_query(crew_member_id, start_date, end_date)
+				if reaches_archive:
+					query = self._historical_sql(conn, query)
 
 				cursor.execute(query, params)
 				return cursor.fetchall()
 			except sqlite3.Error as e:
 				print(f"Ошибка при получении заданий: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return []
 
 	def update_duty_status(self, duty_id, status):
 		"""Обновляет статус задания"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -449,33 +872,35 @@ class Database:
 					"UPDATE duties SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
 					(status, duty_id)
 				)
-				conn.commit()
+				self._commit(conn)
 				return True
 			except sqlite3.Error as e:
+				self._rollback(conn)
 				print(f"Ошибка при обновлении статуса задания: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return False
 
 	def delete_duty(self, duty_id):
 		"""Удаляет задание из базы данных"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
 				cursor.execute("DELETE FROM duties WHERE id = ?", (duty_id,))
-				conn.commit()
+				self._commit(conn)
 				return True
 			except sqlite3.Error as e:
+				self._rollback(conn)
 				print(f"Ошибка при удалении задания: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return False
 
 	# Методы для работы с настройками
 	def get_setting(self, setting_key):
 		"""Возвращает значение настройки по ключу"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -485,12 +910,12 @@ class Database:
 			except sqlite3.Error as e:
 				print(f"Ошибка при получении настройки: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return None
 
 	def update_setting(self, setting_key, setting_value):
 		"""Обновляет значение настройки"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
@@ -498,64 +923,360 @@ class Database:
 					"UPDATE app_settings SET setting_value = ?, updated_at = CURRENT_TIMESTAMP WHERE setting_key = ?",
 					(setting_value, setting_key)
 				)
-				conn.commit()
+				self._commit(conn)
 				return True
 			except sqlite3.Error as e:
+				self._rollback(conn)
 				print(f"Ошибка при обновлении настройки: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return False
 
+	# Массовая загрузка
+	def _insert_bulk(self, table, columns, defaults, rows, batch_size, label):
+		"""
+		Вставляет строки пачками по batch_size через executemany в одной транзакции.
+		SQLite откатывает только ошибочную строку: строки пачки до нее остаются вставленными,
+		а вставка продолжается со следующей строки. Точки сохранения на пачку не нужны
+		(с триггерами они заметно замедляют вставку).
+		Возвращает список ID в порядке строк (None для отклоненных) или None при сбое.
+		"""
+		if batch_size < 1:
+			raise ValueError("batch_size должен быть положительным")
+
+		# Столбец секунд Unix заполняется сразу, чтобы триггер не обновлял каждую вставленную строку
+		# (значения, которые to_epoch не разобрал, досчитывает триггер)
+		epoch = next(((column, columns.index(source)) for epoch_table, column, source in EPOCH_COLUMNS
+		              if epoch_table == table), None)
+		insert_columns = columns + (epoch[0],) if epoch else columns
+		sql = f"INSERT INTO {table} ({', '.join(insert_columns)}) VALUES ({', '.join('?' * len(insert_columns))})"
+		ids = []
+
+		def insert_batch(cursor, batch):
+			# batch - список (номер строки, значения или None, если строку не удалось разобрать)
+			batch_ids = {}
+			pending = [(row_number, values) for row_number, values in batch if values is not None]
+			while pending:
+				cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+				max_id = cursor.fetchone()[0]
+				error = None
+				try:
+					cursor.executemany(sql, [values for _, values in pending])
+				except sqlite3.Error as e:
+					error = e
+
+				# Все строки, вставленные этим executemany (до ошибочной), идут после max_id по порядку
+				cursor.execute(f"SELECT id FROM {table} WHERE id > ? ORDER BY id", (max_id,))
+				inserted = [row[0] for row in cursor.fetchall()]
+				for (row_number, _), row_id in zip(pending, inserted):
+					batch_ids[row_number] = row_id
+				if error is None:
+					break
+				print(f"Ошибка при добавлении ({label}), строка {pending[len(inserted)][0]}: {error}")
+				pending = pending[len(inserted) + 1:]
+
+			ids.extend(batch_ids.get(row_number) for row_number, _ in batch)
+
+		try:
+			with self.transaction() as conn:
+				cursor = conn.cursor()
+				batch = []
+				for row_number, row in enumerate(rows):
+					try:
+						values = _bulk_row_values(row, columns, defaults)
+						if epoch:
+							values += (_epoch_or_none(values[epoch[1]]),)
+					except (TypeError, ValueError) as e:
+						print(f"Ошибка при добавлении ({label}), строка {row_number}: {e}")
+						values = None
+					batch.append((row_number, values))
+					if len(batch) >= batch_size:
+						insert_batch(cursor, batch)
+						batch = []
+				if batch:
+					insert_batch(cursor, batch)
+			return ids
+		except sqlite3.Error as e:
+			print(f"Ошибка при массовой загрузке ({label}): {e}")
+		return None
+
+	def add_duties_bulk(self, duties, batch_size=BULK_BATCH_SIZE):
+		"""Добавляет задания пачками (кортежи или словари по DUTY_BULK_COLUMNS), возвращает их ID"""
+		return self._insert_bulk('duties', DUTY_BULK_COLUMNS, DUTY_BULK_DEFAULTS, duties, batch_size, "задания")
+
+	def add_flights_bulk(self, flights, batch_size=BULK_BATCH_SIZE):
+		"""Добавляет полеты пачками (кортежи или словари по FLIGHT_BULK_COLUMNS), возвращает их ID"""
+		return self._insert_bulk('flights', FLIGHT_BULK_COLUMNS, FLIGHT_BULK_DEFAULTS, flights, batch_size, "полеты")
+
+	def add_rest_periods_bulk(self, rest_periods, batch_size=BULK_BATCH_SIZE):
+		"""Добавляет периоды отдыха пачками (кортежи или словари по REST_PERIOD_BULK_COLUMNS), возвращает их ID"""
+		return self._insert_bulk('rest_periods', REST_PERIOD_BULK_COLUMNS, REST_PERIOD_BULK_DEFAULTS,
+		                         rest_periods, batch_size, "периоды отдыха")
+
 	# Дополнительные методы для отчетности и анализа
 	def get_flight_time_stats(self, crew_member_id, start_date, end_date):
-		"""Возвращает статистику полетного времени для члена экипажа за период"""
-		conn = self.create_connection()
+		"""
+		Возвращает статистику полетного времени для члена экипажа за произвольный период по flights
+		(период раньше границы архива - вместе с архивом).
+		Для отчетов по месяцам - get_monthly_flight_stats (по месячной сводке, архив не нужен).
+		"""
+		reaches_archive = self._reaches_archive(start_date)
+		conn = self.get_connection()
 		if conn is not None:
 			try:
+				query = FLIGHT_TIME_STATS_QUERY
+				if reaches_archive:
+					query = self._historical_sql(conn, query)
 				cursor = conn.cursor()
-				cursor.execute('''
-                    SELECT SUM(f.flight_time) as total_flight_time,
-                           COUNT(f.id) as total_flights,
-                           COUNT(DISTINCT DATE(f.off_block_time)) as flight_days
-                    FROM flights f
-                    JOIN duties d ON f.duty_id = d.id
-                    WHERE d.crew_member_id = ? 
-                    AND f.off_block_time BETWEEN ? AND ?
-                ''', (crew_member_id, start_date, end_date))
+				cursor.execute(query, (crew_member_id, to_epoch(start_date), to_epoch(end_date)))
 				return cursor.fetchone()
 			except sqlite3.Error as e:
 				print(f"Ошибка при получении статистики полетного времени: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return (0, 0, 0)
 
+	def get_monthly_flight_stats(self, crew_member_id, start_month, end_month):
+		"""
+		Месячная сводка члена экипажа за месяцы start_month..end_month включительно (см. month_key):
+		список (год, месяц, минуты налета, секторы, дни с полетами, задания); месяцы без данных пропущены.
+		"""
+		conn = self.get_connection()
+		if conn is not None:
+			try:
+				cursor = conn.cursor()
+				cursor.execute(CREW_MONTHLY_STATS_QUERY,
+				               (crew_member_id, *month_key(start_month), *month_key(end_month)))
+				return cursor.fetchall()
+			except sqlite3.Error as e:
+				print(f"Ошибка при получении месячной сводки налета: {e}")
+			finally:
+				self.release_connection(conn)
+		return []
+
+	def get_fleet_monthly_flight_stats(self, start_month, end_month):
+		"""
+		Месячная сводка по всем членам экипажа за месяцы start_month..end_month включительно:
+		список (год, месяц, минуты налета, секторы, дни с полетами, задания, членов экипажа с данными).
+		Дни с полетами суммируются по членам экипажа (человеко-дни).
+		"""
+		conn = self.get_connection()
+		if conn is not None:
+			try:
+				cursor = conn.cursor()
+				cursor.execute(FLEET_MONTHLY_STATS_QUERY, (*month_key(start_month), *month_key(end_month)))
+				return cursor.fetchall()
+			except sqlite3.Error as e:
+				print(f"Ошибка при получении месячной сводки налета по парку: {e}")
+			finally:
+				self.release_connection(conn)
+		return []
+
 	def get_rest_periods(self, crew_member_id, start_date, end_date):
 		"""Возвращает периоды отдыха для члена экипажа за период"""
-		conn = self.create_connection()
+		conn = self.get_connection()
 		if conn is not None:
 			try:
 				cursor = conn.cursor()
-				cursor.execute('''
-                    SELECT start_time, end_time, rest_type, location
-                    FROM rest_periods
-                    WHERE crew_member_id = ? 
-                    AND start_time BETWEEN ? AND ?
-                    ORDER BY start_time
-                ''', (crew_member_id, start_date, end_date))
+				cursor.execute(REST_PERIODS_QUERY, (crew_member_id, to_epoch(start_date), to_epoch(end_date)))
 				return cursor.fetchall()
 			except sqlite3.Error as e:
 				print(f"Ошибка при получении периодов отдыха: {e}")
 			finally:
-				conn.close()
+				self.release_connection(conn)
 		return []
 
+	def explain_hot_queries(self):
+		"""
+		Возвращает планы HOT_QUERIES: список (запрос, ожидаемый индекс, индекс используется, план).
+		При ошибке возвращает None.
+		"""
+		conn = self.get_connection()
+		if conn is not None:
+			try:
+				cursor = conn.cursor()
+				report = []
+				for name, query, params, index in HOT_QUERIES:
+					cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+					plan = [row[3] for row in cursor.fetchall()]
+					# Индекс должен использоваться для поиска (SEARCH), а не для полного просмотра (SCAN)
+					uses_index = any(
+						detail.startswith("SEARCH") and f" {index} " in detail + " " for detail in plan
+					)
+					report.append((name, index, uses_index, plan))
+				return report
+			except sqlite3.Error as e:
+				print(f"Ошибка при получении планов запросов: {e}")
+			finally:
+				self.release_connection(conn)
+		return None
 
-# Создаем глобальный экземпляр базы данных для использования во всем приложении
-db = Database()
+	def rebuild_flight_minutes_summary(self):
+		"""
+		Полностью пересчитывает сводные таблицы налета по дням (из flights вместе с архивом) и по месяцам
+		"""
+		conn = self.get_connection()
+		if conn is not None:
+			try:
+				# Архив подключается до первого изменения (ATTACH невозможен внутри транзакции)
+				daily_query = self._historical_sql(conn, RAW_DAILY_FLIGHT_MINUTES_QUERY)
+				monthly_query = self._historical_sql(conn, RAW_MONTHLY_FLIGHT_STATS_QUERY)
+				cursor = conn.cursor()
+				cursor.execute("DELETE FROM crew_daily_flight_minutes")
+				cursor.execute(
+					"INSERT INTO crew_daily_flight_minutes (crew_member_id, flight_date, flight_minutes, sector_count) "
+					+ daily_query
+				)
+				rows = cursor.rowcount
+				# Месячная сводка после триггеров уже согласована, но пересчитывается заново:
+				# в ней исправляются и расхождения в числе заданий
+				cursor.execute("DELETE FROM crew_monthly_flight_stats")
+				cursor.execute(
+					"INSERT INTO crew_monthly_flight_stats "
+					"(crew_member_id, year, month, flight_minutes, sector_count, flight_days, duty_count) "
+					+ monthly_query, ALL_CREW_RANGE
+				)
+				self._commit(conn)
+				return rows
+			except sqlite3.Error as e:
+				self._rollback(conn)
+				print(f"Ошибка при пересчете сводной таблицы налета: {e}")
+			finally:
+				self.release_connection(conn)
+		return None
+
+	def check_flight_minutes_summary(self):
+		"""
+		Сверяет сводную таблицу налета по дням с таблицей flights (вместе с архивом). Возвращает список расхождений
+		(crew_member_id, flight_date, минуты по flights, минуты в сводной, секторы по flights, секторы в сводной).
+		"""
+		conn = self.get_connection()
+		if conn is not None:
+			try:
+				cursor = conn.cursor()
+				cursor.execute(self._historical_sql(conn, f'''
+					WITH raw (crew_member_id, flight_date, flight_minutes, sector_count)
+					     AS ({RAW_DAILY_FLIGHT_MINUTES_QUERY})
+					SELECT r.crew_member_id, r.flight_date, r.flight_minutes, COALESCE(s.flight_minutes, 0),
+					       r.sector_count, COALESCE(s.sector_count, 0)
+					FROM raw r
+					LEFT JOIN crew_daily_flight_minutes s
+					       ON s.crew_member_id = r.crew_member_id AND s.flight_date = r.flight_date
+					WHERE r.flight_minutes != COALESCE(s.flight_minutes, 0)
+					   OR r.sector_count != COALESCE(s.sector_count, 0)
+					UNION ALL
+					SELECT s.crew_member_id, s.flight_date, 0, s.flight_minutes, 0, s.sector_count
+					FROM crew_daily_flight_minutes s
+					WHERE NOT EXISTS (
+					    SELECT 1 FROM raw r
+					    WHERE r.crew_member_id = s.crew_member_id AND r.flight_date = s.flight_date)
+					ORDER BY 1, 2
+				'''))
+				return cursor.fetchall()
+			except sqlite3.Error as e:
+				print(f"Ошибка при проверке сводной таблицы налета: {e}")
+			finally:
+				self.release_connection(conn)
+		return None
+
+	def check_monthly_flight_stats(self):
+		"""
+		Сверяет месячную сводку со сводной таблицей по дням и duties (вместе с архивом). Возвращает список расхождений
+		(crew_member_id, год, месяц, ожидаемые значения, значения в сводке); значения -
+		(минуты налета, секторы, дни с полетами, задания).
+		"""
+		conn = self.get_connection()
+		if conn is not None:
+			try:
+				cursor = conn.cursor()
+				cursor.execute(self._historical_sql(conn, f'''
+					WITH raw (crew_member_id, year, month, flight_minutes, sector_count, flight_days, duty_count)
+					     AS ({RAW_MONTHLY_FLIGHT_STATS_QUERY}),
+					     keys AS (SELECT crew_member_id, year, month FROM raw
+					              UNION SELECT crew_member_id, year, month FROM crew_monthly_flight_stats)
+					SELECT k.crew_member_id, k.year, k.month,
+					       COALESCE(r.flight_minutes, 0), COALESCE(r.sector_count, 0),
+					       COALESCE(r.flight_days, 0), COALESCE(r.duty_count, 0),
+					       COALESCE(s.flight_minutes, 0), COALESCE(s.sector_count, 0),
+					       COALESCE(s.flight_days, 0), COALESCE(s.duty_count, 0)
+					FROM keys k
+					LEFT JOIN raw r USING (crew_member_id, year, month)
+					LEFT JOIN crew_monthly_flight_stats s USING (crew_member_id, year, month)
+					WHERE (COALESCE(r.flight_minutes, 0), COALESCE(r.sector_count, 0),
+					       COALESCE(r.flight_days, 0), COALESCE(r.duty_count, 0))
+					   != (COALESCE(s.flight_minutes, 0), COALESCE(s.sector_count, 0),
+					       COALESCE(s.flight_days, 0), COALESCE(s.duty_count, 0))
+					ORDER BY 1, 2, 3
+				'''), ALL_CREW_RANGE)
+				return [(row[0], row[1], row[2], row[3:7], row[7:11]) for row in cursor.fetchall()]
+			except sqlite3.Error as e:
+				print(f"Ошибка при проверке месячной сводки налета: {e}")
+			finally:
+				self.release_connection(conn)
+		return None
+
+
+# Глобальный экземпляр базы данных создается при первом обращении, а не при импорте модуля
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_db():
+	"""Возвращает общий для приложения экземпляр Database, создавая его при первом обращении"""
+	global _db
+	if _db is None:
+		with _db_lock:
+			if _db is None:
+				_db = Database()
+	return _db
+
+
+def __getattr__(name):
+	# Совместимость со старым импортом: from database import db
+	if name == "db":
+		return get_db()
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
+	import argparse
+
+	parser = argparse.ArgumentParser(description="Обслуживание базы данных FDP")
+	parser.add_argument("command", nargs="?", choices=["rebuild-summary", "check-summary", "check-plans"],
+	                    help="пересчитать или сверить сводные таблицы налета по дням и месяцам, "
+	                         "проверить использование индексов частыми запросами")
+	parser.add_argument("--db", default="fdp_data.db", help="путь к файлу базы данных")
+	args = parser.parse_args()
+
+	if args.command == "rebuild-summary":
+		rows = Database(args.db, profile="bulk-load").rebuild_flight_minutes_summary()
+		print(f"Сводные таблицы налета пересчитаны, строк по дням: {rows}")
+		raise SystemExit(0 if rows is not None else 1)
+	if args.command == "check-summary":
+		database = Database(args.db, profile="read-only-reporting")
+		mismatches = database.check_flight_minutes_summary()
+		monthly_mismatches = database.check_monthly_flight_stats()
+		if mismatches is None or monthly_mismatches is None:
+			raise SystemExit(1)
+		for crew_member_id, flight_date, expected, actual, expected_sectors, actual_sectors in mismatches:
+			print(f"Член экипажа {crew_member_id}, {flight_date}: по flights {expected} мин / {expected_sectors} сект., "
+			      f"в сводной {actual} мин / {actual_sectors} сект.")
+		for crew_member_id, year, month, expected, actual in monthly_mismatches:
+			print(f"Член экипажа {crew_member_id}, {year}-{month:02d}: ожидается {expected}, в месячной сводке {actual}")
+		print(f"Расхождений: по дням {len(mismatches)}, по месяцам {len(monthly_mismatches)}")
+		raise SystemExit(1 if mismatches or monthly_mismatches else 0)
+
+	if args.command == "check-plans":
+		report = Database(args.db, profile="read-only-reporting").explain_hot_queries()
+		if report is None:
+			raise SystemExit(1)
+		for name, index, uses_index, plan in report:
+			print(f"{'OK    ' if uses_index else 'ОШИБКА'} {name}: ожидается {index}")
+			for detail in plan:
+				print(f"         {detail}")
+		raise SystemExit(0 if all(uses_index for _, _, uses_index, _ in report) else 1)
+
 	# Тестирование базы данных при прямом запуске
-	db = Database()
+	db = Database(args.db)
 	print("База данных инициализирована")
 
 	# Добавляем тестовые данные
@@ -0,0 +1,124 @@
+# diagnostics_tab.py
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
+                             QLabel, QPushButton, QHeaderView, QSplitter)
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor, QBrush
+from limits_tab import SortableItem
+import sql_trace
+
+
+def bucket_title(index):
+	"""Заголовок корзины гистограммы: верхняя граница, для последней - нижняя"""
+	bounds = sql_trace.LATENCY_BUCKETS_MS
+	if bounds[index] == float("inf"):
+		return f"> {bounds[index - 1]:g} мс"
+	return f"≤ {bounds[index]:g} мс"
+
+
+class DiagnosticsTab(QWidget):
+	"""Статистика запросов sql_trace: задержки по запросам (гистограмма) и инструкции SQLite"""
+
+	STAT_COLUMNS = ["Запрос", "Вызовов", "Всего, мс", "Сред., мс", "Макс., мс", "Строк"]
+
+	def __init__(self):
+		super().__init__()
+		self.init_ui()
+
+	def init_ui(self):
+		main_layout = QVBoxLayout()
+
+		# Панель управления
+		control_layout = QHBoxLayout()
+		self.summary_label = QLabel("")
+		control_layout.addWidget(self.summary_label)
+		control_layout.addStretch()
+
+		self.refresh_btn = QPushButton("Обновить")
+		self.refresh_btn.clicked.connect(self.load_stats)
+		control_layout.addWidget(self.refresh_btn)
+
+		self.reset_btn = QPushButton("Сбросить")
+		self.reset_btn.clicked.connect(self.reset_stats)
+		control_layout.addWidget(self.reset_btn)
+
+		main_layout.addLayout(control_layout)
+
+		splitter = QSplitter(Qt.Orientation.Vertical)
+
+		# Таблица запросов: сводка и число вызовов по корзинам задержки
+		bucket_titles = [bucket_title(i) for i in range(len(sql_trace.LATENCY_BUCKETS_MS))]
+		self.stats_table = QTableWidget()
+		self.stats_table.setColumnCount(len(self.STAT_COLUMNS) + len(bucket_titles) + 1)
+		self.stats_table.setHorizontalHeaderLabels(self.STAT_COLUMNS + bucket_titles + ["Место вызова"])
+		self.stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+		self.stats_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Interactive)
+		self.stats_table.setColumnWidth(0, 400)
+		self.stats_table.verticalHeader().setVisible(False)
+		self.stats_table.setSortingEnabled(True)
+		splitter.addWidget(self.stats_table)
+
+		# Все инструкции, выполненные SQLite (trace callback): BEGIN/COMMIT, тела триггеров
+		self.trace_table = QTableWidget()
+		self.trace_table.setColumnCount(2)
+		self.trace_table.setHorizontalHeaderLabels(["Инструкция SQLite", "Выполнено"])
+		self.trace_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+		self.trace_table.verticalHeader().setVisible(False)
+		self.trace_table.setSortingEnabled(True)
+		splitter.addWidget(self.trace_table)
+
+		main_layout.addWidget(splitter)
+		self.setLayout(main_layout)
+
+	def load_stats(self):
+		"""Перерисовывает таблицы по текущей статистике sql_trace"""
+		stats = sql_trace.snapshot()
+
+		self.stats_table.setSortingEnabled(False)
+		self.stats_table.setRowCount(len(stats))
+		for row_idx, row in enumerate(stats):
+			items = [
+				SortableItem(row["sql"], row["sql"]),
+				SortableItem(str(row["count"]), row["count"]),
+				SortableItem(f"{row['total_ms']:.1f}", row["total_ms"]),
+				SortableItem(f"{row['avg_ms']:.2f}", row["avg_ms"]),
+				SortableItem(f"{row['max_ms']:.2f}", row["max_ms"]),
+				SortableItem(str(row["rows"]), row["rows"]),
+			]
+			# Ячейки гистограммы подсвечиваются пропорционально доле вызовов
+			for count in row["buckets"]:
+				item = SortableItem(str(count) if count else "", count)
+				if count:
+					share = count / row["count"]
+					item.setBackground(QBrush(QColor(255, int(255 - 120 * share), int(255 - 200 * share))))
+				items.append(item)
+			items.append(SortableItem(row["site"], row["site"]))
+
+			items[0].setToolTip(row["sql"])
+			for col_idx, item in enumerate(items):
+				self.stats_table.setItem(row_idx, col_idx, item)
+		self.stats_table.setSortingEnabled(True)
+
+		trace_counts = sql_trace.trace_counts()
+		self.trace_table.setSortingEnabled(False)
+		self.trace_table.setRowCount(len(trace_counts))
+		for row_idx, (statement, count) in enumerate(trace_counts):
+			self.trace_table.setItem(row_idx, 0, SortableItem(statement, statement))
+			self.trace_table.setItem(row_idx, 1, SortableItem(str(count), count))
+		self.trace_table.setSortingEnabled(True)
+
+		total_ms = sum(row["total_ms"] for row in stats)
+		total_calls = sum(row["count"] for row in stats)
+		self.summary_label.setText(
+			f"Запросов: {total_calls}, суммарно {total_ms:.1f} мс. "
+			f"Медленные запросы: {sql_trace.slow_log_path()}"
+		)
+
+	def reset_stats(self):
+		sql_trace.reset()
+		self.load_stats()
+
+	def showEvent(self, event):
+		"""Обновляет статистику при открытии вкладки"""
+		super().showEvent(event)
+		if not event.spontaneous():
+			self.load_stats()
@@ -0,0 +1,177 @@
+# limits.py
+from datetime import date, datetime, timedelta, timezone
+
+
+# Лимиты полетного времени по окнам
+FLIGHT_TIME_LIMITS = {
+	"last_28_days": timedelta(hours=90),
+	"current_year": timedelta(hours=900),
+	"last_12_months": timedelta(hours=1000),
+}
+
+# Все три окна за один проход по сводной таблице налета по дням (crew_daily_flight_minutes,
+# поддерживается триггерами в database.py): диапазон по первичному ключу, не более ~366 строк.
+CREW_TOTALS_QUERY = """
+	SELECT COALESCE(SUM(CASE WHEN flight_date >= :last_28_days THEN flight_minutes END), 0),
+	       COALESCE(SUM(CASE WHEN flight_date >= :year_start AND flight_date < :next_year
+	                         THEN flight_minutes END), 0),
+	       COALESCE(SUM(CASE WHEN flight_date >= :last_12_months THEN flight_minutes END), 0)
+	FROM crew_daily_flight_minutes
+	WHERE crew_member_id = :crew_member_id AND flight_date >= :lower_bound
+"""
+
+# То же напрямую по flights: условная агрегация по диапазону off_block_epoch (секунды UTC).
+# Столбец сравнивается с границами без функций, поэтому SQLite использует покрывающий
+# составной индекс idx_flights_duty_off_block_epoch (duty_id, off_block_epoch, flight_time).
+CREW_TOTALS_FROM_FLIGHTS_QUERY = """
+	SELECT COALESCE(SUM(CASE WHEN f.off_block_epoch >= :last_28_days THEN f.flight_time END), 0),
+	       COALESCE(SUM(CASE WHEN f.off_block_epoch >= :year_start AND f.off_block_epoch < :next_year
+	                         THEN f.flight_time END), 0),
+	       COALESCE(SUM(CASE WHEN f.off_block_epoch >= :last_12_months THEN f.flight_time END), 0)
+	FROM duties d
+	JOIN flights f ON f.duty_id = d.id
+	WHERE d.crew_member_id = :crew_member_id AND f.off_block_epoch >= :lower_bound
+"""
+
+
+def _one_year_back(day):
+	"""Та же дата год назад (как date('now', '-12 months') в SQLite: 29.02 -> 01.03)"""
+	try:
+		return day.replace(year=day.year - 1)
+	except ValueError:
+		return date(day.year - 1, 3, 1)
+
+
+def window_bounds(now=None):
+	"""
+    Границы окон для сравнения с off_block_time (строки 'YYYY-MM-DD').
+    Как и date('now') в SQLite, текущая дата по умолчанию берется по UTC.
+    """
+	if now is None:
+		now = datetime.now(timezone.utc)
+	today = now.date() if isinstance(now, datetime) else now
+
+	bounds = {
+		"last_28_days": today - timedelta(days=28),
+		"year_start": date(today.year, 1, 1),
+		"next_year": date(today.year + 1, 1, 1),
+		"last_12_months": _one_year_back(today),
+	}
+	bounds["lower_bound"] = min(bounds["last_28_days"], bounds["year_start"], bounds["last_12_months"])
+	return {key: value.isoformat() for key, value in bounds.items()}
+
+
+def epoch_window_bounds(now=None):
+	"""Границы окон в секундах Unix (полночь UTC) для сравнения с off_block_epoch"""
+	return {
+		key: int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+		for key, value in window_bounds(now).items()
+	}
+
+
+def flight_time_totals(db_connection, crew_member_id, now=None, from_flights=False):
+	"""
+    Возвращает налет члена экипажа (в минутах) за 28 дней, календарный год и 12 месяцев.
+    По умолчанию суммирует сводную таблицу по дням; from_flights=True - напрямую по flights.
+    """
+	params = epoch_window_bounds(now) if from_flights else window_bounds(now)
+	params["crew_member_id"] = crew_member_id
+
+	cursor = db_connection.cursor()
+	cursor.execute(CREW_TOTALS_FROM_FLIGHTS_QUERY if from_flights else CREW_TOTALS_QUERY, params)
+	last_28_days, current_year, last_12_months = cursor.fetchone()
+	return {
+		"last_28_days": last_28_days or 0,
+		"current_year": current_year or 0,
+		"last_12_months": last_12_months or 0,
+	}
+
+
+def build_limits_report(totals, planned_flight_time):
+	"""Формирует результат проверки лимитов из сумм налета (в минутах)"""
+	result = {}
+	for window, limit in FLIGHT_TIME_LIMITS.items():
+		current = timedelta(minutes=totals[window])
+		result[window] = {
+			"current": current,
+			"limit": limit,
+			"remaining": limit - current,
+			"exceeded": current + planned_flight_time > limit
+		}
+	return result
+
+
+# Налет всех (или выбранных) членов экипажа по трем окнам за один сгруппированный проход
+FLEET_TOTALS_QUERY = """
+	SELECT cm.id, cm.name,
+	       COALESCE(SUM(CASE WHEN s.flight_date >= :last_28_days THEN s.flight_minutes END), 0),
+	       COALESCE(SUM(CASE WHEN s.flight_date >= :year_start AND s.flight_date < :next_year
+	                         THEN s.flight_minutes END), 0),
+	       COALESCE(SUM(CASE WHEN s.flight_date >= :last_12_months THEN s.flight_minutes END), 0)
+	FROM crew_members cm
+	LEFT JOIN crew_daily_flight_minutes s ON s.crew_member_id = cm.id AND s.flight_date >= :lower_bound
+	{where}
+	GROUP BY cm.id, cm.name
+"""
+
+
+def fleet_headroom(db_connection, crew_member_ids=None, planned_flight_time=timedelta(0), now=None):
+	"""
+    Запас налета до лимитов для всех членов экипажа (или только crew_member_ids) одним запросом.
+    Возвращает список, отсортированный по близости к лимиту (наибольшая загрузка - первой).
+    """
+	params = window_bounds(now)
+	where = ""
+	if crew_member_ids is not None:
+		crew_member_ids = list(crew_member_ids)
+		if not crew_member_ids:
+			return []
+		placeholders = ", ".join(f":crew_{i}" for i in range(len(crew_member_ids)))
+		where = f"WHERE cm.id IN ({placeholders})"
+		params.update({f"crew_{i}": crew_id for i, crew_id in enumerate(crew_member_ids)})
+
+	cursor = db_connection.cursor()
+	cursor.execute(FLEET_TOTALS_QUERY.format(where=where), params)
+
+	headroom = []
+	for crew_member_id, name, last_28_days, current_year, last_12_months in cursor.fetchall():
+		windows = build_limits_report({
+			"last_28_days": last_28_days,
+			"current_year": current_year,
+			"last_12_months": last_12_months,
+		}, planned_flight_time)
+		# Окно, в котором член экипажа ближе всего к лимиту (по доле использования)
+		closest_window = max(
+			windows,
+			key=lambda window: (windows[window]["current"] + planned_flight_time) / windows[window]["limit"]
+		)
+		closest = windows[closest_window]
+		headroom.append({
+			"crew_member_id": crew_member_id,
+			"name": name,
+			"windows": windows,
+			"closest_window": closest_window,
+			"utilization": (closest["current"] + planned_flight_time) / closest["limit"],
+			"remaining": closest["remaining"] - planned_flight_time,
+			"exceeded": any(window["exceeded"] for window in windows.values()),
+		})
+
+	headroom.sort(key=lambda row: row["utilization"], reverse=True)
+	return headroom
+
+
+if __name__ == "__main__":
+	# Отчет о запасе налета без GUI: python limits.py [путь к базе] [количество строк]
+	import sqlite3
+	import sys
+
+	db_name = sys.argv[1] if len(sys.argv) > 1 else 'fdp_data.db'
+	top = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+	conn = sqlite3.connect(db_name)
+	try:
+		for row in fleet_headroom(conn)[:top]:
+			print(f"{row['crew_member_id']:>6}  {row['name']:<30}  {row['closest_window']:<15}  "
+			      f"{row['utilization'] * 100:6.1f}%  остаток: {row['remaining']}")
+	finally:
+		conn.close()
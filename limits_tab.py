@@ -0,0 +1,131 @@
+# limits_tab.py
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
+                             QTableWidgetItem, QLabel, QPushButton, QHeaderView, QMessageBox)
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor, QBrush
+from calculator import FDPCalculator
+from async_db import get_async_db
+
+
+WINDOW_TITLES = {
+	"last_28_days": "28 дней",
+	"current_year": "Календарный год",
+	"last_12_months": "12 месяцев",
+}
+
+
+def format_duration(duration):
+	"""Форматирует timedelta в ЧЧ:ММ (с минусом для превышения)"""
+	total_minutes = int(duration.total_seconds() // 60)
+	sign = "-" if total_minutes < 0 else ""
+	hours, minutes = divmod(abs(total_minutes), 60)
+	return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+class SortableItem(QTableWidgetItem):
+	"""Ячейка таблицы, сортируемая по числовому ключу, а не по тексту"""
+
+	def __init__(self, text, sort_key):
+		super().__init__(text)
+		self.sort_key = sort_key
+		self.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable)
+
+	def __lt__(self, other):
+		if isinstance(other, SortableItem):
+			return self.sort_key < other.sort_key
+		return super().__lt__(other)
+
+
+class LimitsTab(QWidget):
+	def __init__(self):
+		super().__init__()
+		self.calculator = FDPCalculator()
+		self._headroom_query = None
+		self.init_ui()
+
+	def init_ui(self):
+		main_layout = QVBoxLayout()
+
+		# Панель управления
+		control_layout = QHBoxLayout()
+		control_layout.addWidget(QLabel("Запас налета до лимитов (ближайшие к лимиту - первыми)"))
+		control_layout.addStretch()
+
+		self.refresh_btn = QPushButton("Обновить")
+		self.refresh_btn.clicked.connect(self.load_headroom)
+		control_layout.addWidget(self.refresh_btn)
+
+		main_layout.addLayout(control_layout)
+
+		# Таблица запаса налета
+		self.limits_table = QTableWidget()
+		self.limits_table.setColumnCount(10)
+		self.limits_table.setHorizontalHeaderLabels([
+			"ID", "ФИО",
+			"Налет 28 дн.", "Остаток 28 дн.",
+			"Налет за год", "Остаток за год",
+			"Налет 12 мес.", "Остаток 12 мес.",
+			"Ближайший лимит", "Загрузка, %"
+		])
+		self.limits_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+		self.limits_table.verticalHeader().setVisible(False)
+		self.limits_table.setSortingEnabled(True)
+		main_layout.addWidget(self.limits_table)
+
+		self.setLayout(main_layout)
+
+	def load_headroom(self):
+		"""Загружает запас налета всех членов экипажа одним запросом (в фоновом потоке)"""
+		# Результат предыдущей загрузки больше не нужен
+		if self._headroom_query is not None:
+			self._headroom_query.cancel()
+
+		query = get_async_db().submit_with_connection(
+			self.calculator.check_fleet_limits,
+			on_result=lambda headroom: self.show_headroom(query, headroom),
+			on_error=self.on_headroom_failed)
+		self._headroom_query = query
+
+	def on_headroom_failed(self, message):
+		self._headroom_query = None
+		QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить запас налета: {message}")
+
+	def show_headroom(self, query, headroom):
+		"""Заполняет таблицу, если это ответ на последний запрос"""
+		if query is not self._headroom_query:
+			return
+		self._headroom_query = None
+
+		self.limits_table.setSortingEnabled(False)
+		self.limits_table.setRowCount(len(headroom))
+		for row_idx, row in enumerate(headroom):
+			items = [
+				SortableItem(str(row["crew_member_id"]), row["crew_member_id"]),
+				SortableItem(row["name"], row["name"]),
+			]
+			for window in WINDOW_TITLES:
+				data = row["windows"][window]
+				items.append(SortableItem(format_duration(data["current"]), data["current"]))
+				items.append(SortableItem(format_duration(data["remaining"]), data["remaining"]))
+			items.append(SortableItem(WINDOW_TITLES[row["closest_window"]], row["closest_window"]))
+			items.append(SortableItem(f"{row['utilization'] * 100:.1f}", row["utilization"]))
+
+			if row["exceeded"]:
+				color = QColor(255, 200, 200)  # Превышение лимита
+			elif row["utilization"] >= 0.9:
+				color = QColor(255, 235, 190)  # Близко к лимиту
+			else:
+				color = None
+			for col_idx, item in enumerate(items):
+				if color is not None:
+					item.setBackground(QBrush(color))
+				self.limits_table.setItem(row_idx, col_idx, item)
+
+		self.limits_table.setSortingEnabled(True)
+		self.limits_table.sortItems(9, Qt.SortOrder.DescendingOrder)
+
+	def showEvent(self, event):
+		"""Загружает данные при открытии вкладки, а не при запуске приложения"""
+		super().showEvent(event)
+		if not event.spontaneous():
+			self.load_headroom()
@@ -8,8 +8,14 @@ from aircraft_dialog import AircraftDialog
 from planning_tab import PlanningTab
 from calculator_gui import CalculatorTab  # Импорт рефакторенного CalculatorTab
 from schedule_tab import ScheduleTab
+from limits_tab import LimitsTab
 from document_viewer import DocumentViewer
-from database import db
+from diagnostics_tab import DiagnosticsTab
+from database import get_db
+from async_db import get_async_db
+from write_behind import close_duty_writer
+from reference_data import get_reference_data
+import sql_trace
 import os
 
 
@@ -19,6 +25,10 @@ class MainWindow(QMainWindow):
 		self.setWindowTitle("Aviation FDP Calculator")
 		self.setGeometry(100, 100, 1000, 700)
 
+		# База открывается (и при необходимости мигрирует) до создания вкладок,
+		# часть которых читает fdp_data.db напрямую
+		get_db()
+
 		# Центральный виджет и основной макет
 		central_widget = QWidget()
 		self.setCentralWidget(central_widget)
@@ -47,6 +57,10 @@ class MainWindow(QMainWindow):
 		self.schedule_tab = ScheduleTab()
 		tabs.addTab(self.schedule_tab, "График")
 
+		# Вкладка "Лимиты налета"
+		self.limits_tab = LimitsTab()
+		tabs.addTab(self.limits_tab, "Лимиты налета")
+
 		# Вкладка "Воздушные суда"
 		self.aircraft_tab = QWidget()
 		self.setup_aircraft_tab()
@@ -56,15 +70,23 @@ class MainWindow(QMainWindow):
 		self.document_tab = DocumentViewer()
 		tabs.addTab(self.document_tab, "📋 Документ №110")
 
+		# Вкладка "Диагностика SQL" - только в режиме трассировки (FDP_SQL_TRACE=1)
+		if sql_trace.is_enabled():
+			self.diagnostics_tab = DiagnosticsTab()
+			tabs.addTab(self.diagnostics_tab, "Диагностика SQL")
+
 		# Инициализируем базу данных
 		self.init_database()
 
 	def init_database(self):
 		"""Инициализирует базу данных, если она еще не создана"""
-		# База данных уже создается при импорте db из database.py
-		# Просто загружаем данные
+		# База данных уже открыта в __init__; таблицы заполняются из общего справочника
+		# и перерисовываются по его сигналам после любых изменений
 		self.load_crew_data()
 		self.load_aircraft_data()
+		reference_data = get_reference_data()
+		reference_data.crew_changed.connect(self.load_crew_data)
+		reference_data.aircraft_changed.connect(self.load_aircraft_data)
 
 	def setup_crew_tab(self):
 		layout = QVBoxLayout(self.crew_tab)
@@ -121,10 +143,7 @@ class MainWindow(QMainWindow):
 	def save_crew_member(self, data):
 		"""Сохраняет данные о члене экипажа в базу данных"""
 		try:
-			crew_id = db.add_crew_member(data['name'], data['home_base'], data['is_pilot'])
-
-			# Обновляем таблицу
-			self.load_crew_data()
+			crew_id = get_db().add_crew_member(data['name'], data['home_base'], data['is_pilot'])
 
 			QMessageBox.information(self, "Успех", "Член экипажа успешно добавлен!")
 
@@ -132,10 +151,16 @@ class MainWindow(QMainWindow):
 			QMessageBox.critical(self, "Ошибка базы данных", f"Не удалось сохранить данные: {e}")
 
 	def load_crew_data(self):
-		"""Загружает данные экипажа из БД и отображает их в таблице"""
-		try:
-			crew_data = db.get_all_crew_members()
+		"""Загружает данные экипажа из общего справочника в фоновом потоке"""
+		get_async_db().submit(get_reference_data().crew_members,
+		                      on_result=self.show_crew_data, on_error=self.on_load_failed)
+
+	def on_load_failed(self, message):
+		QMessageBox.critical(self, "Ошибка базы данных", f"Не удалось загрузить данные: {message}")
 
+	def show_crew_data(self, crew_data):
+		"""Отображает данные экипажа в таблице"""
+		try:
 			self.crew_table.setRowCount(len(crew_data))
 			for row_idx, row_data in enumerate(crew_data):
 				for col_idx, col_data in enumerate(row_data):
@@ -160,10 +185,7 @@ class MainWindow(QMainWindow):
 	def save_aircraft(self, data):
 		"""Сохраняет данные о воздушном судне в базу данных"""
 		try:
-			aircraft_id = db.add_aircraft(data['registration'], data['type'], data['rest_facility_class'])
-
-			# Обновляем таблицу
-			self.load_aircraft_data()
+			aircraft_id = get_db().add_aircraft(data['registration'], data['type'], data['rest_facility_class'])
 
 			QMessageBox.information(self, "Успех", "Воздушное судно успешно добавлено!")
 
@@ -171,10 +193,13 @@ class MainWindow(QMainWindow):
 			QMessageBox.critical(self, "Ошибка базы данных", f"Не удалось сохранить данные: {e}")
 
 	def load_aircraft_data(self):
-		"""Загружает данные о воздушных судах из БД и отображает их в таблице"""
-		try:
-			aircraft_data = db.get_all_aircrafts()
+		"""Загружает данные о воздушных судах из общего справочника в фоновом потоке"""
+		get_async_db().submit(get_reference_data().aircrafts,
+		                      on_result=self.show_aircraft_data, on_error=self.on_load_failed)
 
+	def show_aircraft_data(self, aircraft_data):
+		"""Отображает данные о воздушных судах в таблице"""
+		try:
 			self.aircraft_table.setRowCount(len(aircraft_data))
 			for row_idx, row_data in enumerate(aircraft_data):
 				for col_idx, col_data in enumerate(row_data):
@@ -212,11 +237,9 @@ class MainWindow(QMainWindow):
 	def update_aircraft(self, aircraft_id, data):
 		"""Обновляет данные о воздушном судне в базе данных"""
 		try:
-			success = db.update_aircraft(aircraft_id, data['registration'], data['type'], data['rest_facility_class'])
+			success = get_db().update_aircraft(aircraft_id, data['registration'], data['type'], data['rest_facility_class'])
 
 			if success:
-				# Обновляем таблицу
-				self.load_aircraft_data()
 				QMessageBox.information(self, "Успех", "Данные воздушного судна успешно обновлены!")
 			else:
 				QMessageBox.critical(self, "Ошибка", "Не удалось обновить данные воздушного судна")
@@ -240,11 +263,9 @@ class MainWindow(QMainWindow):
 
 		if reply == QMessageBox.StandardButton.Yes:
 			try:
-				success = db.delete_aircraft(aircraft_id)
+				success = get_db().delete_aircraft(aircraft_id)
 
 				if success:
-					# Обновляем таблицу
-					self.load_aircraft_data()
 					QMessageBox.information(self, "Успех", "Воздушное судно успешно удалено!")
 				else:
 					QMessageBox.critical(self, "Ошибка", "Не удалось удалить воздушное судно")
@@ -260,7 +281,13 @@ class MainWindow(QMainWindow):
 				self.calculator_tab.save_panel_sizes()
 		except Exception as e:
 			print(f"Ошибка при сохранении размеров панелей: {e}")
-		
+
+		# Очередь записи заданий дописывается до конца, чтобы ничего не потерять
+		close_duty_writer()
+
+		# Незавершенные фоновые запросы отменяются, пул потоков останавливается
+		get_async_db().shutdown()
+
 		# Принимаем событие закрытия
 		event.accept()
 
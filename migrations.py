@@ -0,0 +1,813 @@
+# migrations.py
+"""
+Версионные миграции схемы базы данных FDP.
+
+Номер последней примененной миграции хранится в PRAGMA user_version. Каждая миграция
+идемпотентна (повторный запуск после сбоя безопасен) и выполняется короткими транзакциями:
+каждый индекс строится в своей транзакции, заполнение новых столбцов и таблиц идет
+пачками с фиксацией после каждой, поэтому большая база не блокируется на минуты
+(в режиме WAL чтение продолжается и во время записи).
+
+Запуск без GUI:
+    python migrations.py --db fdp_data.db
+"""
+import sqlite3
+import time
+
+
+# Количество строк (или членов экипажа) в одной транзакции заполнения
+BACKFILL_BATCH_SIZE = 20000
+
+# Исходная схема
+BASE_SCHEMA_DDL = (
+	# Таблица "Члены экипажа"
+	'''
+	CREATE TABLE IF NOT EXISTS crew_members (
+	    id INTEGER PRIMARY KEY AUTOINCREMENT,
+	    name TEXT NOT NULL,
+	    home_base TEXT NOT NULL,
+	    is_pilot BOOLEAN NOT NULL DEFAULT TRUE,
+	    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+	)
+	''',
+	# Таблица "Воздушные суда"
+	'''
+	CREATE TABLE IF NOT EXISTS aircrafts (
+	    id INTEGER PRIMARY KEY AUTOINCREMENT,
+	    registration TEXT UNIQUE NOT NULL,
+	    type TEXT NOT NULL,
+	    rest_facility_class INTEGER,
+	    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+	)
+	''',
+	# Таблица "Задания" (Duties)
+	'''
+	CREATE TABLE IF NOT EXISTS duties (
+	    id INTEGER PRIMARY KEY AUTOINCREMENT,
+	    crew_member_id INTEGER NOT NULL,
+	    aircraft_id INTEGER NOT NULL,
+	    start_time TIMESTAMP NOT NULL,
+	    end_time TIMESTAMP,
+	    duty_type TEXT NOT NULL DEFAULT 'flight',
+	    fdp_start_time TIMESTAMP,
+	    fdp_end_time TIMESTAMP,
+	    scheduled_sectors INTEGER,
+	    actual_sectors INTEGER,
+	    rest_in_flight BOOLEAN DEFAULT FALSE,
+	    rest_facility_used INTEGER,
+	    time_acclimatized TEXT,
+	    base_time TEXT,
+	    is_acclimatized BOOLEAN,
+	    departure_airport TEXT NOT NULL,
+	    arrival_airport TEXT NOT NULL,
+	    has_frms BOOLEAN DEFAULT FALSE,
+	    status TEXT DEFAULT 'planned',
+	    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    FOREIGN KEY (crew_member_id) REFERENCES crew_members (id),
+	    FOREIGN KEY (aircraft_id) REFERENCES aircrafts (id)
+	)
+	''',
+	# Таблица "Полетное время" (Flights)
+	'''
+	CREATE TABLE IF NOT EXISTS flights (
+	    id INTEGER PRIMARY KEY AUTOINCREMENT,
+	    duty_id INTEGER NOT NULL,
+	    departure_airport TEXT NOT NULL,
+	    arrival_airport TEXT NOT NULL,
+	    off_block_time TIMESTAMP,
+	    on_block_time TIMESTAMP,
+	    flight_time INTEGER,
+	    sector_number INTEGER,
+	    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    FOREIGN KEY (duty_id) REFERENCES duties (id)
+	)
+	''',
+	# Таблица "Периоды отдыха"
+	'''
+	CREATE TABLE IF NOT EXISTS rest_periods (
+	    id INTEGER PRIMARY KEY AUTOINCREMENT,
+	    crew_member_id INTEGER NOT NULL,
+	    start_time TIMESTAMP NOT NULL,
+	    end_time TIMESTAMP NOT NULL,
+	    rest_type TEXT NOT NULL,
+	    location TEXT,
+	    was_reduced BOOLEAN DEFAULT FALSE,
+	    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    FOREIGN KEY (crew_member_id) REFERENCES crew_members (id)
+	)
+	''',
+	# Таблица "Режим ожидания"
+	'''
+	CREATE TABLE IF NOT EXISTS standby_periods (
+	    id INTEGER PRIMARY KEY AUTOINCREMENT,
+	    crew_member_id INTEGER NOT NULL,
+	    start_time TIMESTAMP NOT NULL,
+	    end_time TIMESTAMP NOT NULL,
+	    standby_type TEXT NOT NULL,
+	    location TEXT,
+	    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    FOREIGN KEY (crew_member_id) REFERENCES crew_members (id)
+	)
+	''',
+	# Таблица "Резерв"
+	'''
+	CREATE TABLE IF NOT EXISTS reserve_periods (
+	    id INTEGER PRIMARY KEY AUTOINCREMENT,
+	    crew_member_id INTEGER NOT NULL,
+	    start_time TIMESTAMP NOT NULL,
+	    end_time TIMESTAMP NOT NULL,
+	    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    FOREIGN KEY (crew_member_id) REFERENCES crew_members (id)
+	)
+	''',
+	# Таблица "Настройки приложения"
+	'''
+	CREATE TABLE IF NOT EXISTS app_settings (
+	    id INTEGER PRIMARY KEY AUTOINCREMENT,
+	    setting_key TEXT UNIQUE NOT NULL,
+	    setting_value TEXT NOT NULL,
+	    description TEXT,
+	    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+	)
+	''',
+	# Вставляем начальные настройки
+	'''
+	INSERT OR IGNORE INTO app_settings (setting_key, setting_value, description)
+	VALUES
+	    ('default_home_base', 'UMMS', 'Основное место базирования по умолчанию'),
+	    ('max_fdp_extension', '1', 'Максимальное продление FDP в часах'),
+	    ('min_rest_period', '12', 'Минимальный период отдыха в часах'),
+	    ('timezone', 'Europe/Minsk', 'Часовой пояс по умолчанию')
+	''',
+)
+
+BASE_INDEXES_DDL = (
+	'CREATE INDEX IF NOT EXISTS idx_duties_crew_member_id ON duties (crew_member_id)',
+	'CREATE INDEX IF NOT EXISTS idx_duties_start_time ON duties (start_time)',
+	'CREATE INDEX IF NOT EXISTS idx_flights_duty_id ON flights (duty_id)',
+	'CREATE INDEX IF NOT EXISTS idx_rest_periods_crew_member_id ON rest_periods (crew_member_id)',
+	'CREATE INDEX IF NOT EXISTS idx_rest_periods_start_time ON rest_periods (start_time)',
+)
+
+# Сводная таблица налета по членам экипажа и дням. Поддерживается триггерами при любых
+# изменениях flights (и duties, к которым привязаны полеты), поэтому окна 28 дней / год /
+# 12 месяцев считаются суммой не более чем ~366 строк независимо от длины истории.
+FLIGHT_SUMMARY_DDL = (
+	'''
+	CREATE TABLE IF NOT EXISTS crew_daily_flight_minutes (
+	    crew_member_id INTEGER NOT NULL,
+	    flight_date TEXT NOT NULL,
+	    flight_minutes INTEGER NOT NULL DEFAULT 0,
+	    PRIMARY KEY (crew_member_id, flight_date)
+	) WITHOUT ROWID
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_flights_summary_insert
+	AFTER INSERT ON flights
+	WHEN date(NEW.off_block_time) IS NOT NULL
+	BEGIN
+	    INSERT OR IGNORE INTO crew_daily_flight_minutes (crew_member_id, flight_date)
+	    SELECT crew_member_id, date(NEW.off_block_time) FROM duties WHERE id = NEW.duty_id;
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes + COALESCE(NEW.flight_time, 0)
+	    WHERE crew_member_id = (SELECT crew_member_id FROM duties WHERE id = NEW.duty_id)
+	      AND flight_date = date(NEW.off_block_time);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_flights_summary_delete
+	AFTER DELETE ON flights
+	WHEN date(OLD.off_block_time) IS NOT NULL
+	BEGIN
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes - COALESCE(OLD.flight_time, 0)
+	    WHERE crew_member_id = (SELECT crew_member_id FROM duties WHERE id = OLD.duty_id)
+	      AND flight_date = date(OLD.off_block_time);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_flights_summary_update
+	AFTER UPDATE OF duty_id, off_block_time, flight_time ON flights
+	BEGIN
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes - COALESCE(OLD.flight_time, 0)
+	    WHERE crew_member_id = (SELECT crew_member_id FROM duties WHERE id = OLD.duty_id)
+	      AND flight_date = date(OLD.off_block_time);
+	    INSERT OR IGNORE INTO crew_daily_flight_minutes (crew_member_id, flight_date)
+	    SELECT crew_member_id, date(NEW.off_block_time) FROM duties
+	    WHERE id = NEW.duty_id AND date(NEW.off_block_time) IS NOT NULL;
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes + COALESCE(NEW.flight_time, 0)
+	    WHERE crew_member_id = (SELECT crew_member_id FROM duties WHERE id = NEW.duty_id)
+	      AND flight_date = date(NEW.off_block_time);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_duties_summary_crew_update
+	AFTER UPDATE OF crew_member_id ON duties
+	WHEN OLD.crew_member_id IS NOT NEW.crew_member_id
+	BEGIN
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes - (
+	        SELECT COALESCE(SUM(f.flight_time), 0) FROM flights f
+	        WHERE f.duty_id = NEW.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date)
+	    WHERE crew_member_id = OLD.crew_member_id
+	      AND flight_date IN (SELECT date(off_block_time) FROM flights WHERE duty_id = NEW.id);
+	    INSERT OR IGNORE INTO crew_daily_flight_minutes (crew_member_id, flight_date)
+	    SELECT NEW.crew_member_id, date(off_block_time) FROM flights
+	    WHERE duty_id = NEW.id AND date(off_block_time) IS NOT NULL;
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes + (
+	        SELECT COALESCE(SUM(f.flight_time), 0) FROM flights f
+	        WHERE f.duty_id = NEW.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date)
+	    WHERE crew_member_id = NEW.crew_member_id
+	      AND flight_date IN (SELECT date(off_block_time) FROM flights WHERE duty_id = NEW.id);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_duties_summary_delete
+	AFTER DELETE ON duties
+	BEGIN
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes - (
+	        SELECT COALESCE(SUM(f.flight_time), 0) FROM flights f
+	        WHERE f.duty_id = OLD.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date)
+	    WHERE crew_member_id = OLD.crew_member_id
+	      AND flight_date IN (SELECT date(off_block_time) FROM flights WHERE duty_id = OLD.id);
+	END
+	''',
+)
+
+# Налет и число секторов по членам экипажа и дням, посчитанные напрямую по flights
+# (источник истины для сводной таблицы)
+RAW_DAILY_FLIGHT_MINUTES_QUERY = '''
+	SELECT d.crew_member_id, date(f.off_block_time) AS flight_date, COALESCE(SUM(f.flight_time), 0),
+	       COUNT(*) AS sector_count
+	FROM flights f
+	JOIN duties d ON f.duty_id = d.id
+	WHERE date(f.off_block_time) IS NOT NULL
+	GROUP BY d.crew_member_id, date(f.off_block_time)
+'''
+
+
+# Время в секундах Unix (UTC) рядом с текстовыми TIMESTAMP: (таблица, столбец, исходный столбец).
+# Сравнение целых по составным индексам вместо date(start_time) и т.п. - без полного
+# просмотра таблицы. Время без часового пояса считается UTC (как strftime('%s') в SQLite).
+EPOCH_COLUMNS = (
+	('duties', 'start_epoch', 'start_time'),
+	('flights', 'off_block_epoch', 'off_block_time'),
+	('rest_periods', 'start_epoch', 'start_time'),
+)
+
+EPOCH_TRIGGERS_DDL = tuple(
+	statement.format(table=table, column=column, source=source)
+	for table, column, source in EPOCH_COLUMNS
+	for statement in (
+		'''
+		CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_insert
+		AFTER INSERT ON {table}
+		WHEN NEW.{column} IS NULL AND NEW.{source} IS NOT NULL
+		BEGIN
+		    UPDATE {table} SET {column} = CAST(strftime('%s', NEW.{source}) AS INTEGER) WHERE id = NEW.id;
+		END
+		''',
+		'''
+		CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_update
+		AFTER UPDATE OF {source} ON {table}
+		WHEN NEW.{source} IS NOT OLD.{source}
+		BEGIN
+		    UPDATE {table} SET {column} = CAST(strftime('%s', NEW.{source}) AS INTEGER) WHERE id = NEW.id;
+		END
+		''',
+	)
+)
+
+EPOCH_INDEXES_DDL = (
+	'CREATE INDEX IF NOT EXISTS idx_duties_crew_start_epoch ON duties (crew_member_id, start_epoch)',
+	# Покрывающий индекс для сумм налета по диапазону времени (limits.py, get_flight_time_stats)
+	'CREATE INDEX IF NOT EXISTS idx_flights_duty_off_block_epoch ON flights (duty_id, off_block_epoch, flight_time)',
+	'CREATE INDEX IF NOT EXISTS idx_rest_periods_crew_start_epoch ON rest_periods (crew_member_id, start_epoch)',
+)
+
+# Ключ страницы (start_epoch, id) без фильтра и с фильтром по воздушному судну
+# (для фильтра по члену экипажа подходит idx_duties_crew_start_epoch; id входит в любой индекс)
+DUTY_PAGE_INDEXES_DDL = (
+	'CREATE INDEX IF NOT EXISTS idx_duties_start_epoch ON duties (start_epoch)',
+	'CREATE INDEX IF NOT EXISTS idx_duties_aircraft_start_epoch ON duties (aircraft_id, start_epoch)',
+)
+
+# Заполнение сводной таблицы по диапазону ID членов экипажа [?, ?). OR REPLACE делает шаг
+# повторяемым и согласованным с триггерами, которые уже работают во время заполнения.
+FLIGHT_SUMMARY_BACKFILL_QUERY = '''
+	INSERT OR REPLACE INTO crew_daily_flight_minutes (crew_member_id, flight_date, flight_minutes)
+	SELECT d.crew_member_id, date(f.off_block_time), COALESCE(SUM(f.flight_time), 0)
+	FROM duties d
+	JOIN flights f ON f.duty_id = d.id
+	WHERE d.crew_member_id >= ? AND d.crew_member_id < ? AND date(f.off_block_time) IS NOT NULL
+	GROUP BY d.crew_member_id, date(f.off_block_time)
+'''
+
+
+# Триггеры сводной таблицы по дням с числом секторов (заменяют триггеры FLIGHT_SUMMARY_DDL).
+# Строка дня, в которой не осталось секторов, удаляется, поэтому число строк за месяц -
+# число дней с полетами.
+FLIGHT_SUMMARY_SECTORS_DDL = (
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_flights_summary_insert
+	AFTER INSERT ON flights
+	WHEN date(NEW.off_block_time) IS NOT NULL
+	BEGIN
+	    INSERT OR IGNORE INTO crew_daily_flight_minutes (crew_member_id, flight_date)
+	    SELECT crew_member_id, date(NEW.off_block_time) FROM duties WHERE id = NEW.duty_id;
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes + COALESCE(NEW.flight_time, 0),
+	        sector_count = sector_count + 1
+	    WHERE crew_member_id = (SELECT crew_member_id FROM duties WHERE id = NEW.duty_id)
+	      AND flight_date = date(NEW.off_block_time);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_flights_summary_delete
+	AFTER DELETE ON flights
+	WHEN date(OLD.off_block_time) IS NOT NULL
+	BEGIN
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes - COALESCE(OLD.flight_time, 0),
+	        sector_count = sector_count - 1
+	    WHERE crew_member_id = (SELECT crew_member_id FROM duties WHERE id = OLD.duty_id)
+	      AND flight_date = date(OLD.off_block_time);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_flights_summary_update
+	AFTER UPDATE OF duty_id, off_block_time, flight_time ON flights
+	BEGIN
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes - COALESCE(OLD.flight_time, 0),
+	        sector_count = sector_count - 1
+	    WHERE crew_member_id = (SELECT crew_member_id FROM duties WHERE id = OLD.duty_id)
+	      AND flight_date = date(OLD.off_block_time);
+	    INSERT OR IGNORE INTO crew_daily_flight_minutes (crew_member_id, flight_date)
+	    SELECT crew_member_id, date(NEW.off_block_time) FROM duties
+	    WHERE id = NEW.duty_id AND date(NEW.off_block_time) IS NOT NULL;
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes + COALESCE(NEW.flight_time, 0),
+	        sector_count = sector_count + 1
+	    WHERE crew_member_id = (SELECT crew_member_id FROM duties WHERE id = NEW.duty_id)
+	      AND flight_date = date(NEW.off_block_time);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_duties_summary_crew_update
+	AFTER UPDATE OF crew_member_id ON duties
+	WHEN OLD.crew_member_id IS NOT NEW.crew_member_id
+	BEGIN
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes - (
+	            SELECT COALESCE(SUM(f.flight_time), 0) FROM flights f
+	            WHERE f.duty_id = NEW.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date),
+	        sector_count = sector_count - (
+	            SELECT COUNT(*) FROM flights f
+	            WHERE f.duty_id = NEW.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date)
+	    WHERE crew_member_id = OLD.crew_member_id
+	      AND flight_date IN (SELECT date(off_block_time) FROM flights WHERE duty_id = NEW.id);
+	    INSERT OR IGNORE INTO crew_daily_flight_minutes (crew_member_id, flight_date)
+	    SELECT NEW.crew_member_id, date(off_block_time) FROM flights
+	    WHERE duty_id = NEW.id AND date(off_block_time) IS NOT NULL;
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes + (
+	            SELECT COALESCE(SUM(f.flight_time), 0) FROM flights f
+	            WHERE f.duty_id = NEW.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date),
+	        sector_count = sector_count + (
+	            SELECT COUNT(*) FROM flights f
+	            WHERE f.duty_id = NEW.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date)
+	    WHERE crew_member_id = NEW.crew_member_id
+	      AND flight_date IN (SELECT date(off_block_time) FROM flights WHERE duty_id = NEW.id);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_duties_summary_delete
+	AFTER DELETE ON duties
+	BEGIN
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes - (
+	            SELECT COALESCE(SUM(f.flight_time), 0) FROM flights f
+	            WHERE f.duty_id = OLD.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date),
+	        sector_count = sector_count - (
+	            SELECT COUNT(*) FROM flights f
+	            WHERE f.duty_id = OLD.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date)
+	    WHERE crew_member_id = OLD.crew_member_id
+	      AND flight_date IN (SELECT date(off_block_time) FROM flights WHERE duty_id = OLD.id);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_daily_summary_remove_empty
+	AFTER UPDATE OF sector_count ON crew_daily_flight_minutes
+	WHEN NEW.sector_count <= 0
+	BEGIN
+	    DELETE FROM crew_daily_flight_minutes
+	    WHERE crew_member_id = NEW.crew_member_id AND flight_date = NEW.flight_date;
+	END
+	''',
+)
+
+# Пересчет налета и секторов сводной таблицы по дням по диапазону ID членов экипажа [?, ?)
+FLIGHT_SUMMARY_SECTORS_BACKFILL_QUERY = '''
+	INSERT OR REPLACE INTO crew_daily_flight_minutes (crew_member_id, flight_date, flight_minutes, sector_count)
+	SELECT d.crew_member_id, date(f.off_block_time), COALESCE(SUM(f.flight_time), 0), COUNT(*)
+	FROM duties d
+	JOIN flights f ON f.duty_id = d.id
+	WHERE d.crew_member_id >= ? AND d.crew_member_id < ? AND date(f.off_block_time) IS NOT NULL
+	GROUP BY d.crew_member_id, date(f.off_block_time)
+'''
+
+# Месячная сводка по членам экипажа для отчетов: налет, секторы и дни с полетами
+# поддерживаются триггерами сводной таблицы по дням (не более 31 строки на месяц),
+# число заданий - триггерами duties (по месяцу начала задания).
+MONTHLY_STATS_DDL = (
+	'''
+	CREATE TABLE IF NOT EXISTS crew_monthly_flight_stats (
+	    crew_member_id INTEGER NOT NULL,
+	    year INTEGER NOT NULL,
+	    month INTEGER NOT NULL,
+	    flight_minutes INTEGER NOT NULL DEFAULT 0,
+	    sector_count INTEGER NOT NULL DEFAULT 0,
+	    flight_days INTEGER NOT NULL DEFAULT 0,
+	    duty_count INTEGER NOT NULL DEFAULT 0,
+	    PRIMARY KEY (crew_member_id, year, month)
+	) WITHOUT ROWID
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_daily_monthly_insert
+	AFTER INSERT ON crew_daily_flight_minutes
+	BEGIN
+	    INSERT OR IGNORE INTO crew_monthly_flight_stats (crew_member_id, year, month)
+	    VALUES (NEW.crew_member_id, CAST(strftime('%Y', NEW.flight_date) AS INTEGER),
+	            CAST(strftime('%m', NEW.flight_date) AS INTEGER));
+	    UPDATE crew_monthly_flight_stats
+	    SET flight_minutes = flight_minutes + NEW.flight_minutes,
+	        sector_count = sector_count + NEW.sector_count,
+	        flight_days = flight_days + (NEW.sector_count > 0)
+	    WHERE crew_member_id = NEW.crew_member_id
+	      AND year = CAST(strftime('%Y', NEW.flight_date) AS INTEGER)
+	      AND month = CAST(strftime('%m', NEW.flight_date) AS INTEGER);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_daily_monthly_delete
+	AFTER DELETE ON crew_daily_flight_minutes
+	BEGIN
+	    UPDATE crew_monthly_flight_stats
+	    SET flight_minutes = flight_minutes - OLD.flight_minutes,
+	        sector_count = sector_count - OLD.sector_count,
+	        flight_days = flight_days - (OLD.sector_count > 0)
+	    WHERE crew_member_id = OLD.crew_member_id
+	      AND year = CAST(strftime('%Y', OLD.flight_date) AS INTEGER)
+	      AND month = CAST(strftime('%m', OLD.flight_date) AS INTEGER);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_daily_monthly_update
+	AFTER UPDATE ON crew_daily_flight_minutes
+	BEGIN
+	    UPDATE crew_monthly_flight_stats
+	    SET flight_minutes = flight_minutes - OLD.flight_minutes,
+	        sector_count = sector_count - OLD.sector_count,
+	        flight_days = flight_days - (OLD.sector_count > 0)
+	    WHERE crew_member_id = OLD.crew_member_id
+	      AND year = CAST(strftime('%Y', OLD.flight_date) AS INTEGER)
+	      AND month = CAST(strftime('%m', OLD.flight_date) AS INTEGER);
+	    INSERT OR IGNORE INTO crew_monthly_flight_stats (crew_member_id, year, month)
+	    VALUES (NEW.crew_member_id, CAST(strftime('%Y', NEW.flight_date) AS INTEGER),
+	            CAST(strftime('%m', NEW.flight_date) AS INTEGER));
+	    UPDATE crew_monthly_flight_stats
+	    SET flight_minutes = flight_minutes + NEW.flight_minutes,
+	        sector_count = sector_count + NEW.sector_count,
+	        flight_days = flight_days + (NEW.sector_count > 0)
+	    WHERE crew_member_id = NEW.crew_member_id
+	      AND year = CAST(strftime('%Y', NEW.flight_date) AS INTEGER)
+	      AND month = CAST(strftime('%m', NEW.flight_date) AS INTEGER);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_duties_monthly_insert
+	AFTER INSERT ON duties
+	WHEN strftime('%Y', NEW.start_time) IS NOT NULL
+	BEGIN
+	    INSERT OR IGNORE INTO crew_monthly_flight_stats (crew_member_id, year, month)
+	    VALUES (NEW.crew_member_id, CAST(strftime('%Y', NEW.start_time) AS INTEGER),
+	            CAST(strftime('%m', NEW.start_time) AS INTEGER));
+	    UPDATE crew_monthly_flight_stats SET duty_count = duty_count + 1
+	    WHERE crew_member_id = NEW.crew_member_id
+	      AND year = CAST(strftime('%Y', NEW.start_time) AS INTEGER)
+	      AND month = CAST(strftime('%m', NEW.start_time) AS INTEGER);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_duties_monthly_delete
+	AFTER DELETE ON duties
+	WHEN strftime('%Y', OLD.start_time) IS NOT NULL
+	BEGIN
+	    UPDATE crew_monthly_flight_stats SET duty_count = duty_count - 1
+	    WHERE crew_member_id = OLD.crew_member_id
+	      AND year = CAST(strftime('%Y', OLD.start_time) AS INTEGER)
+	      AND month = CAST(strftime('%m', OLD.start_time) AS INTEGER);
+	END
+	''',
+	'''
+	CREATE TRIGGER IF NOT EXISTS trg_duties_monthly_update
+	AFTER UPDATE OF crew_member_id, start_time ON duties
+	WHEN OLD.crew_member_id IS NOT NEW.crew_member_id
+	  OR strftime('%Y-%m', OLD.start_time) IS NOT strftime('%Y-%m', NEW.start_time)
+	BEGIN
+	    UPDATE crew_monthly_flight_stats SET duty_count = duty_count - 1
+	    WHERE crew_member_id = OLD.crew_member_id
+	      AND year = CAST(strftime('%Y', OLD.start_time) AS INTEGER)
+	      AND month = CAST(strftime('%m', OLD.start_time) AS INTEGER);
+	    INSERT OR IGNORE INTO crew_monthly_flight_stats (crew_member_id, year, month)
+	    SELECT NEW.crew_member_id, CAST(strftime('%Y', NEW.start_time) AS INTEGER),
+	           CAST(strftime('%m', NEW.start_time) AS INTEGER)
+	    WHERE strftime('%Y', NEW.start_time) IS NOT NULL;
+	    UPDATE crew_monthly_flight_stats SET duty_count = duty_count + 1
+	    WHERE crew_member_id = NEW.crew_member_id
+	      AND year = CAST(strftime('%Y', NEW.start_time) AS INTEGER)
+	      AND month = CAST(strftime('%m', NEW.start_time) AS INTEGER);
+	END
+	''',
+)
+
+# Для сводки по всему парку за диапазон месяцев
+MONTHLY_STATS_INDEXES_DDL = (
+	'CREATE INDEX IF NOT EXISTS idx_monthly_stats_month ON crew_monthly_flight_stats (year, month)',
+)
+
+# Месячная сводка, посчитанная по сводной таблице по дням и duties (источник истины для проверки)
+RAW_MONTHLY_FLIGHT_STATS_QUERY = '''
+	SELECT crew_member_id, year, month, SUM(flight_minutes), SUM(sector_count), SUM(flight_days), SUM(duty_count)
+	FROM (
+	    SELECT crew_member_id, CAST(strftime('%Y', flight_date) AS INTEGER) AS year,
+	           CAST(strftime('%m', flight_date) AS INTEGER) AS month,
+	           flight_minutes, sector_count, (sector_count > 0) AS flight_days, 0 AS duty_count
+	    FROM crew_daily_flight_minutes
+	    WHERE crew_member_id >= :low AND crew_member_id < :high
+	    UNION ALL
+	    SELECT crew_member_id, CAST(strftime('%Y', start_time) AS INTEGER),
+	           CAST(strftime('%m', start_time) AS INTEGER), 0, 0, 0, 1
+	    FROM duties
+	    WHERE crew_member_id >= :low AND crew_member_id < :high AND strftime('%Y', start_time) IS NOT NULL
+	)
+	GROUP BY crew_member_id, year, month
+'''
+
+
+# Перенос в архив (archive.py) не должен менять сводные таблицы: история налета остается
+# в активной базе. На время переноса в той же транзакции вставляется строка archive_in_progress,
+# и триггеры удаления заданий и полетов ее пропускают (после фиксации строки уже нет).
+ARCHIVE_GUARD = "NOT EXISTS (SELECT 1 FROM archive_in_progress)"
+
+ARCHIVE_GUARD_DDL = (
+	'''
+	CREATE TABLE IF NOT EXISTS archive_in_progress (
+	    id INTEGER PRIMARY KEY
+	)
+	''',
+	'DROP TRIGGER IF EXISTS trg_flights_summary_delete',
+	f'''
+	CREATE TRIGGER IF NOT EXISTS trg_flights_summary_delete
+	AFTER DELETE ON flights
+	WHEN date(OLD.off_block_time) IS NOT NULL AND {ARCHIVE_GUARD}
+	BEGIN
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes - COALESCE(OLD.flight_time, 0),
+	        sector_count = sector_count - 1
+	    WHERE crew_member_id = (SELECT crew_member_id FROM duties WHERE id = OLD.duty_id)
+	      AND flight_date = date(OLD.off_block_time);
+	END
+	''',
+	'DROP TRIGGER IF EXISTS trg_duties_summary_delete',
+	f'''
+	CREATE TRIGGER IF NOT EXISTS trg_duties_summary_delete
+	AFTER DELETE ON duties
+	WHEN {ARCHIVE_GUARD}
+	BEGIN
+	    UPDATE crew_daily_flight_minutes
+	    SET flight_minutes = flight_minutes - (
+	            SELECT COALESCE(SUM(f.flight_time), 0) FROM flights f
+	            WHERE f.duty_id = OLD.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date),
+	        sector_count = sector_count - (
+	            SELECT COUNT(*) FROM flights f
+	            WHERE f.duty_id = OLD.id AND date(f.off_block_time) = crew_daily_flight_minutes.flight_date)
+	    WHERE crew_member_id = OLD.crew_member_id
+	      AND flight_date IN (SELECT date(off_block_time) FROM flights WHERE duty_id = OLD.id);
+	END
+	''',
+	'DROP TRIGGER IF EXISTS trg_duties_monthly_delete',
+	f'''
+	CREATE TRIGGER IF NOT EXISTS trg_duties_monthly_delete
+	AFTER DELETE ON duties
+	WHEN strftime('%Y', OLD.start_time) IS NOT NULL AND {ARCHIVE_GUARD}
+	BEGIN
+	    UPDATE crew_monthly_flight_stats SET duty_count = duty_count - 1
+	    WHERE crew_member_id = OLD.crew_member_id
+	      AND year = CAST(strftime('%Y', OLD.start_time) AS INTEGER)
+	      AND month = CAST(strftime('%m', OLD.start_time) AS INTEGER);
+	END
+	''',
+)
+
+
+class MigrationRunner:
+	"""Выполняет шаги миграций короткими транзакциями на соединении в режиме автофиксации"""
+
+	def __init__(self, conn, batch_size=BACKFILL_BATCH_SIZE):
+		self.conn = conn
+		self.batch_size = batch_size
+
+	def _transaction(self, statements):
+		"""Выполняет (sql, параметры) одной транзакцией; блокировка записи берется сразу"""
+		cursor = self.conn.cursor()
+		cursor.execute("BEGIN IMMEDIATE")
+		try:
+			for sql, params in statements:
+				cursor.execute(sql, params)
+			cursor.execute("COMMIT")
+		except BaseException:
+			cursor.execute("ROLLBACK")
+			raise
+
+	def execute(self, *statements):
+		"""Выполняет DDL одной транзакцией"""
+		self._transaction([(sql, ()) for sql in statements])
+
+	def create_index(self, sql):
+		"""Строит индекс в отдельной транзакции, чтобы блокировка записи держалась только на время его построения"""
+		self._transaction([(sql, ())])
+
+	def column_exists(self, table, column):
+		"""Проверяет наличие столбца в таблице"""
+		cursor = self.conn.execute(f"PRAGMA table_info({table})")
+		return column in {row[1] for row in cursor.fetchall()}
+
+	def add_column(self, table, column, declaration):
+		"""Добавляет столбец, если его еще нет"""
+		if not self.column_exists(table, column):
+			self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+	def backfill(self, sql, id_query, batch_size=None):
+		"""
+		Выполняет sql (с параметрами-границами [начало, конец)) по диапазонам ID из id_query
+		(возвращает MIN и MAX), фиксируя каждую пачку. Возвращает количество пачек.
+		"""
+		batch_size = batch_size or self.batch_size
+		low, high = self.conn.execute(id_query).fetchone()
+		if low is None:
+			return 0
+		batches = 0
+		for start in range(low, high + 1, batch_size):
+			self._transaction([(sql, (start, start + batch_size))])
+			batches += 1
+		return batches
+
+
+def _base_schema(runner):
+	"""Таблицы, начальные настройки и исходные индексы"""
+	runner.execute(*BASE_SCHEMA_DDL)
+	for sql in BASE_INDEXES_DDL:
+		runner.create_index(sql)
+
+
+def _flight_summary(runner):
+	"""Сводная таблица налета по дням с триггерами и заполнением из flights"""
+	runner.execute(*FLIGHT_SUMMARY_DDL)
+	# Пачка - диапазон ID членов экипажа (у каждого не больше ~366 строк сводной таблицы в год)
+	runner.backfill(FLIGHT_SUMMARY_BACKFILL_QUERY, "SELECT MIN(crew_member_id), MAX(crew_member_id) FROM duties",
+	                batch_size=max(1, runner.batch_size // 1000))
+
+
+def _epoch_columns(runner):
+	"""Столбцы времени в секундах Unix, их триггеры, заполнение и составные индексы"""
+	for table, column, source in EPOCH_COLUMNS:
+		runner.add_column(table, column, "INTEGER")
+	# Триггеры создаются до заполнения: строки, добавленные во время миграции, уже получают значение
+	runner.execute(*EPOCH_TRIGGERS_DDL)
+	for table, column, source in EPOCH_COLUMNS:
+		runner.backfill(
+			f"UPDATE {table} SET {column} = CAST(strftime('%s', {source}) AS INTEGER) "
+			f"WHERE id >= ? AND id < ? AND {column} IS NULL AND {source} IS NOT NULL",
+			f"SELECT MIN(id), MAX(id) FROM {table}"
+		)
+	for sql in EPOCH_INDEXES_DDL:
+		runner.create_index(sql)
+	# Заменен индексом idx_flights_duty_off_block_epoch
+	runner.execute("DROP INDEX IF EXISTS idx_flights_duty_off_block")
+
+
+def _duty_page_indexes(runner):
+	"""Индексы постраничной выборки заданий по ключу (start_epoch, id)"""
+	for sql in DUTY_PAGE_INDEXES_DDL:
+		runner.create_index(sql)
+
+
+def _monthly_stats(runner):
+	"""Число секторов в сводной таблице по дням и месячная сводка с триггерами и заполнением"""
+	runner.add_column("crew_daily_flight_minutes", "sector_count", "INTEGER NOT NULL DEFAULT 0")
+	runner.execute(*(f"DROP TRIGGER IF EXISTS {name}" for name in (
+		"trg_flights_summary_insert", "trg_flights_summary_delete", "trg_flights_summary_update",
+		"trg_duties_summary_crew_update", "trg_duties_summary_delete",
+	)), *FLIGHT_SUMMARY_SECTORS_DDL)
+	crew_range = "SELECT MIN(crew_member_id), MAX(crew_member_id) FROM duties"
+	batch_size = max(1, runner.batch_size // 1000)
+	# Сначала сводная таблица по дням: пока нет месячных триггеров, INSERT OR REPLACE их не задевает
+	runner.backfill(FLIGHT_SUMMARY_SECTORS_BACKFILL_QUERY, crew_range, batch_size=batch_size)
+	runner.execute("DELETE FROM crew_daily_flight_minutes WHERE sector_count <= 0")
+	runner.execute(*MONTHLY_STATS_DDL)
+	runner.backfill(
+		"INSERT OR REPLACE INTO crew_monthly_flight_stats "
+		"(crew_member_id, year, month, flight_minutes, sector_count, flight_days, duty_count) "
+		+ RAW_MONTHLY_FLIGHT_STATS_QUERY.replace(":low", "?1").replace(":high", "?2"),
+		crew_range, batch_size=batch_size
+	)
+	for sql in MONTHLY_STATS_INDEXES_DDL:
+		runner.create_index(sql)
+
+
+def _archive_guard(runner):
+	"""Триггеры удаления, пропускающие перенос записей в архив"""
+	runner.execute(*ARCHIVE_GUARD_DDL)
+
+
+# (версия, описание, шаг) в порядке применения; новые миграции добавляются только в конец
+MIGRATIONS = (
+	(1, "исходная схема", _base_schema),
+	(2, "сводная таблица налета по дням", _flight_summary),
+	(3, "столбцы времени в секундах Unix и составные индексы", _epoch_columns),
+	(4, "индексы постраничной выборки заданий", _duty_page_indexes),
+	(5, "месячная сводка налета, секторов, дней с полетами и заданий", _monthly_stats),
+	(6, "сводные таблицы не меняются при переносе в архив", _archive_guard),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+	"""Возвращает номер последней примененной миграции (PRAGMA user_version)"""
+	return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, batch_size=BACKFILL_BATCH_SIZE, log=print):
+	"""
+	Применяет к базе недостающие миграции по порядку.
+	Возвращает список (версия, описание, длительность в секундах) примененных шагов.
+	"""
+	current = get_schema_version(conn)
+	if current > SCHEMA_VERSION:
+		log(f"Версия схемы базы ({current}) новее версии приложения ({SCHEMA_VERSION}), миграции пропущены")
+		return []
+
+	if conn.in_transaction:
+		conn.commit()
+	isolation_level = conn.isolation_level
+	conn.isolation_level = None
+	runner = MigrationRunner(conn, batch_size)
+	applied = []
+	try:
+		for version, description, step in MIGRATIONS:
+			if version <= current:
+				continue
+			started = time.perf_counter()
+			step(runner)
+			runner.execute(f"PRAGMA user_version = {version}")
+			elapsed = time.perf_counter() - started
+			applied.append((version, description, elapsed))
+			log(f"Миграция {version} ({description}): {elapsed:.2f} с")
+	finally:
+		conn.isolation_level = isolation_level
+	return applied
+
+
+if __name__ == "__main__":
+	import argparse
+
+	parser = argparse.ArgumentParser(description="Миграции схемы базы данных FDP")
+	parser.add_argument("--db", default="fdp_data.db", help="путь к файлу базы данных")
+	parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE,
+	                    help="строк в одной транзакции заполнения")
+	args = parser.parse_args()
+
+	conn = sqlite3.connect(args.db)
+	try:
+		conn.execute("PRAGMA journal_mode = WAL")
+		conn.execute("PRAGMA busy_timeout = 30000")
+		before = get_schema_version(conn)
+		applied = migrate(conn, args.batch_size)
+		print(f"Версия схемы: {before} -> {get_schema_version(conn)} (актуальная {SCHEMA_VERSION}), "
+		      f"применено миграций: {len(applied)}")
+	finally:
+		conn.close()
@@ -5,7 +5,9 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGroupBox,
                              QMessageBox)
 from PyQt6.QtCore import QDateTime
 from calculator import FDPCalculator
-import sqlite3
+from async_db import get_async_db
+from write_behind import get_duty_writer
+from reference_data import get_reference_data
 from datetime import datetime, timedelta
 
 
@@ -17,6 +19,20 @@ class PlanningTab(QWidget):
         self.load_crew_members()
         self.load_aircrafts()
 
+        # Списки обновляются по сигналам общего справочника, без повторного чтения базы
+        reference_data = get_reference_data()
+        reference_data.crew_changed.connect(self.load_crew_members)
+        reference_data.aircraft_changed.connect(self.load_aircrafts)
+
+        # Задания сохраняются через общую очередь записи; номера записей этой вкладки
+        duty_writer = get_duty_writer()
+        duty_writer.written.connect(self.on_duty_saved)
+        duty_writer.failed.connect(self.on_duty_save_failed)
+        self.pending_saves = {}
+
+        # Незавершенная фоновая проверка лимитов для последнего рассчитанного плана
+        self._limits_query = None
+
     def init_ui(self):
         main_layout = QVBoxLayout()
 
@@ -88,6 +104,10 @@ class PlanningTab(QWidget):
         self.save_btn.clicked.connect(self.save_duty)
         button_layout.addWidget(self.save_btn)
 
+        # Состояние фоновой записи заданий (без модальных окон при успехе)
+        self.save_status_label = QLabel("")
+        button_layout.addWidget(self.save_status_label)
+
         main_layout.addLayout(button_layout)
 
         # Поле вывода результатов
@@ -105,29 +125,24 @@ class PlanningTab(QWidget):
         """Обработчик изменения выбора члена экипажа"""
         if index >= 0:
             self.selected_crew_member_id = self.crew_member_combo.currentData()
-            # Получаем информацию о члене экипажа
-            conn = sqlite3.connect('fdp_data.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT home_base FROM crew_members WHERE id = ?", (self.selected_crew_member_id,))
-            result = cursor.fetchone()
-            conn.close()
+            # Информация о члене экипажа берется из справочника в памяти
+            crew_member = get_reference_data().crew_member(self.selected_crew_member_id)
 
-            if result:
-                self.home_base_label.setText(result[0])
+            if crew_member:
+                self.home_base_label.setText(crew_member[2])
+        else:
+            self.selected_crew_member_id = None
+            self.home_base_label.setText("Не выбрано")
 
     def on_aircraft_changed(self, index):
         """Обработчик изменения выбора воздушного судна"""
         if index >= 0:
             self.selected_aircraft_id = self.aircraft_combo.currentData()
-            # Получаем информацию о воздушном судне
-            conn = sqlite3.connect('fdp_data.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT rest_facility_class FROM aircrafts WHERE id = ?", (self.selected_aircraft_id,))
-            result = cursor.fetchone()
-            conn.close()
-
-            if result:
-                rest_class = result[0]
+            # Информация о воздушном судне берется из справочника в памяти
+            aircraft = get_reference_data().aircraft(self.selected_aircraft_id)
+
+            if aircraft:
+                rest_class = aircraft[3]
                 if rest_class == 1:
                     self.rest_class_label.setText("1 класс (спальное место)")
                 elif rest_class == 2:
@@ -136,38 +151,40 @@ class PlanningTab(QWidget):
                     self.rest_class_label.setText("3 класс (стандартное кресло)")
                 else:
                     self.rest_class_label.setText("Не предусмотрен")
+        else:
+            self.selected_aircraft_id = None
+            self.rest_class_label.setText("Не выбрано")
+
+    def _fill_combo(self, combo, items, on_changed):
+        """Заполняет список, сохраняя текущий выбор, и один раз вызывает обработчик выбора"""
+        selected_id = combo.currentData()
+        combo.blockSignals(True)
+        combo.clear()
+        for item_id, text in items:
+            combo.addItem(text, item_id)
+        if selected_id is not None and combo.findData(selected_id) >= 0:
+            combo.setCurrentIndex(combo.findData(selected_id))
+        combo.blockSignals(False)
+        on_changed(combo.currentIndex())
 
     def load_crew_members(self):
-        """Загружает список членов экипажа из базы данных"""
-        try:
-            conn = sqlite3.connect('fdp_data.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, name, home_base FROM crew_members")
-            crew_data = cursor.fetchall()
-            conn.close()
-
-            self.crew_member_combo.clear()
-            for crew_id, name, home_base in crew_data:
-                self.crew_member_combo.addItem(f"{name} ({home_base})", crew_id)
-
-        except sqlite3.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить членов экипажа: {e}")
+        """Загружает список членов экипажа из общего справочника"""
+        crew_data = get_reference_data().crew_members()
+        self._fill_combo(
+            self.crew_member_combo,
+            [(crew_id, f"{name} ({home_base})") for crew_id, name, home_base, _ in crew_data],
+            self.on_crew_member_changed
+        )
 
     def load_aircrafts(self):
-        """Загружает список воздушных судов из базы данных"""
-        try:
-            conn = sqlite3.connect('fdp_data.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, registration, type FROM aircrafts")
-            aircraft_data = cursor.fetchall()
-            conn.close()
-
-            self.aircraft_combo.clear()
-            for aircraft_id, registration, aircraft_type in aircraft_data:
-                self.aircraft_combo.addItem(f"{registration} ({aircraft_type})", aircraft_id)
-
-        except sqlite3.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить воздушные суда: {e}")
+        """Загружает список воздушных судов из общего справочника"""
+        aircraft_data = get_reference_data().aircrafts()
+        self._fill_combo(
+            self.aircraft_combo,
+            [(aircraft_id, f"{registration} ({aircraft_type})")
+             for aircraft_id, registration, aircraft_type, _ in aircraft_data],
+            self.on_aircraft_changed
+        )
 
     def calculate_plan(self):
         """Рассчитывает план полета на основе введенных параметров"""
@@ -188,16 +205,10 @@ class PlanningTab(QWidget):
                 QMessageBox.warning(self, "Предупреждение", "Выберите воздушное судно!")
                 return
 
-            # Получаем дополнительную информацию о члене экипажа
-            conn = sqlite3.connect('fdp_data.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT home_base FROM crew_members WHERE id = ?", (self.selected_crew_member_id,))
-            home_base = cursor.fetchone()[0]
-
-            # Получаем информацию о воздушном судне
-            cursor.execute("SELECT rest_facility_class FROM aircrafts WHERE id = ?", (self.selected_aircraft_id,))
-            rest_facility_class = cursor.fetchone()[0]
-            conn.close()
+            # Дополнительная информация о члене экипажа и воздушном судне - из справочника
+            reference_data = get_reference_data()
+            home_base = reference_data.crew_member(self.selected_crew_member_id)[2]
+            rest_facility_class = reference_data.aircraft(self.selected_aircraft_id)[3]
 
             # Определяем часовые пояса (упрощенная реализация)
             # В реальном приложении нужно использовать API для определения часовых поясов аэропортов
@@ -206,7 +217,7 @@ class PlanningTab(QWidget):
 
             # Определяем акклиматизацию (упрощенно)
             acclimatization_status = self.calculator.determine_acclimatization(
-                base_timezone, local_timezone, 0
+                base_timezone, local_timezone, 0, start_time
             )
 
             # Рассчитываем максимальное FDP
@@ -238,25 +249,42 @@ class PlanningTab(QWidget):
                 if in_flight_rest:
                     result += f"Минимальный отдых в полете: {in_flight_rest}\n\n"
 
-            # Проверяем лимиты
-            planned_flight_time = timedelta(hours=2)  # Примерное время полета
-            limits = self.calculator.check_limits(self.selected_crew_member_id, planned_flight_time,
-                                                  sqlite3.connect('fdp_data.db'))
-
-            result += "ПРОВЕРКА ЛИМИТОВ:\n"
-            for limit_name, limit_data in limits.items():
-                if limit_name == "last_28_days":
-                    result += f"За последние 28 дней: {limit_data['current']} / {limit_data['limit']}"
-                    if limit_data['exceeded']:
-                        result += " ⚠️ ПРЕВЫШЕНИЕ!\n"
-                    else:
-                        result += f" (осталось: {limit_data['remaining']})\n"
+            # Проверяем лимиты в фоновом потоке; результат предыдущей проверки больше не нужен
+            if self._limits_query is not None:
+                self._limits_query.cancel()
+            self.result_text.setPlainText(result + "ПРОВЕРКА ЛИМИТОВ: выполняется...\n")
 
-            self.result_text.setPlainText(result)
+            planned_flight_time = timedelta(hours=2)  # Примерное время полета
+            query = get_async_db().submit_with_connection(
+                self.calculator.check_limits, self.selected_crew_member_id, planned_flight_time,
+                on_result=lambda limits: self.show_limits(query, result, limits),
+                on_error=self.on_limits_failed)
+            self._limits_query = query
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось рассчитать план: {str(e)}")
 
+    def show_limits(self, query, result, limits):
+        """Дополняет план проверкой лимитов, если это ответ на последний запрос"""
+        if query is not self._limits_query:
+            return
+        self._limits_query = None
+
+        result += "ПРОВЕРКА ЛИМИТОВ:\n"
+        for limit_name, limit_data in limits.items():
+            if limit_name == "last_28_days":
+                result += f"За последние 28 дней: {limit_data['current']} / {limit_data['limit']}"
+                if limit_data['exceeded']:
+                    result += " ⚠️ ПРЕВЫШЕНИЕ!\n"
+                else:
+                    result += f" (осталось: {limit_data['remaining']})\n"
+
+        self.result_text.setPlainText(result)
+
+    def on_limits_failed(self, message):
+        self._limits_query = None
+        QMessageBox.critical(self, "Ошибка", f"Не удалось проверить лимиты: {message}")
+
     def save_duty(self):
         """Сохраняет задание в базу данных"""
         try:
@@ -272,21 +300,31 @@ class PlanningTab(QWidget):
                 QMessageBox.warning(self, "Предупреждение", "Выберите члена экипажа и воздушное судно!")
                 return
 
-            # Сохраняем в базу данных
-            conn = sqlite3.connect('fdp_data.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                INSERT INTO duties (crew_member_id, aircraft_id, start_time, scheduled_sectors, 
-                                  departure_airport, arrival_airport, rest_in_flight, has_frms)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (self.selected_crew_member_id, self.selected_aircraft_id, start_time, sectors,
-                  departure, arrival, rest_in_flight, has_frms))
-
-            conn.commit()
-            conn.close()
-
-            QMessageBox.information(self, "Успех", "Задание успешно сохранено!")
+            # Ставим задание в очередь фоновой записи; результат придет сигналом писателя
+            ticket = get_duty_writer().enqueue_duty(self.selected_crew_member_id, self.selected_aircraft_id,
+                                                    start_time, sectors, departure, arrival,
+                                                    rest_in_flight, has_frms)
+            self.pending_saves[ticket] = f"{departure} -> {arrival}, {start_time.strftime('%d.%m.%Y %H:%M')}"
+            self.update_save_status()
 
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить задание: {str(e)}")
\ No newline at end of file
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить задание: {str(e)}")
+
+    def update_save_status(self, message=""):
+        """Показывает число заданий, ожидающих записи, или последнее сообщение"""
+        if self.pending_saves:
+            self.save_status_label.setText(f"Сохраняется заданий: {len(self.pending_saves)}")
+        else:
+            self.save_status_label.setText(message)
+
+    def on_duty_saved(self, ticket, duty_id):
+        """Обработчик успешной записи задания"""
+        if self.pending_saves.pop(ticket, None) is not None:
+            self.update_save_status("Задание успешно сохранено")
+
+    def on_duty_save_failed(self, ticket, message):
+        """Обработчик ошибки записи задания"""
+        description = self.pending_saves.pop(ticket, None)
+        if description is not None:
+            self.update_save_status()
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить задание {description}: {message}")
\ No newline at end of file
@@ -0,0 +1,94 @@
+# reference_data.py
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from database import get_db
+
+
+class ReferenceData(QObject):
+	"""
+	Справочники членов экипажа и воздушных судов в памяти процесса, индексированные по ID.
+	Загружаются один раз; Database сообщает об изменениях (add/update/delete), после чего
+	меняется только затронутая строка и испускается сигнал crew_changed / aircraft_changed.
+	"""
+	crew_changed = pyqtSignal()
+	aircraft_changed = pyqtSignal()
+
+	def __init__(self, db):
+		super().__init__()
+		self.db = db
+		self._lock = threading.RLock()
+		self._crew = None
+		self._aircraft = None
+		db.add_change_listener(self._on_database_changed)
+
+	def _crew_index(self):
+		with self._lock:
+			if self._crew is None:
+				self._crew = {row[0]: row for row in self.db.get_all_crew_members()}
+			return self._crew
+
+	def _aircraft_index(self):
+		with self._lock:
+			if self._aircraft is None:
+				self._aircraft = {row[0]: row for row in self.db.get_all_aircrafts()}
+			return self._aircraft
+
+	def crew_members(self):
+		"""Все члены экипажа: (id, name, home_base, is_pilot), как Database.get_all_crew_members()"""
+		with self._lock:
+			return list(self._crew_index().values())
+
+	def crew_member(self, crew_member_id):
+		"""Член экипажа по ID или None"""
+		with self._lock:
+			return self._crew_index().get(crew_member_id)
+
+	def aircrafts(self):
+		"""Все воздушные суда: (id, registration, type, rest_facility_class), как Database.get_all_aircrafts()"""
+		with self._lock:
+			return list(self._aircraft_index().values())
+
+	def aircraft(self, aircraft_id):
+		"""Воздушное судно по ID или None"""
+		with self._lock:
+			return self._aircraft_index().get(aircraft_id)
+
+	def invalidate(self):
+		"""Сбрасывает оба справочника; они будут перечитаны при следующем обращении"""
+		with self._lock:
+			self._crew = None
+			self._aircraft = None
+		self.crew_changed.emit()
+		self.aircraft_changed.emit()
+
+	def _on_database_changed(self, table, row_id):
+		"""Обновляет строку справочника после изменения в базе (может вызываться из любого потока)"""
+		if table == "crew_members":
+			index, fetch, signal = self._crew, self.db.get_crew_member, self.crew_changed
+		elif table == "aircrafts":
+			index, fetch, signal = self._aircraft, self.db.get_aircraft, self.aircraft_changed
+		else:
+			return
+
+		# Еще не загруженный справочник прочитается целиком при первом обращении
+		if index is not None:
+			row = fetch(row_id)
+			with self._lock:
+				if row is None:
+					index.pop(row_id, None)
+				else:
+					index[row_id] = row
+		signal.emit()
+
+
+_reference_data = None
+
+
+def get_reference_data():
+	"""Возвращает общий для процесса справочник (создается при первом обращении, в потоке GUI)"""
+	global _reference_data
+	if _reference_data is None:
+		_reference_data = ReferenceData(get_db())
+	return _reference_data
@@ -4,15 +4,19 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
                              QHeaderView, QMessageBox)
 from PyQt6.QtCore import QDate, Qt
 from PyQt6.QtGui import QColor, QBrush
-import sqlite3
 from datetime import datetime, timedelta
+from async_db import get_async_db
+from reference_data import get_reference_data
 
 
 class ScheduleTab(QWidget):
 	def __init__(self):
 		super().__init__()
+		# Незавершенная загрузка графика; отменяется, если пользователь успел выбрать другую неделю
+		self._schedule_query = None
 		self.init_ui()
 		self.load_crew_members()
+		get_reference_data().crew_changed.connect(self.load_crew_members)
 
 	def init_ui(self):
 		main_layout = QVBoxLayout()
@@ -36,6 +40,7 @@ class ScheduleTab(QWidget):
 			                        week_start)
 
 		control_layout.addWidget(self.week_combo)
+		self.week_combo.currentIndexChanged.connect(self.on_week_changed)
 
 		self.load_btn = QPushButton("Загрузить график")
 		self.load_btn.clicked.connect(self.load_schedule)
@@ -62,23 +67,21 @@ class ScheduleTab(QWidget):
 		self.setLayout(main_layout)
 
 	def load_crew_members(self):
-		"""Загружает список членов экипажа из базы данных"""
-		try:
-			conn = sqlite3.connect('fdp_data.db')
-			cursor = conn.cursor()
-			cursor.execute("SELECT id, name FROM crew_members")
-			crew_data = cursor.fetchall()
-			conn.close()
-
-			self.crew_member_combo.clear()
-			for crew_id, name in crew_data:
-				self.crew_member_combo.addItem(name, crew_id)
-
-		except sqlite3.Error as e:
-			QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить членов экипажа: {e}")
+		"""Загружает список членов экипажа из общего справочника, сохраняя текущий выбор"""
+		selected_id = self.crew_member_combo.currentData()
+		self.crew_member_combo.clear()
+		for crew_id, name, _, _ in get_reference_data().crew_members():
+			self.crew_member_combo.addItem(name, crew_id)
+		if selected_id is not None and self.crew_member_combo.findData(selected_id) >= 0:
+			self.crew_member_combo.setCurrentIndex(self.crew_member_combo.findData(selected_id))
+
+	def on_week_changed(self, index):
+		"""При смене недели график перечитывается, если член экипажа уже выбран"""
+		if index >= 0 and self.crew_member_combo.currentData():
+			self.load_schedule()
 
 	def load_schedule(self):
-		"""Загружает график для выбранного члена экипажа и недели"""
+		"""Загружает график для выбранного члена экипажа и недели (в фоновом потоке)"""
 		crew_member_id = self.crew_member_combo.currentData()
 		week_start = self.week_combo.currentData()
 
@@ -86,28 +89,39 @@ class ScheduleTab(QWidget):
 			QMessageBox.warning(self, "Предупреждение", "Выберите члена экипажа!")
 			return
 
+		# Результат предыдущей загрузки больше не нужен
+		if self._schedule_query is not None:
+			self._schedule_query.cancel()
+
 		# Очищаем таблицу
 		for row in range(24):
 			for col in range(1, 8):
 				self.schedule_table.setItem(row, col, QTableWidgetItem(""))
 
-		try:
-			conn = sqlite3.connect('fdp_data.db')
-			cursor = conn.cursor()
-
-			# Получаем задания для выбранной недели
-			week_end = week_start.addDays(6)
-			cursor.execute("""
-                SELECT start_time, scheduled_sectors, departure_airport, arrival_airport 
-                FROM duties 
-                WHERE crew_member_id = ? AND date(start_time) BETWEEN ? AND ?
-            """, (crew_member_id, week_start.toString("yyyy-MM-dd"), week_end.toString("yyyy-MM-dd")))
-
-			duties = cursor.fetchall()
-			conn.close()
+		# Читаем только задания выбранной недели (по индексу crew_member_id, start_epoch)
+		week_end = week_start.addDays(7)
+		query = get_async_db().submit("iter_duties", crew_member_id=crew_member_id,
+		                              start_date=week_start.toString("yyyy-MM-dd"),
+		                              end_date=week_end.toString("yyyy-MM-dd"),
+		                              on_result=lambda duties: self.show_schedule(query, duties),
+		                              on_error=self.on_schedule_failed)
+		self._schedule_query = query
+
+	def on_schedule_failed(self, message):
+		QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить график: {message}")
+
+	def show_schedule(self, query, duties):
+		"""Отображает задания недели, если это ответ на последний запрос"""
+		if query is not self._schedule_query:
+			return
+		self._schedule_query = None
 
+		try:
 			# Обрабатываем каждое задание
-			for start_time, sectors, departure, arrival in duties:
+			for duty in duties:
+				start_time, sectors, departure, arrival = duty[6], duty[7], duty[8], duty[9]
+				# ВС могло быть удалено: registration/aircraft_type тогда NULL
+				aircraft = f"{duty[4]} ({duty[5]})" if duty[4] is not None else "удалено"
 				duty_date = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S").date()
 				duty_weekday = duty_date.weekday()  # 0 - понедельник, 6 - воскресенье
 
@@ -122,7 +136,7 @@ class ScheduleTab(QWidget):
 				for hour in range(duty_hour, min(duty_hour + duty_duration, 24)):
 					item = QTableWidgetItem(f"{departure}→{arrival} ({sectors} сек.)")
 					item.setBackground(QBrush(duty_color))
-					item.setToolTip(f"Рейс: {departure}→{arrival}\nСекторов: {sectors}\nНачало: {start_time}")
+					item.setToolTip(f"Рейс: {departure}→{arrival}\nСекторов: {sectors}\nВС: {aircraft}\nНачало: {start_time}")
 					self.schedule_table.setItem(hour, duty_weekday + 1, item)
 
 		except Exception as e:
@@ -0,0 +1,285 @@
+# sql_trace.py
+"""
+Необязательная трассировка SQL слоя данных.
+
+Включается переменной окружения FDP_SQL_TRACE=1 (или enable_tracing() до первого
+обращения к базе). Соединения Database тогда создаются с TracedConnection: для каждого
+запроса запоминаются текст, длительность (выполнение и чтение строк), число строк и место
+вызова. Медленные запросы (FDP_SQL_SLOW_MS, по умолчанию 100 мс) пишутся в ротируемый
+журнал fdp_slow_queries.log, гистограмма задержек по запросам - во вкладке "Диагностика SQL".
+"""
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+
+SLOW_QUERY_LOG = "fdp_slow_queries.log"
+SLOW_QUERY_LOG_MAX_BYTES = 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+DEFAULT_SLOW_QUERY_MS = 100.0
+
+# Верхние границы корзин гистограммы задержек, мс (последняя - все, что дольше)
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float("inf"))
+
+# Модули слоя данных: место вызова - первый кадр стека за их пределами
+_DATA_LAYER_FILES = {"sql_trace.py", "database.py", "async_db.py", "write_behind.py", "reference_data.py"}
+
+_enabled = os.environ.get("FDP_SQL_TRACE", "") not in ("", "0")
+_slow_query_ms = float(os.environ.get("FDP_SQL_SLOW_MS", DEFAULT_SLOW_QUERY_MS))
+_slow_log = None
+_slow_log_path = SLOW_QUERY_LOG
+_stats_lock = threading.Lock()
+_stats = {}
+_trace_counts = {}
+
+
+def normalize_sql(sql):
+	"""Текст запроса в одну строку: ключ статистики"""
+	return re.sub(r"\s+", " ", sql).strip()
+
+
+def is_enabled():
+	return _enabled
+
+
+def slow_log_path():
+	return _slow_log_path
+
+
+def enable_tracing(slow_query_ms=None, log_path=SLOW_QUERY_LOG):
+	"""Включает трассировку для соединений, созданных после вызова"""
+	global _enabled, _slow_query_ms, _slow_log, _slow_log_path
+	_enabled = True
+	if slow_query_ms is not None:
+		_slow_query_ms = slow_query_ms
+	_slow_log_path = log_path
+	_slow_log = _create_slow_log(log_path)
+
+
+def _create_slow_log(log_path):
+	logger = logging.getLogger("fdp.sql.slow")
+	logger.setLevel(logging.INFO)
+	logger.propagate = False
+	for handler in list(logger.handlers):
+		logger.removeHandler(handler)
+		handler.close()
+	handler = RotatingFileHandler(log_path, maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+	                              backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8")
+	handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+	logger.addHandler(handler)
+	return logger
+
+
+def _calling_site():
+	"""
+	Место вызова запроса: кадр слоя данных, выполнивший запрос, и первый кадр за пределами
+	слоя данных (вкладка или скрипт), например "planning_tab.py:240 calculate_plan -> database.py:452 get_crew_member".
+	"""
+	frame = sys._getframe(2)
+	inner = None
+	while frame is not None:
+		file_name = os.path.basename(frame.f_code.co_filename)
+		if file_name != "sql_trace.py" and inner is None:
+			inner = f"{file_name}:{frame.f_lineno} {frame.f_code.co_name}"
+		if file_name not in _DATA_LAYER_FILES:
+			outer = f"{file_name}:{frame.f_lineno} {frame.f_code.co_name}"
+			return outer if outer == inner else f"{outer} -> {inner}"
+		frame = frame.f_back
+	return inner or "?"
+
+
+def record(sql, duration, rows, site):
+	"""Добавляет выполненный запрос в статистику и, если он медленный, в журнал"""
+	key = normalize_sql(sql)
+	duration_ms = duration * 1000
+	with _stats_lock:
+		stats = _stats.get(key)
+		if stats is None:
+			stats = _stats[key] = {
+				"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+				"buckets": [0] * len(LATENCY_BUCKETS_MS), "sites": {},
+			}
+		stats["count"] += 1
+		stats["total_ms"] += duration_ms
+		stats["max_ms"] = max(stats["max_ms"], duration_ms)
+		stats["rows"] += rows
+		stats["buckets"][next(i for i, bound in enumerate(LATENCY_BUCKETS_MS) if duration_ms <= bound)] += 1
+		stats["sites"][site] = stats["sites"].get(site, 0) + 1
+
+	if duration_ms >= _slow_query_ms and _slow_log is not None:
+		_slow_log.info(f"{duration_ms:.1f} мс, строк: {rows}, {site}: {key}")
+
+
+def _trace_statement(statement):
+	"""sqlite3 trace callback: все выполненные SQLite инструкции, включая BEGIN/COMMIT и тела триггеров"""
+	# SQLite передает текст с подставленными значениями параметров: они заменяются на ?
+	key = re.sub(r"\b\d+(?:\.\d+)?\b", "?", re.sub(r"'(?:[^']|'')*'", "?", normalize_sql(statement)))
+	with _stats_lock:
+		_trace_counts[key] = _trace_counts.get(key, 0) + 1
+
+
+def snapshot():
+	"""
+	Статистика по запросам, отсортированная по суммарному времени: список словарей
+	(sql, count, total_ms, avg_ms, max_ms, rows, buckets, site - самое частое место вызова).
+	"""
+	with _stats_lock:
+		items = [(key, dict(stats, buckets=list(stats["buckets"]), sites=dict(stats["sites"])))
+		         for key, stats in _stats.items()]
+	result = []
+	for key, stats in items:
+		result.append({
+			"sql": key,
+			"count": stats["count"],
+			"total_ms": stats["total_ms"],
+			"avg_ms": stats["total_ms"] / stats["count"],
+			"max_ms": stats["max_ms"],
+			"rows": stats["rows"],
+			"buckets": stats["buckets"],
+			"site": max(stats["sites"], key=stats["sites"].get),
+		})
+	result.sort(key=lambda row: row["total_ms"], reverse=True)
+	return result
+
+
+def trace_counts():
+	"""Сколько раз SQLite выполнил каждую инструкцию (по trace callback), по убыванию"""
+	with _stats_lock:
+		return sorted(_trace_counts.items(), key=lambda item: item[1], reverse=True)
+
+
+def reset():
+	"""Очищает накопленную статистику"""
+	with _stats_lock:
+		_stats.clear()
+		_trace_counts.clear()
+
+
+class TracedCursor(sqlite3.Cursor):
+	"""
+	Курсор, замеряющий запрос от execute до последней прочитанной строки.
+	Запись в статистику - когда строки прочитаны до конца, курсор переиспользован или закрыт.
+	"""
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self._trace = None
+
+	def _begin(self, sql):
+		self._finish()
+		self._trace = [sql, 0.0, 0, _calling_site()]
+
+	def _add(self, started, rows):
+		if self._trace is not None:
+			self._trace[1] += time.perf_counter() - started
+			self._trace[2] += rows
+
+	def _finish(self):
+		trace, self._trace = getattr(self, '_trace', None), None
+		if trace is not None:
+			sql, duration, rows, site = trace
+			# Для INSERT/UPDATE/DELETE - число измененных строк
+			try:
+				if self.description is None and self.rowcount > 0:
+					rows = self.rowcount
+			except sqlite3.ProgrammingError:
+				pass
+			record(sql, duration, rows, site)
+
+	def execute(self, sql, parameters=()):
+		self._begin(sql)
+		started = time.perf_counter()
+		try:
+			super().execute(sql, parameters)
+		finally:
+			self._add(started, 0)
+		if self.description is None:
+			self._finish()
+		return self
+
+	def executemany(self, sql, seq_of_parameters):
+		self._begin(sql)
+		started = time.perf_counter()
+		try:
+			super().executemany(sql, seq_of_parameters)
+		finally:
+			self._add(started, 0)
+			self._finish()
+		return self
+
+	def fetchone(self):
+		started = time.perf_counter()
+		row = super().fetchone()
+		self._add(started, 0 if row is None else 1)
+		if row is None:
+			self._finish()
+		return row
+
+	def fetchmany(self, size=None):
+		size = self.arraysize if size is None else size
+		started = time.perf_counter()
+		rows = super().fetchmany(size)
+		self._add(started, len(rows))
+		if len(rows) < size:
+			self._finish()
+		return rows
+
+	def fetchall(self):
+		started = time.perf_counter()
+		rows = super().fetchall()
+		self._add(started, len(rows))
+		self._finish()
+		return rows
+
+	def __next__(self):
+		started = time.perf_counter()
+		try:
+			row = super().__next__()
+		except StopIteration:
+			self._add(started, 0)
+			self._finish()
+			raise
+		self._add(started, 1)
+		return row
+
+	def close(self):
+		self._finish()
+		super().close()
+
+	def __del__(self):
+		# Курсор, строки которого прочитаны не до конца, попадает в статистику при сборке
+		self._finish()
+
+
+class TracedConnection(sqlite3.Connection):
+	"""Соединение с TracedCursor и trace callback SQLite"""
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.set_trace_callback(_trace_statement)
+
+	def cursor(self, factory=TracedCursor):
+		return super().cursor(factory)
+
+	# Connection.execute* создают курсор в обход переопределенного cursor().execute
+	def execute(self, sql, parameters=()):
+		return self.cursor().execute(sql, parameters)
+
+	def executemany(self, sql, seq_of_parameters):
+		return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(database, **kwargs):
+	"""sqlite3.connect, при включенной трассировке - с TracedConnection"""
+	if _enabled:
+		global _slow_log
+		with _stats_lock:
+			if _slow_log is None:
+				_slow_log = _create_slow_log(_slow_log_path)
+		kwargs.setdefault("factory", TracedConnection)
+	return sqlite3.connect(database, **kwargs)
@@ -0,0 +1,171 @@
+# write_behind.py
+import itertools
+import queue
+import threading
+import time
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from database import DUTY_BULK_COLUMNS, get_db
+
+
+# Сколько записей объединяется в одну транзакцию и сколько писатель ждет
+# следующих записей, прежде чем зафиксировать группу
+WRITE_BATCH_SIZE = 200
+WRITE_BATCH_DELAY = 0.05
+
+
+class _Write:
+	"""Запись в очереди: задание (с полетами) или полеты существующего задания"""
+
+	def __init__(self, ticket, duty=None, duty_id=None, flights=()):
+		self.ticket = ticket
+		self.duty = duty
+		self.duty_id = duty_id
+		self.flights = list(flights)
+
+
+class DutyWriter(QObject):
+	"""
+	Фоновый писатель заданий и полетов: записи из очереди объединяются в общие транзакции
+	(одна фиксация на группу), каждая запись - в своей точке сохранения, поэтому ошибка
+	в одной записи не откатывает остальные. Результат приходит сигналами в поток GUI:
+	written(номер записи, ID задания) или failed(номер записи, сообщение).
+	"""
+	written = pyqtSignal(int, object)
+	failed = pyqtSignal(int, str)
+
+	def __init__(self, db, batch_size=WRITE_BATCH_SIZE, batch_delay=WRITE_BATCH_DELAY):
+		super().__init__()
+		self.db = db
+		self.batch_size = batch_size
+		self.batch_delay = batch_delay
+		self._queue = queue.Queue()
+		self._tickets = itertools.count(1)
+		self._closed = False
+		self._thread = threading.Thread(target=self._run, name="duty-writer", daemon=True)
+		self._thread.start()
+
+	def enqueue_duty(self, crew_member_id, aircraft_id, start_time, scheduled_sectors,
+	                 departure_airport, arrival_airport, rest_in_flight=False, has_frms=False, flights=()):
+		"""
+		Ставит задание (и, при необходимости, его полеты - словари столбцов flights без duty_id)
+		в очередь записи. Возвращает номер записи для сопоставления с сигналами.
+		"""
+		duty = dict(zip(DUTY_BULK_COLUMNS, (crew_member_id, aircraft_id, start_time, scheduled_sectors,
+		                                    departure_airport, arrival_airport, rest_in_flight, has_frms)))
+		return self._put(duty=duty, flights=flights)
+
+	def enqueue_flights(self, duty_id, flights):
+		"""Ставит в очередь полеты существующего задания; возвращает номер записи"""
+		return self._put(duty_id=duty_id, flights=flights)
+
+	def _put(self, **write):
+		if self._closed:
+			raise RuntimeError("Очередь записи уже закрыта")
+		ticket = next(self._tickets)
+		self._queue.put(_Write(ticket, **write))
+		return ticket
+
+	def pending(self):
+		"""Приблизительное число записей, еще не зафиксированных в базе"""
+		return self._queue.unfinished_tasks
+
+	def flush(self, timeout=None):
+		"""Ждет, пока все поставленные записи будут зафиксированы; False при истечении timeout"""
+		deadline = None if timeout is None else time.monotonic() + timeout
+		with self._queue.all_tasks_done:
+			while self._queue.unfinished_tasks:
+				remaining = None if deadline is None else deadline - time.monotonic()
+				if remaining is not None and remaining <= 0:
+					return False
+				self._queue.all_tasks_done.wait(remaining)
+		return True
+
+	def close(self, timeout=None):
+		"""Записывает все из очереди и останавливает поток писателя"""
+		if not self._closed:
+			self._closed = True
+			self._queue.put(None)
+		self._thread.join(timeout)
+		return not self._thread.is_alive()
+
+	def _next_group(self):
+		"""Первая запись ждется без ограничения, следующие - не дольше batch_delay"""
+		group = [self._queue.get()]
+		deadline = time.monotonic() + self.batch_delay
+		while group[-1] is not None and len(group) < self.batch_size:
+			remaining = deadline - time.monotonic()
+			try:
+				group.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+			except queue.Empty:
+				break
+		return group
+
+	def _run(self):
+		stop = False
+		while not stop:
+			group = self._next_group()
+			if group[-1] is None:
+				stop = True
+			writes = [write for write in group if write is not None]
+			try:
+				if writes:
+					self._write_group(writes)
+			finally:
+				for _ in group:
+					self._queue.task_done()
+
+	def _write_group(self, writes):
+		results = []
+		try:
+			with self.db.transaction():
+				for write in writes:
+					try:
+						with self.db.transaction():
+							results.append((write.ticket, self._write_one(write), None))
+					except Exception as e:
+						results.append((write.ticket, None, str(e)))
+		except Exception as e:
+			# Не удалась фиксация группы: ни одна запись не сохранена
+			print(f"Ошибка при записи группы заданий: {e}")
+			results = [(write.ticket, None, str(e)) for write in writes]
+
+		for ticket, duty_id, error in results:
+			if error is None:
+				self.written.emit(ticket, duty_id)
+			else:
+				self.failed.emit(ticket, error)
+
+	def _write_one(self, write):
+		"""Записывает одну запись внутри точки сохранения; исключение откатывает ее целиком"""
+		duty_id = write.duty_id
+		if write.duty is not None:
+			duty_id = self.db.add_duty(**{column: write.duty[column] for column in DUTY_BULK_COLUMNS})
+			if duty_id is None:
+				raise ValueError("задание отклонено базой данных")
+		if write.flights:
+			flight_ids = self.db.add_flights_bulk([dict(flight, duty_id=duty_id) for flight in write.flights])
+			if flight_ids is None or None in flight_ids:
+				raise ValueError("полеты задания отклонены базой данных")
+		return duty_id
+
+
+_duty_writer = None
+_duty_writer_lock = threading.Lock()
+
+
+def get_duty_writer():
+	"""Возвращает общий для процесса DutyWriter поверх get_db() (поток запускается при первом обращении)"""
+	global _duty_writer
+	with _duty_writer_lock:
+		if _duty_writer is None:
+			_duty_writer = DutyWriter(get_db())
+		return _duty_writer
+
+
+def close_duty_writer(timeout=None):
+	"""Дописывает очередь и останавливает писателя, если он был запущен"""
+	with _duty_writer_lock:
+		writer = _duty_writer
+	return writer.close(timeout) if writer is not None else True